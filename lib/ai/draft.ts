@@ -31,7 +31,8 @@ export type EvidenceSnapshot = z.infer<typeof evidenceSnapshotSchema>
 export const verifierViolationSchema = z.object({
   code: z.string().min(1),
   message: z.string().min(1),
-  snippet: z.string().optional(),
+  // The DSPy service sends `snippet: null` when a violation has no snippet.
+  snippet: z.string().nullish().transform((snippet) => snippet ?? undefined),
 })
 
 export type VerifierViolation = z.infer<typeof verifierViolationSchema>
@@ -133,6 +133,23 @@ describe("dspy client", () => {
     expect(payload.execution?.verifyModel).toBe("openai/gpt-4.1-mini")
   })
 
+  it("forwards the caller trace context", async () => {
+    const fetchMock = vi.spyOn(globalThis, "fetch").mockResolvedValue(
+      new Response(JSON.stringify({ error: "INTERNAL_ERROR", message: "boom" }), {
+        status: 500,
+        headers: { "content-type": "application/json" },
+      }),
+    )
+    const traceparent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+    await expect(
+      processReviewWithDspy({ orgId: "org_1", reviewId: "rev_1", mode: "AUTO", evidence, traceparent }),
+    ).rejects.toBeInstanceOf(DspyServiceError)
+
+    const [, init] = fetchMock.mock.calls[0]
+    expect((init?.headers as Record<string, string>).traceparent).toBe(traceparent)
+  })
+
   it("accepts verify-existing result payload", async () => {
     vi.spyOn(globalThis, "fetch").mockResolvedValue(
       new Response(
@@ -141,7 +158,7 @@ describe("dspy client", () => {
           draftText: "Thank you for dining with us!",
             verifier: {
               pass: false,
-              violations: [{ code: "FACTUALITY", message: "Contains unsupported claim." }],
+              violations: [{ code: "FACTUALITY", message: "Contains unsupported claim.", snippet: null }],
               suggestedRewrite: "Thank you for visiting us. We appreciate your feedback.",
             },
             seoQuality: {
@@ -159,6 +176,8 @@ describe("dspy client", () => {
               attempted: false,
               changed: false,
               attemptCount: 1,
+              repairCount: 0,
+              variant: null,
             },
             program: {
               version: "v2026-02-11",
@@ -192,6 +211,8 @@ describe("dspy client", () => {
     expect(result.decision).toBe("BLOCKED_BY_VERIFIER")
     expect(result.verifier.pass).toBe(false)
     expect(result.generation.attempted).toBe(false)
+    expect(result.generation.variant).toBeUndefined()
+    expect(result.verifier.violations[0].snippet).toBeUndefined()
     expect(result.seoQuality.requiredKeywordUsed).toBe(false)
   })
 
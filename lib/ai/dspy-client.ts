@@ -29,6 +29,9 @@ const processReviewResponseSchema = z.object({
     attempted: z.boolean(),
     changed: z.boolean(),
     attemptCount: z.number().int().min(1),
+    repairCount: z.number().int().min(0).optional(),
+    // Null when no draft was generated, e.g. VERIFY_EXISTING_DRAFT.
+    variant: z.enum(["fast", "reasoning"]).nullish().transform((variant) => variant ?? undefined),
   }),
   program: z.object({
     version: z.string().min(1),
@@ -80,6 +83,7 @@ export async function processReviewWithDspy(input: {
   programVersion?: string
   draftModel?: string
   verifyModel?: string
+  traceparent?: string
   signal?: AbortSignal
 }) {
   const execution = buildExecutionPayload(input)
@@ -92,7 +96,7 @@ export async function processReviewWithDspy(input: {
     candidateDraftText: input.candidateDraftText,
     requestId: input.requestId,
     ...(execution ? { execution } : {}),
-  }, { signal: input.signal })
+  }, { signal: input.signal, traceparent: input.traceparent })
   const parsed = processReviewResponseSchema.safeParse(res)
   if (!parsed.success) {
     throw new DspyServiceError(
@@ -133,7 +137,7 @@ function cleanOptionalString(value: string | undefined) {
   return trimmed.length > 0 ? trimmed : undefined
 }
 
-async function callDspy(path: string, payload: unknown, opts?: { signal?: AbortSignal }) {
+async function callDspy(path: string, payload: unknown, opts?: { signal?: AbortSignal; traceparent?: string }) {
   const e = dspyEnv()
   const baseUrl = e.DSPY_SERVICE_BASE_URL.replace(/\/+$/, "")
   const timeoutMs = e.DSPY_HTTP_TIMEOUT_MS ?? 12_000
@@ -153,6 +157,7 @@ async function callDspy(path: string, payload: unknown, opts?: { signal?: AbortS
       headers: {
         authorization: `Bearer ${e.DSPY_SERVICE_TOKEN}`,
         "content-type": "application/json",
+        ...(opts?.traceparent ? { traceparent: opts.traceparent } : {}),
       },
       body: JSON.stringify(payload),
       signal: controller.signal,
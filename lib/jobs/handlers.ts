@@ -380,6 +380,7 @@ async function handleProcessReview(job: Job, signal?: AbortSignal) {
       programVersion: dspyExecution.effective.programVersion ?? undefined,
       draftModel: dspyExecution.effective.draftModel ?? undefined,
       verifyModel: dspyExecution.effective.verifyModel ?? undefined,
+      traceparent: dspyTraceparent(job.id),
       signal,
     })
     await breakerRecordSuccess({ orgId: job.orgId, upstreamKey })
@@ -624,6 +625,11 @@ function normalizeDspyErrorToJobError(error: unknown) {
   return new RetryableJobError("DSPY_INTERNAL", "DSPy internal error.", meta)
 }
 
+function dspyTraceparent(jobId: string) {
+  // The trace id is derived from the job id, so a slow job's spans can be found in the DSPy service traces.
+  return `00-${sha256Hash(`job:${jobId}`).slice(0, 32)}-${crypto.randomBytes(8).toString("hex")}-01`
+}
+
 function sha256Hash(input: string) {
   return crypto.createHash("sha256").update(input).digest("hex")
 }
@@ -1,28 +1,55 @@
 from __future__ import annotations
 
+import hashlib
 import json
-from functools import lru_cache
+import math
+import time
+from functools import lru_cache, partial
 
-from fastapi import Depends, FastAPI, Header
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_core import to_json
 
-from models import ErrorResponse, ProcessReviewRequest, ProcessReviewResponse
+from bulk import BulkRuns, create_bulk_runs
+from capture import TrafficCapture, create_traffic_capture
+from idempotency import ResultPendingError, ResultStore, create_result_store
+from jobs import JobRunner, create_job_runner
+from models import (
+    BatchVerifyRequest,
+    BatchVerifyResponse,
+    BulkProcessRequest,
+    BulkProcessResponse,
+    ErrorResponse,
+    ProcessReviewRequest,
+    ProcessReviewResponse,
+    ReviewJobRequest,
+    ReviewJobResponse,
+)
+from prefork import worker_metadata
+from profiling import RequestProfiler, create_request_profiler
 from programs import ProgramManager, ServiceError
 from settings import Settings, get_settings
+from tracing import continue_trace
 
 
 app = FastAPI(title="GBP DSPy Service", version="1.0.0")
 
+RESULT_PENDING_RETRY_AFTER_MS = 2000
+
 
 @app.exception_handler(ServiceError)
 async def service_error_handler(_, exc: ServiceError):
-    payload = ErrorResponse(error=exc.code, message=exc.message)
-    return JSONResponse(status_code=exc.status_code, content=payload.model_dump())
+    payload = ErrorResponse.model_validate(exc.payload())
+    headers = None
+    if exc.retry_after_ms is not None:
+        headers = {"retry-after": str(math.ceil(exc.retry_after_ms / 1000))}
+    return JSONResponse(status_code=exc.status_code, content=payload.model_dump(), headers=headers)
 
 
 @app.exception_handler(Exception)
 async def unhandled_error_handler(_, exc: Exception):
-    payload = ErrorResponse(error="INTERNAL_ERROR", message="Unhandled server error")
+    payload = ErrorResponse.model_validate(ServiceError("INTERNAL_ERROR", "Unhandled server error", 500).payload())
     return JSONResponse(status_code=500, content=payload.model_dump())
 
 
@@ -32,6 +59,38 @@ def get_program_manager() -> ProgramManager:
     return ProgramManager(settings)
 
 
+@lru_cache(maxsize=1)
+def get_traffic_capture() -> TrafficCapture | None:
+    return create_traffic_capture(get_settings())
+
+
+@lru_cache(maxsize=1)
+def get_result_store() -> ResultStore | None:
+    return create_result_store(get_settings())
+
+
+@lru_cache(maxsize=1)
+def get_request_profiler() -> RequestProfiler | None:
+    return create_request_profiler(get_settings())
+
+
+@lru_cache(maxsize=1)
+def get_bulk_runs() -> BulkRuns:
+    return create_bulk_runs(get_settings(), get_program_manager())
+
+
+@lru_cache(maxsize=1)
+def get_job_runner() -> JobRunner:
+    manager = get_program_manager()
+    capture = get_traffic_capture()
+    result_store = get_result_store()
+    profiler = get_request_profiler()
+    return create_job_runner(
+        get_settings(),
+        lambda request: _run_process(request, manager, capture, result_store, profiler)[0],
+    )
+
+
 def require_auth(
     authorization: str | None = Header(default=None),
     settings: Settings = Depends(get_settings),
@@ -45,12 +104,24 @@ def require_auth(
 async def healthz(
     settings: Settings = Depends(get_settings),
     manager: ProgramManager = Depends(get_program_manager),
+    capture: TrafficCapture | None = Depends(get_traffic_capture),
+    result_store: ResultStore | None = Depends(get_result_store),
 ):
     return {
         "ok": True,
         "version": app.version,
         "programVersion": settings.program_version,
         "program": manager.program_metadata(),
+        "cache": manager.cache_metadata(),
+        "promptCache": manager.prompt_cache_metadata(),
+        "capture": capture.metadata() if capture else {"enabled": False},
+        "resultStore": result_store.metadata() if result_store else {"enabled": False},
+        "tracing": manager.tracer.metadata() if manager.tracer else {"enabled": False},
+        "tokenBudget": manager.token_budget.metadata(),
+        "draftRouting": manager.draft_router.metadata(),
+        "verify": manager.verify_metadata(),
+        "dynamicDemos": manager.demo_selector.metadata() if manager.demo_selector else {"enabled": False},
+        "prefork": worker_metadata(),
         "draftModel": settings.draft_model,
         "verifyModel": settings.verify_model,
     }
@@ -61,14 +132,231 @@ async def process_review(
     request: ProcessReviewRequest,
     _: None = Depends(require_auth),
     manager: ProgramManager = Depends(get_program_manager),
+    capture: TrafficCapture | None = Depends(get_traffic_capture),
+    result_store: ResultStore | None = Depends(get_result_store),
+    profiler: RequestProfiler | None = Depends(get_request_profiler),
+    x_dspy_profile: str | None = Header(default=None),
+    traceparent: str | None = Header(default=None),
+):
+    # The pipeline is synchronous; running it off the event loop lets a retry attach while it is in flight.
+    result, source = await run_in_threadpool(
+        _run_process,
+        request,
+        manager,
+        capture,
+        result_store,
+        profiler,
+        profile_requested=x_dspy_profile == "1",
+        traceparent=traceparent,
+    )
+    return _json_response(result, headers={"x-idempotent-result": source})
+
+
+@app.post("/api/review/jobs", response_model=ReviewJobResponse, status_code=202)
+async def submit_job(
+    request: ReviewJobRequest,
+    _: None = Depends(require_auth),
+    job_runner: JobRunner = Depends(get_job_runner),
+):
+    process_request = ProcessReviewRequest.model_validate(request.model_dump(exclude={"callbackUrl"}))
+    callback_url = str(request.callbackUrl) if request.callbackUrl else None
+    job = await run_in_threadpool(job_runner.submit, process_request, callback_url)
+    return _json_response(job, headers={"location": f"/api/review/jobs/{job['jobId']}"}, status_code=202)
+
+
+@app.get("/api/review/jobs/{job_id}", response_model=ReviewJobResponse)
+async def get_job(
+    job_id: str,
+    _: None = Depends(require_auth),
+    job_runner: JobRunner = Depends(get_job_runner),
+):
+    job = await run_in_threadpool(job_runner.get, job_id)
+    if job is None:
+        raise ServiceError("INVALID_REQUEST", "Unknown or expired jobId.", 404)
+    return _json_response(job)
+
+
+@app.post("/api/review/verify/batch", response_model=BatchVerifyResponse)
+async def verify_batch(
+    request: BatchVerifyRequest,
+    _: None = Depends(require_auth),
+    manager: ProgramManager = Depends(get_program_manager),
+):
+    started = time.perf_counter()
+    execution_overrides = request.execution.model_dump(exclude_none=True) if request.execution else None
+    outcome = await run_in_threadpool(
+        manager.verify_batch,
+        items=[
+            {
+                "reviewId": item.reviewId,
+                "evidenceJson": json.dumps(item.evidence.model_dump(mode="json"), separators=(",", ":")),
+                "draftText": item.candidateDraftText,
+            }
+            for item in request.items
+        ],
+        execution_overrides=execution_overrides,
+    )
+    return _json_response({**outcome, "latencyMs": int((time.perf_counter() - started) * 1000)})
+
+
+@app.get("/api/profiles/summary")
+async def profile_summary(
+    limit: int = 25,
+    _: None = Depends(require_auth),
+    profiler: RequestProfiler | None = Depends(get_request_profiler),
+):
+    return profiler.summary(limit=max(1, min(limit, 200))) if profiler else {"enabled": False}
+
+
+@app.post("/api/review/bulk", response_model=BulkProcessResponse, status_code=202)
+async def submit_bulk(
+    request: BulkProcessRequest,
+    _: None = Depends(require_auth),
+    bulk_runs: BulkRuns = Depends(get_bulk_runs),
 ):
-    evidence_json = json.dumps(request.evidence.model_dump(mode="json"), separators=(",", ":"))
     execution_overrides = request.execution.model_dump(exclude_none=True) if request.execution else None
-    result = manager.process_review(
-        mode=request.mode.value,
-        evidence_json=evidence_json,
-        current_draft_text=request.currentDraftText,
-        candidate_draft_text=request.candidateDraftText,
+    run = await run_in_threadpool(
+        bulk_runs.submit,
+        [
+            {
+                "reviewId": item.reviewId,
+                "evidenceJson": json.dumps(item.evidence.model_dump(mode="json"), separators=(",", ":")),
+                "currentDraftText": item.currentDraftText,
+            }
+            for item in request.items
+        ],
         execution_overrides=execution_overrides,
     )
-    return ProcessReviewResponse.model_validate(result)
+    return _json_response(run, status_code=202)
+
+
+@app.get("/api/review/bulk/{bulk_id}", response_model=BulkProcessResponse)
+async def get_bulk(
+    bulk_id: str,
+    _: None = Depends(require_auth),
+    bulk_runs: BulkRuns = Depends(get_bulk_runs),
+):
+    run = await run_in_threadpool(bulk_runs.get, bulk_id)
+    if run is None:
+        raise ServiceError("INVALID_REQUEST", "Unknown or expired bulkId.", 404)
+    return _json_response(run)
+
+
+@app.post("/api/review/process/stream")
+async def process_review_stream(
+    request: ProcessReviewRequest,
+    _: None = Depends(require_auth),
+    manager: ProgramManager = Depends(get_program_manager),
+    capture: TrafficCapture | None = Depends(get_traffic_capture),
+    traceparent: str | None = Header(default=None),
+):
+    started = time.perf_counter()
+    deadline = time.monotonic() + manager.settings.request_deadline_seconds
+    evidence_json = json.dumps(request.evidence.model_dump(mode="json"), separators=(",", ":"))
+    execution_overrides = request.execution.model_dump(exclude_none=True) if request.execution else None
+
+    async def events():
+        try:
+            with continue_trace(traceparent):
+                async for event, payload in manager.stream_process_review(
+                    mode=request.mode.value,
+                    evidence_json=evidence_json,
+                    current_draft_text=request.currentDraftText,
+                    candidate_draft_text=request.candidateDraftText,
+                    execution_overrides=execution_overrides,
+                ):
+                    if event == "result":
+                        if capture:
+                            capture.submit(request, result=payload, latency_ms=int((time.perf_counter() - started) * 1000))
+                    yield _sse_event(event, payload)
+        except ServiceError as exc:
+            if capture:
+                capture.submit(
+                    request,
+                    error={"error": exc.code, "statusCode": exc.status_code},
+                    latency_ms=int((time.perf_counter() - started) * 1000),
+                )
+            yield _sse_event("error", ErrorResponse.model_validate(exc.payload()).model_dump())
+        except Exception:  # noqa: BLE001
+            unhandled = ServiceError("INTERNAL_ERROR", "Unhandled server error", 500)
+            yield _sse_event("error", ErrorResponse.model_validate(unhandled.payload()).model_dump())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"cache-control": "no-cache", "x-accel-buffering": "no"},
+    )
+
+
+def _run_process(
+    request: ProcessReviewRequest,
+    manager: ProgramManager,
+    capture: TrafficCapture | None,
+    result_store: ResultStore | None,
+    profiler: RequestProfiler | None = None,
+    *,
+    profile_requested: bool = False,
+    traceparent: str | None = None,
+) -> tuple[dict, str]:
+    started = time.perf_counter()
+    deadline = time.monotonic() + manager.settings.request_deadline_seconds
+    evidence_json = json.dumps(request.evidence.model_dump(mode="json"), separators=(",", ":"))
+    execution_overrides = request.execution.model_dump(exclude_none=True) if request.execution else None
+
+    def run() -> dict:
+        return manager.process_review(
+            mode=request.mode.value,
+            evidence_json=evidence_json,
+            current_draft_text=request.currentDraftText,
+            candidate_draft_text=request.candidateDraftText,
+            execution_overrides=execution_overrides,
+        )
+
+    compute = run
+    if profiler and profiler.should_profile(profile_requested):
+        compute = partial(profiler.run, run, mode=request.mode.value)
+
+    source = "computed"
+    try:
+        with continue_trace(traceparent):
+            if result_store and request.requestId:
+                try:
+                    result, source = result_store.run(_idempotency_key(request), compute, deadline=deadline)
+                except ResultPendingError as exc:
+                    # The caller has given up by now; free this worker and let it retry later.
+                    raise ServiceError(
+                        "INTERNAL_ERROR",
+                        "An identical request is still being processed; retry shortly.",
+                        503,
+                        retryable=True,
+                        retry_after_ms=RESULT_PENDING_RETRY_AFTER_MS,
+                    ) from exc
+            else:
+                result = compute()
+    except ServiceError as exc:
+        if capture:
+            capture.submit(
+                request,
+                error={"error": exc.code, "statusCode": exc.status_code},
+                latency_ms=int((time.perf_counter() - started) * 1000),
+            )
+        raise
+    if capture and source == "computed":
+        capture.submit(request, result=result, latency_ms=int((time.perf_counter() - started) * 1000))
+    return result, source
+
+
+def _idempotency_key(request: ProcessReviewRequest) -> str:
+    # Job fan-out (bulk approve, manual sync) shares one requestId across reviews, so the payload is part of the key.
+    payload = request.model_dump_json(exclude={"requestId"})
+    return f"{request.orgId}:{request.requestId}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def _json_response(payload: dict, headers: dict[str, str] | None = None, status_code: int = 200) -> Response:
+    # ProgramManager builds responses in their `response_model` shape, so they are serialized
+    # straight to bytes instead of being validated into models and dumped again.
+    return Response(content=to_json(payload), status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _sse_event(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Protocol
+
+import dspy
+
+from programs import BatchClient, ProgramManager, ServiceError
+from settings import Settings
+
+
+# A run step unfinished after this long belonged to a process that died; any worker may take the run over.
+RUN_LEASE_SECONDS = 300
+PRIVATE_FIELDS = ("state",)
+TERMINAL_OPENAI_STATES = {"completed", "expired", "cancelled"}
+
+
+class OpenAIBatchClient:
+    """OpenAI Batch API: half-price completions with a 24h turnaround, outside the interactive rate limits."""
+
+    def __init__(self, client: Any | None = None, completion_window: str = "24h") -> None:
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI()
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, requests: list[dict[str, Any]]) -> str:
+        lines = [
+            json.dumps({
+                "custom_id": request["customId"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": _chat_body(request),
+            }, separators=(",", ":"))
+            for request in requests
+        ]
+        upload = self.client.files.create(
+            file=("bulk.jsonl", "\n".join(lines).encode("utf-8"), "application/jsonl"),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in TERMINAL_OPENAI_STATES and (batch.output_file_id or batch.error_file_id):
+            # Expired and cancelled batches still return what finished; the rest surface as per-item errors.
+            return "completed"
+        if batch.status in TERMINAL_OPENAI_STATES or batch.status == "failed":
+            return batch.status
+        return "running"
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        outputs: dict[str, dict[str, Any]] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for raw in self.client.files.content(file_id).text.splitlines():
+                if raw.strip():
+                    record = json.loads(raw)
+                    outputs[record["custom_id"]] = _openai_output(record)
+        return outputs
+
+
+class LocalBatchClient:
+    """Stand-in that runs batch requests through ordinary LM calls on a small thread pool.
+
+    Used for local development and offline runs (with the fake LM); it has the batch
+    interface but none of the provider's pricing or rate-limit isolation.
+    """
+
+    def __init__(self, lm_factory: Callable[..., dspy.BaseLM], max_workers: int = 4) -> None:
+        self.lm_factory = lm_factory
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="local-batch")
+        self._lock = threading.Lock()
+        self._lms: dict[tuple[str, Any, Any], dspy.BaseLM] = {}
+        self._batches: dict[str, dict[str, Future[dict[str, Any]]]] = {}
+
+    def submit(self, requests: list[dict[str, Any]]) -> str:
+        batch_id = f"local-{uuid.uuid4().hex}"
+        futures = {request["customId"]: self._pool.submit(self._complete, request) for request in requests}
+        with self._lock:
+            self._batches[batch_id] = futures
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        with self._lock:
+            futures = self._batches.get(batch_id)
+        if futures is None:
+            return "failed"
+        return "completed" if all(future.done() for future in futures.values()) else "running"
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            futures = self._batches.pop(batch_id, {})
+        return {custom_id: future.result() for custom_id, future in futures.items()}
+
+    def _complete(self, request: dict[str, Any]) -> dict[str, Any]:
+        try:
+            response = self._lm(request).forward(messages=request["messages"])
+            usage = getattr(response, "usage", None) or {}
+            return {
+                "content": response.choices[0].message.content,
+                "usage": usage if isinstance(usage, dict) else dict(usage),
+            }
+        except Exception as exc:  # noqa: BLE001
+            return {"error": str(exc) or type(exc).__name__}
+
+    def _lm(self, request: dict[str, Any]) -> dspy.BaseLM:
+        key = (request["model"], request.get("temperature"), request.get("maxTokens"))
+        with self._lock:
+            lm = self._lms.get(key)
+            if lm is None:
+                options = {"temperature": request.get("temperature"), "max_tokens": request.get("maxTokens")}
+                lm = self.lm_factory(
+                    request["model"],
+                    cache=False,
+                    **{name: value for name, value in options.items() if value is not None},
+                )
+                self._lms[key] = lm
+        return lm
+
+
+class BulkRunStore(Protocol):
+    def create(self, run: dict[str, Any]) -> None: ...
+
+    def get(self, bulk_id: str) -> dict[str, Any] | None: ...
+
+    def due(self) -> list[str]:
+        """Ids of RUNNING runs whose next poll is due and that no worker holds."""
+        ...
+
+    def claim(self, bulk_id: str) -> dict[str, Any] | None:
+        """Hold a due run for `RUN_LEASE_SECONDS` and return it, or None if another worker has it."""
+        ...
+
+    def release(self, run: dict[str, Any], next_poll_at: float) -> None:
+        """Save a claimed run and let it be claimed again from `next_poll_at`."""
+        ...
+
+
+class MemoryBulkRunStore:
+    """Process-local run store; runs are lost on restart and invisible to sibling workers."""
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # bulkId -> [expires_at, next_poll_at, lease_until, run]
+        self._runs: OrderedDict[str, list[Any]] = OrderedDict()
+
+    def create(self, run: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            for bulk_id in [key for key, entry in self._runs.items() if entry[0] < now]:
+                del self._runs[bulk_id]
+            self._runs[run["bulkId"]] = [now + self.ttl_seconds, now, 0.0, dict(run)]
+
+    def get(self, bulk_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._runs.get(bulk_id)
+        if entry is None or entry[0] < time.time():
+            return None
+        return dict(entry[3])
+
+    def due(self) -> list[str]:
+        now = time.time()
+        with self._lock:
+            return [
+                bulk_id
+                for bulk_id, (_, next_poll_at, lease_until, run) in self._runs.items()
+                if run["status"] == "RUNNING" and next_poll_at <= now and lease_until < now
+            ]
+
+    def claim(self, bulk_id: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            entry = self._runs.get(bulk_id)
+            if entry is None or entry[3]["status"] != "RUNNING" or entry[1] > now or entry[2] >= now:
+                return None
+            entry[2] = now + RUN_LEASE_SECONDS
+            return dict(entry[3])
+
+    def release(self, run: dict[str, Any], next_poll_at: float) -> None:
+        with self._lock:
+            if run["bulkId"] in self._runs:
+                self._runs[run["bulkId"]] = [time.time() + self.ttl_seconds, next_poll_at, 0.0, dict(run)]
+
+
+class SqliteBulkRunStore:
+    """Run store in a SQLite file, shared by every uvicorn worker opening the same path.
+
+    A run's record holds the provider batch in flight, so any worker can answer for it and
+    advance it. Claims are a conditional UPDATE on a lease, so one worker advances a run at
+    a time, and a run whose worker died is claimed again once its lease lapses.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bulk_runs ("
+            " bulk_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " batch_id TEXT,"
+            " record TEXT NOT NULL,"
+            " next_poll_at REAL NOT NULL,"
+            " lease_until REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bulk_runs_due ON bulk_runs (status, next_poll_at)")
+
+    def create(self, run: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM bulk_runs WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "INSERT INTO bulk_runs (bulk_id, status, batch_id, record, next_poll_at, lease_until, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, 0, ?)",
+                (run["bulkId"], run["status"], _batch_id(run), _encode(run), now, now + self.ttl_seconds),
+            )
+
+    def get(self, bulk_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM bulk_runs WHERE bulk_id = ? AND expires_at >= ?",
+                (bulk_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def due(self) -> list[str]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT bulk_id FROM bulk_runs WHERE status = 'RUNNING' AND next_poll_at <= ? AND lease_until < ?"
+                " ORDER BY next_poll_at",
+                (now, now),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def claim(self, bulk_id: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE bulk_runs SET lease_until = ?"
+                " WHERE bulk_id = ? AND status = 'RUNNING' AND next_poll_at <= ? AND lease_until < ?",
+                (now + RUN_LEASE_SECONDS, bulk_id, now, now),
+            ).rowcount
+        return self.get(bulk_id) if claimed == 1 else None
+
+    def release(self, run: dict[str, Any], next_poll_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE bulk_runs SET status = ?, batch_id = ?, record = ?, next_poll_at = ?, lease_until = 0,"
+                " expires_at = ? WHERE bulk_id = ?",
+                (run["status"], _batch_id(run), _encode(run), next_poll_at, time.time() + self.ttl_seconds, run["bulkId"]),
+            )
+
+
+class BulkRuns:
+    """Background bulk process runs, kept in a `BulkRunStore` and advanced by a periodic poll.
+
+    Each poll only submits or collects provider batches, so a run holds no thread while its
+    batch is pending; with the SQLite store, a restarted or sibling worker carries it on.
+    """
+
+    def __init__(
+        self,
+        store: BulkRunStore,
+        manager: ProgramManager,
+        client: BatchClient,
+        poll_seconds: float,
+        start: bool = True,
+    ) -> None:
+        self.store = store
+        self.manager = manager
+        self.client = client
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        if start:
+            # The first poll runs at once, resuming runs left by a process that exited.
+            self._wake.set()
+            threading.Thread(target=self._poll_forever, name="bulk-poll", daemon=True).start()
+
+    def submit(self, items: list[dict[str, Any]], execution_overrides: dict[str, str] | None = None) -> dict[str, Any]:
+        run = {
+            "bulkId": str(uuid.uuid4()),
+            "status": "RUNNING",
+            "items": len(items),
+            "submittedAtUtc": _now_iso(),
+            "completedAtUtc": None,
+            "results": None,
+            "error": None,
+            "state": self.manager.start_bulk(items, execution_overrides),
+        }
+        self.store.create(run)
+        self._wake.set()
+        return _public(run)
+
+    def get(self, bulk_id: str) -> dict[str, Any] | None:
+        run = self.store.get(bulk_id)
+        return _public(run) if run is not None else None
+
+    def poll(self) -> None:
+        """Advance every due run by one step: submit its next provider batch or collect a finished one."""
+        for bulk_id in self.store.due():
+            run = self.store.claim(bulk_id)
+            if run is None:
+                continue
+            self._advance(run)
+            self.store.release(run, next_poll_at=time.time() + self.poll_seconds)
+
+    def _advance(self, run: dict[str, Any]) -> None:
+        try:
+            state = self.manager.advance_bulk(run["state"], self.client)
+        except ServiceError as exc:
+            run.update(status="FAILED", error=exc.payload())
+        except Exception:  # noqa: BLE001
+            unhandled = ServiceError("INTERNAL_ERROR", "Unhandled bulk run error", 500)
+            run.update(status="FAILED", error=unhandled.payload())
+        else:
+            if state["stage"] != "done":
+                return
+            run.update(status="COMPLETED", results=state["outcomes"])
+        # The items and intermediate drafts are not needed once the run is over.
+        run.update(state=None, completedAtUtc=_now_iso())
+
+    def _poll_forever(self) -> None:
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception:  # noqa: BLE001
+                # A store error (e.g. a locked database) is retried on the next tick.
+                continue
+
+
+def create_bulk_runs(settings: Settings, manager: ProgramManager) -> BulkRuns:
+    store: BulkRunStore
+    if settings.job_store_path:
+        store = SqliteBulkRunStore(str(_resolve_store_path(settings.job_store_path)), ttl_seconds=settings.job_ttl_seconds)
+    else:
+        store = MemoryBulkRunStore(ttl_seconds=settings.job_ttl_seconds)
+    return BulkRuns(store, manager, create_batch_client(settings, manager), poll_seconds=settings.bulk_poll_seconds)
+
+
+def create_batch_client(settings: Settings, manager: ProgramManager) -> BatchClient:
+    if settings.bulk_batch_client == "local":
+        return LocalBatchClient(manager.lm_factory)
+    return OpenAIBatchClient()
+
+
+def _chat_body(request: dict[str, Any]) -> dict[str, Any]:
+    body: dict[str, Any] = {
+        # DSPy model names carry a provider prefix the Batch API does not accept.
+        "model": request["model"].split("/", 1)[-1],
+        "messages": request["messages"],
+        "response_format": {"type": "json_object"},
+    }
+    if request.get("temperature") is not None:
+        body["temperature"] = request["temperature"]
+    if request.get("maxTokens") is not None:
+        body["max_tokens"] = request["maxTokens"]
+    return body
+
+
+def _openai_output(record: dict[str, Any]) -> dict[str, Any]:
+    response = record.get("response") or {}
+    body = response.get("body") or {}
+    if record.get("error") or response.get("status_code") != 200:
+        error = record.get("error") or body.get("error") or {}
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        return {"error": message or f"Batch request failed with status {response.get('status_code')}."}
+    return {"content": body["choices"][0]["message"]["content"], "usage": body.get("usage") or {}}
+
+
+def _public(run: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in run.items() if key not in PRIVATE_FIELDS}
+
+
+def _batch_id(run: dict[str, Any]) -> str | None:
+    return (run.get("state") or {}).get("batchId")
+
+
+def _encode(run: dict[str, Any]) -> str:
+    return json.dumps(run, separators=(",", ":"))
+
+
+def _resolve_store_path(raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path
+    return Path(__file__).resolve().parent / path
+
+
+def _now_iso() -> str:
+    return datetime.now(UTC).isoformat()
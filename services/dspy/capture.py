@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import queue
+import random
+import re
+import threading
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from models import ProcessReviewRequest
+from settings import Settings
+
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+URL_PATTERN = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{6,}\d")
+QUEUE_MAX_RECORDS = 1000
+
+
+class TrafficCapture:
+    """Sampled, PII-redacted capture of process requests and results to a JSONL file.
+
+    Records are queued and appended by a daemon thread so request handlers never touch the
+    file; when the queue is full or the file has reached `max_bytes`, records are dropped
+    and counted instead.
+    """
+
+    def __init__(self, path: Path, sample_rate: float, max_bytes: int, rng: random.Random | None = None) -> None:
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self._rng = rng or random.Random()
+        self._queue: queue.Queue[dict[str, Any] | None] = queue.Queue(maxsize=QUEUE_MAX_RECORDS)
+        self._lock = threading.Lock()
+        self._counts = {"captured": 0, "dropped": 0, "errors": 0}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = threading.Thread(target=self._drain, name="traffic-capture", daemon=True)
+        self._writer.start()
+
+    def submit(
+        self,
+        request: ProcessReviewRequest,
+        *,
+        result: dict[str, Any] | None = None,
+        error: dict[str, Any] | None = None,
+        latency_ms: int,
+    ) -> None:
+        with self._lock:
+            sampled = self._rng.random() < self.sample_rate
+        if not sampled:
+            return
+        record = build_capture_record(request, result=result, error=error, latency_ms=latency_ms)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._incr("dropped")
+
+    def metadata(self) -> dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        return {"enabled": True, "sampleRate": self.sample_rate, "path": str(self.path), **counts}
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._queue.put(None)
+        self._writer.join(timeout)
+
+    def _drain(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            line = json.dumps(record, separators=(",", ":"), sort_keys=True) + "\n"
+            try:
+                size = self.path.stat().st_size if self.path.exists() else 0
+                if size + len(line) > self.max_bytes:
+                    self._incr("dropped")
+                    continue
+                with self.path.open("a", encoding="utf-8") as handle:
+                    handle.write(line)
+            except OSError:
+                self._incr("errors")
+                continue
+            self._incr("captured")
+
+    def _incr(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+
+def create_traffic_capture(settings: Settings) -> TrafficCapture | None:
+    if settings.capture_sample_rate <= 0:
+        return None
+    return TrafficCapture(
+        path=_resolve_capture_path(settings.capture_path),
+        sample_rate=settings.capture_sample_rate,
+        max_bytes=settings.capture_max_bytes,
+    )
+
+
+def build_capture_record(
+    request: ProcessReviewRequest,
+    *,
+    result: dict[str, Any] | None,
+    error: dict[str, Any] | None,
+    latency_ms: int,
+) -> dict[str, Any]:
+    evidence = request.evidence.model_dump(mode="json")
+    names = _name_tokens(evidence.get("reviewerDisplayName"))
+    evidence["reviewerDisplayName"] = "[reviewer]" if evidence.get("reviewerDisplayName") else None
+    evidence["comment"] = redact_text(evidence.get("comment"), names)
+
+    record: dict[str, Any] = {
+        "capturedAtUtc": datetime.now(UTC).isoformat(),
+        "orgKey": _pseudonym(request.orgId),
+        "reviewKey": _pseudonym(request.reviewId),
+        "request": {
+            "mode": request.mode.value,
+            "evidence": evidence,
+            "currentDraftText": redact_text(request.currentDraftText, names),
+            "candidateDraftText": redact_text(request.candidateDraftText, names),
+            "execution": request.execution.model_dump(exclude_none=True) if request.execution else None,
+        },
+        "latencyMs": latency_ms,
+        "result": None,
+        "error": error,
+    }
+    if result is not None:
+        verifier = dict(result.get("verifier") or {})
+        verifier["suggestedRewrite"] = redact_text(verifier.get("suggestedRewrite"), names)
+        verifier["violations"] = [
+            {**violation, "snippet": redact_text(violation.get("snippet"), names)}
+            for violation in verifier.get("violations") or []
+        ]
+        record["result"] = {**result, "draftText": redact_text(result.get("draftText"), names), "verifier": verifier}
+    return record
+
+
+def redact_text(text: str | None, names: list[str] | tuple[str, ...] = ()) -> str | None:
+    """Mask emails, URLs, phone numbers and reviewer name tokens.
+
+    Masks keep the original length so evidence highlight offsets stay valid.
+    """
+    if not text:
+        return text
+    redacted = EMAIL_PATTERN.sub(lambda match: _mask("email", match), text)
+    redacted = URL_PATTERN.sub(lambda match: _mask("url", match), redacted)
+    redacted = PHONE_PATTERN.sub(lambda match: _mask("phone", match), redacted)
+    for name in names:
+        redacted = re.sub(rf"\b{re.escape(name)}\b", lambda match: _mask("name", match), redacted, flags=re.IGNORECASE)
+    return redacted
+
+
+def _mask(label: str, match: re.Match[str]) -> str:
+    length = len(match.group(0))
+    placeholder = f"[{label}]"
+    return placeholder.ljust(length) if length >= len(placeholder) else "*" * length
+
+
+def _name_tokens(display_name: Any) -> list[str]:
+    if not isinstance(display_name, str):
+        return []
+    return [token for token in re.findall(r"\w+", display_name) if len(token) >= 2]
+
+
+def _pseudonym(value: str) -> str:
+    # Stable within a capture file so repeated reviews can be grouped without storing raw ids.
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def _resolve_capture_path(raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path
+    return Path(__file__).resolve().parent / path
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import re
+import threading
+import zlib
+from collections import Counter
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import dspy
+
+from settings import Settings
+
+
+TASKS = ("draft", "verify")
+DEFAULT_DIM = 4096
+# Demo cost is estimated like token budgets are: about 4 characters per token.
+CHARS_PER_TOKEN = 4
+# Candidates beyond this multiple of the demo cap are never reached by the budget walk.
+CANDIDATE_FACTOR = 4
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+class DemoIndex:
+    """Hashed TF-IDF vectors over one task's training demos, read through memory maps.
+
+    `vectors.npy`, `tokens.npy` and `offsets.npy` are opened with `mmap_mode="r"` and the demo
+    records are sliced out of a memory-mapped `demos.jsonl`, so opening an index costs no parse
+    and pages are only read as queries touch them.
+    """
+
+    def __init__(self, path: Path) -> None:
+        np = _numpy()
+        self.path = path
+        self.meta = json.loads((path / "index.json").read_text(encoding="utf-8"))
+        self.dim = int(self.meta["dim"])
+        self.idf = np.load(path / "idf.npy", mmap_mode="r")
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self.tokens = np.load(path / "tokens.npy", mmap_mode="r")
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        with (path / "demos.jsonl").open("rb") as handle:
+            self._records = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return int(self.vectors.shape[0])
+
+    def select(self, query: str, token_budget: int, max_demos: int) -> tuple[list[dspy.Example], int]:
+        """The most similar demos, best first, that fit in `token_budget`; returns them with their token cost."""
+        np = _numpy()
+        if not len(self) or max_demos <= 0:
+            return [], 0
+        scores = self.vectors @ vectorize(query, self.dim, self.idf)
+        limit = min(len(self), max_demos * CANDIDATE_FACTOR)
+        candidates = np.argpartition(-scores, limit - 1)[:limit]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        demos: list[dspy.Example] = []
+        spent = 0
+        for row in ranked:
+            cost = int(self.tokens[row])
+            if spent + cost > token_budget:
+                continue
+            demos.append(dspy.Example(**self._record(int(row))))
+            spent += cost
+            if len(demos) >= max_demos:
+                break
+        return demos, spent
+
+    def _record(self, row: int) -> dict[str, Any]:
+        return json.loads(self._records[int(self.offsets[row]):int(self.offsets[row + 1])])
+
+
+class DemoSelector:
+    """Per-call few-shot demos chosen by similarity to the review, in place of an artifact's fixed set.
+
+    A task without a built index returns `None`, which leaves the compiled demos in place.
+    """
+
+    def __init__(self, indexes: dict[str, DemoIndex | None], token_budget: int, max_demos: int) -> None:
+        self.indexes = indexes
+        self.token_budget = token_budget
+        self.max_demos = max_demos
+        self._lock = threading.Lock()
+        self._stats = {task: {"calls": 0, "demos": 0, "demoTokens": 0} for task in indexes}
+
+    def draft(self, evidence: dict[str, Any]) -> list[dspy.Example] | None:
+        return self._select("draft", draft_query(evidence))
+
+    def verify(self, evidence: dict[str, Any], draft_text: str) -> list[dspy.Example] | None:
+        return self._select("verify", verify_query(evidence, draft_text))
+
+    def metadata(self) -> dict[str, Any]:
+        with self._lock:
+            stats = {task: dict(values) for task, values in self._stats.items()}
+        tasks: dict[str, Any] = {}
+        for task, index in self.indexes.items():
+            values = stats[task]
+            calls = values["calls"]
+            tasks[task] = {
+                "index": None if index is None else {"demos": len(index), "builtAtUtc": index.meta.get("builtAtUtc")},
+                "calls": calls,
+                "meanDemos": round(values["demos"] / calls, 2) if calls else 0.0,
+                "meanDemoTokens": round(values["demoTokens"] / calls, 1) if calls else 0.0,
+            }
+        return {"enabled": True, "tokenBudget": self.token_budget, "maxDemos": self.max_demos, "tasks": tasks}
+
+    def _select(self, task: str, query: str) -> list[dspy.Example] | None:
+        index = self.indexes.get(task)
+        if index is None:
+            return None
+        demos, spent = index.select(query, self.token_budget, self.max_demos)
+        with self._lock:
+            values = self._stats[task]
+            values["calls"] += 1
+            values["demos"] += len(demos)
+            values["demoTokens"] += spent
+        return demos
+
+
+def draft_query(evidence: dict[str, Any]) -> str:
+    return f"rating{evidence.get('starRating')} {evidence.get('comment') or ''}"
+
+
+def verify_query(evidence: dict[str, Any], draft_text: str) -> str:
+    return f"{draft_query(evidence)} {draft_text}"
+
+
+def vectorize(text: str, dim: int, idf: Any) -> Any:
+    """L2-normalized sublinear TF-IDF over hashed word unigrams and bigrams."""
+    np = _numpy()
+    vector = np.zeros(dim, dtype=np.float32)
+    for slot, count in _hashed_counts(text, dim).items():
+        vector[slot] = 1.0 + math.log(count)
+    vector *= idf
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def demo_tokens(fields: dict[str, Any]) -> int:
+    return math.ceil(sum(len(_field_text(value)) for value in fields.values()) / CHARS_PER_TOKEN)
+
+
+def write_demo_index(
+    output_dir: Path,
+    task: str,
+    records: list[tuple[str, dict[str, Any]]],
+    dim: int = DEFAULT_DIM,
+) -> dict[str, Any]:
+    """Write an index of `(query text, demo fields)` records for `task`; returns its `index.json`."""
+    np = _numpy()
+    documents = [_hashed_counts(query, dim) for query, _ in records]
+    document_frequency = np.zeros(dim, dtype=np.float32)
+    for counts in documents:
+        document_frequency[list(counts)] += 1.0
+    # Smoothed IDF, so a feature seen in every demo still weighs 1.
+    idf = (np.log((1.0 + len(records)) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+
+    # Half precision halves the mapped size; cosine ranking does not need more.
+    vectors = np.zeros((len(records), dim), dtype=np.float16)
+    for row, (query, _) in enumerate(records):
+        vectors[row] = vectorize(query, dim, idf)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    offsets = [0]
+    with (output_dir / "demos.jsonl").open("wb") as handle:
+        for _, fields in records:
+            line = (json.dumps(fields, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+            handle.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(output_dir / "idf.npy", idf)
+    np.save(output_dir / "vectors.npy", vectors)
+    np.save(output_dir / "tokens.npy", np.array([demo_tokens(fields) for _, fields in records], dtype=np.int32))
+    np.save(output_dir / "offsets.npy", np.array(offsets, dtype=np.int64))
+    meta = {"task": task, "dim": dim, "demos": len(records), "builtAtUtc": datetime.now(UTC).isoformat()}
+    (output_dir / "index.json").write_text(json.dumps(meta, indent=2, sort_keys=True), encoding="utf-8")
+    return meta
+
+
+def create_demo_selector(settings: Settings) -> DemoSelector | None:
+    if not settings.dynamic_demos:
+        return None
+    _numpy()
+    root = _resolve_index_dir(settings.demo_index_dir)
+    indexes = {task: DemoIndex(root / task) if (root / task / "index.json").exists() else None for task in TASKS}
+    return DemoSelector(indexes, token_budget=settings.demo_token_budget, max_demos=settings.demo_max_count)
+
+
+def _features(text: str) -> Counter[str]:
+    words = _WORD_RE.findall(text.lower())
+    return Counter(words + [f"{left} {right}" for left, right in zip(words, words[1:])])
+
+
+def _hashed_counts(text: str, dim: int) -> Counter[int]:
+    counts: Counter[int] = Counter()
+    for feature, count in _features(text).items():
+        counts[zlib.crc32(feature.encode("utf-8")) % dim] += count
+    return counts
+
+
+def _field_text(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, separators=(",", ":"))
+
+
+def _numpy() -> Any:
+    try:
+        import numpy  # type: ignore[import-not-found]
+    except ImportError as exc:
+        raise RuntimeError("DSPY_DYNAMIC_DEMOS=true requires the `numpy` package.") from exc
+    return numpy
+
+
+def _resolve_index_dir(raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path
+    return Path(__file__).resolve().parent / path
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Any
+
+from settings import Settings
+
+
+FAST = "fast"
+REASONING = "reasoning"
+LATENCY_WINDOW = 500
+
+
+class DraftRouter:
+    """Chooses between the fast (`Predict`) and reasoning (`ChainOfThought`) draft programs.
+
+    With `policy="auto"`, AUTO-mode reviews rated at least `fast_min_rating` whose comment
+    is at most `fast_max_comment_chars` long go to the fast variant; regenerations always
+    reason, since the previous draft was already rejected. Each variant's draft latency and
+    verifier pass rate are kept so the thresholds can be tuned from `/api/healthz`.
+    """
+
+    def __init__(self, policy: str, fast_min_rating: int, fast_max_comment_chars: int) -> None:
+        self.policy = policy
+        self.fast_min_rating = fast_min_rating
+        self.fast_max_comment_chars = fast_max_comment_chars
+        self._lock = threading.Lock()
+        self._stats = {variant: _empty_stats() for variant in (FAST, REASONING)}
+
+    def route(self, evidence: dict[str, Any], mode: str) -> str:
+        if self.policy != "auto":
+            return self.policy
+        if mode != "AUTO":
+            return REASONING
+        try:
+            rating = int(evidence.get("starRating"))
+        except (TypeError, ValueError):
+            return REASONING
+        comment = str(evidence.get("comment") or "").strip()
+        if rating >= self.fast_min_rating and len(comment) <= self.fast_max_comment_chars:
+            return FAST
+        return REASONING
+
+    def record(self, variant: str, draft_ms: float, passed: bool) -> None:
+        with self._lock:
+            stats = self._stats[variant]
+            stats["drafts"] += 1
+            stats["passed"] += int(passed)
+            stats["latencies"].append(draft_ms)
+
+    def metadata(self) -> dict[str, Any]:
+        with self._lock:
+            snapshot = {
+                variant: (stats["drafts"], stats["passed"], sorted(stats["latencies"]))
+                for variant, stats in self._stats.items()
+            }
+        return {
+            "policy": self.policy,
+            "fastMinRating": self.fast_min_rating,
+            "fastMaxCommentChars": self.fast_max_comment_chars,
+            "variants": {
+                variant: {
+                    "drafts": drafts,
+                    "passRate": round(passed / drafts, 4) if drafts else 0.0,
+                    "draftLatencyMs": {"p50": _percentile(latencies, 50), "p95": _percentile(latencies, 95)},
+                }
+                for variant, (drafts, passed, latencies) in snapshot.items()
+            },
+        }
+
+
+def create_draft_router(settings: Settings) -> DraftRouter:
+    return DraftRouter(
+        policy=settings.draft_routing,
+        fast_min_rating=settings.fast_draft_min_rating,
+        fast_max_comment_chars=settings.fast_draft_max_comment_chars,
+    )
+
+
+def _empty_stats() -> dict[str, Any]:
+    return {"drafts": 0, "passed": 0, "latencies": deque(maxlen=LATENCY_WINDOW)}
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return round(ordered[rank], 1)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Any
+
+from lm_cache import CacheMetrics, SqliteCacheBackend
+from settings import Settings
+
+
+PERSISTENT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ResultPendingError(TimeoutError):
+    """An attached retry's deadline passed while the first execution was still running."""
+
+
+class ResultStore:
+    """Remembers finished process results by idempotency key and de-duplicates in-flight work.
+
+    A retry whose key is already running waits on the first execution instead of starting
+    another one, until its own deadline. Failures are never stored, so a retry after an
+    error recomputes.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_entries: int,
+        persistent: SqliteCacheBackend | None = None,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._in_flight: dict[str, Future[dict[str, Any]]] = {}
+        self.metrics = CacheMetrics()
+        self._attached = 0
+        self._wait_timeouts = 0
+
+    def run(
+        self,
+        key: str,
+        compute: Callable[[], dict[str, Any]],
+        deadline: float | None = None,
+    ) -> tuple[dict[str, Any], str]:
+        """Return `(result, source)` where source is `computed`, `stored` or `attached`.
+
+        `deadline` is a `time.monotonic()` value; an attached retry still waiting then raises
+        `ResultPendingError` and leaves the first execution running.
+        """
+        with self._lock:
+            stored = self._lookup_locked(key)
+            if stored is not None:
+                self.metrics.incr("hits")
+                return copy.deepcopy(stored), "stored"
+            running = self._in_flight.get(key)
+            if running is None:
+                future: Future[dict[str, Any]] = Future()
+                self._in_flight[key] = future
+            else:
+                self._attached += 1
+        if running is not None:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                return copy.deepcopy(running.result(timeout)), "attached"
+            except FutureTimeoutError:
+                with self._lock:
+                    self._wait_timeouts += 1
+                raise ResultPendingError(f"Result for {key!r} is still being computed.") from None
+
+        self.metrics.incr("misses")
+        try:
+            result = compute()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            # The caller owns `result`; the store and attached waiters share a private copy.
+            stored = copy.deepcopy(result)
+            self._store(key, stored)
+            future.set_result(stored)
+            return result, "computed"
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def metadata(self) -> dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+            in_flight = len(self._in_flight)
+            attached = self._attached
+            wait_timeouts = self._wait_timeouts
+        return {
+            "enabled": True,
+            "persistent": self.persistent is not None,
+            "entries": entries,
+            "inFlight": in_flight,
+            "attached": attached,
+            "waitTimeouts": wait_timeouts,
+            **self.metrics.snapshot(),
+        }
+
+    def _lookup_locked(self, key: str) -> dict[str, Any] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                return result
+            del self._entries[key]
+            self.metrics.incr("expired")
+        if self.persistent is None:
+            return None
+        persisted = self.persistent.get(key)
+        if persisted is None:
+            return None
+        # Promote so later retries skip the disk round trip.
+        self._remember_locked(key, persisted)
+        return persisted
+
+    def _store(self, key: str, result: dict[str, Any]) -> None:
+        with self._lock:
+            self._remember_locked(key, result)
+        self.metrics.incr("writes")
+        if self.persistent is not None:
+            self.persistent.set(key, result)
+
+    def _remember_locked(self, key: str, result: dict[str, Any]) -> None:
+        self._entries[key] = (time.time() + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics.incr("evictions")
+
+
+def create_result_store(settings: Settings) -> ResultStore | None:
+    if settings.result_store_ttl_seconds <= 0:
+        return None
+    persistent = None
+    if settings.result_store_path:
+        persistent = SqliteCacheBackend(
+            path=str(_resolve_store_path(settings.result_store_path)),
+            ttl_seconds=settings.result_store_ttl_seconds,
+            max_bytes=PERSISTENT_MAX_BYTES,
+        )
+    return ResultStore(
+        ttl_seconds=settings.result_store_ttl_seconds,
+        max_entries=settings.result_store_max_entries,
+        persistent=persistent,
+    )
+
+
+def _resolve_store_path(raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path
+    return Path(__file__).resolve().parent / path
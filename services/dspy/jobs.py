@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import http.client
+import ipaddress
+import json
+import socket
+import sqlite3
+import ssl
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Protocol
+from urllib.parse import urlsplit
+
+from pydantic_core import to_json
+
+from models import ProcessReviewRequest
+from programs import ServiceError
+from settings import Settings
+
+
+# A RUNNING job untouched for this long belonged to a process that died; any worker may take it over.
+RUNNING_LEASE_SECONDS = 600
+# How often a runner renews the leases of the jobs it is running and looks for abandoned ones.
+HEARTBEAT_SECONDS = 60
+WEBHOOK_ATTEMPTS = 3
+WEBHOOK_TIMEOUT_SECONDS = 10.0
+PRIVATE_FIELDS = ("request", "callbackUrl")
+
+
+class JobStore(Protocol):
+    def create(self, job: dict[str, Any]) -> None: ...
+
+    def claim(self, job_id: str) -> dict[str, Any] | None:
+        """Move a queued (or abandoned running) job to RUNNING and return it, or None if another worker has it."""
+        ...
+
+    def renew(self, job_id: str) -> None:
+        """Extend the lease on a job this worker is running."""
+        ...
+
+    def update(self, job: dict[str, Any]) -> None: ...
+
+    def get(self, job_id: str) -> dict[str, Any] | None: ...
+
+    def resumable(self) -> list[str]: ...
+
+
+class MemoryJobStore:
+    """Process-local job store; jobs are lost on restart and invisible to sibling workers."""
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def create(self, job: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            while self._jobs and next(iter(self._jobs.values()))[0] + self.ttl_seconds < now:
+                self._jobs.popitem(last=False)
+            self._jobs[job["jobId"]] = (now, dict(job))
+
+    def claim(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None or entry[1]["status"] != "QUEUED":
+                return None
+            job = {**entry[1], "status": "RUNNING", "startedAtUtc": _now_iso()}
+            self._jobs[job_id] = (entry[0], job)
+            return dict(job)
+
+    def renew(self, job_id: str) -> None:
+        # No other process can see these jobs, so a lease never lapses.
+        return None
+
+    def update(self, job: dict[str, Any]) -> None:
+        with self._lock:
+            entry = self._jobs.get(job["jobId"])
+            if entry is not None:
+                self._jobs[job["jobId"]] = (entry[0], dict(job))
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is None or entry[0] + self.ttl_seconds < time.time():
+            return None
+        return dict(entry[1])
+
+    def resumable(self) -> list[str]:
+        return []
+
+
+class SqliteJobStore:
+    """Job store in a SQLite file, shared by every uvicorn worker opening the same path.
+
+    Claims are a conditional UPDATE, so exactly one worker runs each job. Runners renew the
+    leases of their running jobs, and jobs queued or abandoned by a process that exited are
+    picked up again by `resumable`.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS review_jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " record TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS review_jobs_status ON review_jobs (status, updated_at)")
+
+    def create(self, job: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM review_jobs WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "INSERT INTO review_jobs (job_id, status, record, updated_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (job["jobId"], job["status"], _encode(job), now, now + self.ttl_seconds),
+            )
+
+    def claim(self, job_id: str) -> dict[str, Any] | None:
+        job = self.get(job_id)
+        if job is None or job["status"] not in {"QUEUED", "RUNNING"}:
+            return None
+        job.update(status="RUNNING", startedAtUtc=_now_iso())
+        now = time.time()
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE review_jobs SET status = 'RUNNING', record = ?, updated_at = ?"
+                " WHERE job_id = ? AND (status = 'QUEUED' OR (status = 'RUNNING' AND updated_at < ?))",
+                (_encode(job), now, job_id, now - RUNNING_LEASE_SECONDS),
+            ).rowcount
+        return job if claimed == 1 else None
+
+    def renew(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE review_jobs SET updated_at = ? WHERE job_id = ? AND status = 'RUNNING'",
+                (time.time(), job_id),
+            )
+
+    def update(self, job: dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE review_jobs SET status = ?, record = ?, updated_at = ? WHERE job_id = ?",
+                (job["status"], _encode(job), time.time(), job["jobId"]),
+            )
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM review_jobs WHERE job_id = ? AND expires_at >= ?",
+                (job_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def resumable(self) -> list[str]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM review_jobs WHERE expires_at >= ?"
+                " AND (status = 'QUEUED' OR (status = 'RUNNING' AND updated_at < ?)) ORDER BY updated_at",
+                (now, now - RUNNING_LEASE_SECONDS),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class JobRunner:
+    """Runs submitted process requests on a worker pool and records them in a `JobStore`.
+
+    Callers get a job id at once and either poll it or receive a signed webhook when the
+    job reaches COMPLETED or FAILED. A heartbeat thread renews the leases of running jobs
+    and takes over jobs that other processes left queued or stopped renewing.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        process: Callable[[ProcessReviewRequest], dict[str, Any]],
+        max_workers: int,
+        webhook_secret: str,
+        callback_allowed_hosts: tuple[str, ...] = (),
+        send: Callable[[str, str, bytes, dict[str, str]], int] | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        resolve: Callable[[str], list[str]] | None = None,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+    ) -> None:
+        self.store = store
+        self.process = process
+        self.max_workers = max_workers
+        self.webhook_secret = webhook_secret
+        self.callback_allowed_hosts = callback_allowed_hosts
+        self.send = send or _post
+        self.sleep = sleep
+        self.resolve = resolve or _resolve_host
+        self.heartbeat_seconds = heartbeat_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="review-job")
+        self._lock = threading.Lock()
+        # Jobs handed to the pool but not yet claimed, and jobs this runner is running.
+        self._queued: set[str] = set()
+        self._running: set[str] = set()
+        threading.Thread(target=self._beat_forever, name="review-job-heartbeat", daemon=True).start()
+
+    def submit(self, request: ProcessReviewRequest, callback_url: str | None = None) -> dict[str, Any]:
+        if callback_url:
+            self.check_callback_url(callback_url)
+        job = {
+            "jobId": str(uuid.uuid4()),
+            "status": "QUEUED",
+            "submittedAtUtc": _now_iso(),
+            "startedAtUtc": None,
+            "completedAtUtc": None,
+            "result": None,
+            "error": None,
+            "callbackStatus": None,
+            "request": request.model_dump_json(),
+            "callbackUrl": callback_url,
+        }
+        self.store.create(job)
+        self._schedule(job["jobId"])
+        return _public(job)
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        job = self.store.get(job_id)
+        return _public(job) if job is not None else None
+
+    def heartbeat(self) -> None:
+        """Renew the leases of running jobs, then queue any job that is waiting or was abandoned."""
+        with self._lock:
+            running = list(self._running)
+        for job_id in running:
+            self.store.renew(job_id)
+        for job_id in self.store.resumable():
+            self._schedule(job_id)
+
+    def check_callback_url(self, url: str) -> list[str]:
+        """Raise unless callbacks are signed and `url` is an allowed host with only public addresses; return them."""
+        if not self.webhook_secret:
+            raise ServiceError("INVALID_REQUEST", "callbackUrl needs DSPY_JOB_WEBHOOK_SECRET to be configured.", 400)
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        if parts.scheme not in {"http", "https"} or not host:
+            raise ServiceError("INVALID_REQUEST", "callbackUrl must be an http(s) URL.", 400)
+        if not _host_allowed(host, self.callback_allowed_hosts):
+            raise ServiceError("INVALID_REQUEST", "callbackUrl host is not in DSPY_JOB_CALLBACK_ALLOWED_HOSTS.", 400)
+        addresses = self.resolve(host)
+        if not addresses or not all(ipaddress.ip_address(address).is_global for address in addresses):
+            raise ServiceError("INVALID_REQUEST", "callbackUrl must resolve only to public addresses.", 400)
+        return addresses
+
+    def _schedule(self, job_id: str) -> None:
+        with self._lock:
+            if job_id in self._queued or job_id in self._running:
+                return
+            self._queued.add(job_id)
+        self._pool.submit(self._execute, job_id)
+
+    def _beat_forever(self) -> None:
+        while True:
+            try:
+                self.heartbeat()
+            except Exception:  # noqa: BLE001
+                # A store error (e.g. a locked database) is retried on the next beat.
+                pass
+            time.sleep(self.heartbeat_seconds)
+
+    def _execute(self, job_id: str) -> None:
+        with self._lock:
+            self._queued.discard(job_id)
+        job = self.store.claim(job_id)
+        if job is None:
+            return
+        with self._lock:
+            self._running.add(job_id)
+        try:
+            self._run(job)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+
+    def _run(self, job: dict[str, Any]) -> None:
+        try:
+            result = self.process(ProcessReviewRequest.model_validate_json(job["request"]))
+            job.update(status="COMPLETED", result=result)
+        except ServiceError as exc:
+            job.update(status="FAILED", error=exc.payload())
+        except Exception:  # noqa: BLE001
+            job.update(status="FAILED", error=ServiceError("INTERNAL_ERROR", "Unhandled job error", 500).payload())
+        job["completedAtUtc"] = _now_iso()
+        self.store.update(job)
+
+        if job["callbackUrl"]:
+            job["callbackStatus"] = "DELIVERED" if self._deliver(job) else "FAILED"
+            self.store.update(job)
+
+    def _deliver(self, job: dict[str, Any]) -> bool:
+        try:
+            # Checked again at delivery: the host's DNS may have changed since the job was submitted.
+            # The POST then goes to the address just checked, so a second lookup cannot rebind it.
+            address = self.check_callback_url(job["callbackUrl"])[0]
+        except ServiceError:
+            return False
+        body = to_json(_public(job))
+        for attempt in range(WEBHOOK_ATTEMPTS):
+            timestamp = str(int(time.time()))
+            headers = {
+                "content-type": "application/json",
+                "x-dspy-job-id": job["jobId"],
+                "x-dspy-timestamp": timestamp,
+                "x-dspy-signature": f"v1={sign_webhook(self.webhook_secret, timestamp, body)}",
+            }
+            status = self.send(job["callbackUrl"], address, body, headers)
+            if 200 <= status < 300:
+                return True
+            # Redirects are not followed, and other client errors mean the receiver rejected the
+            # payload; repeating either cannot help.
+            if 300 <= status < 500 and status not in {408, 429}:
+                return False
+            if attempt < WEBHOOK_ATTEMPTS - 1:
+                self.sleep(2 ** attempt)
+        return False
+
+
+def sign_webhook(secret: str, timestamp: str, body: bytes) -> str:
+    """Hex HMAC-SHA256 over `<timestamp>.<body>`; receivers recompute it and reject stale timestamps."""
+    return hmac.new(secret.encode("utf-8"), timestamp.encode("ascii") + b"." + body, hashlib.sha256).hexdigest()
+
+
+def create_job_runner(settings: Settings, process: Callable[[ProcessReviewRequest], dict[str, Any]]) -> JobRunner:
+    store: JobStore
+    if settings.job_store_path:
+        store = SqliteJobStore(str(_resolve_store_path(settings.job_store_path)), ttl_seconds=settings.job_ttl_seconds)
+    else:
+        store = MemoryJobStore(ttl_seconds=settings.job_ttl_seconds)
+    return JobRunner(
+        store,
+        process,
+        max_workers=settings.job_workers,
+        webhook_secret=settings.job_webhook_secret,
+        callback_allowed_hosts=settings.job_callback_allowed_hosts,
+    )
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """Connects to a given address while the Host header still names the URL's host."""
+
+    def __init__(self, host: str, port: int | None, address: str, timeout: float) -> None:
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+
+    def connect(self) -> None:
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """Connects to a given address; SNI and certificate checks still use the URL's host."""
+
+    def __init__(self, host: str, port: int | None, address: str, timeout: float) -> None:
+        super().__init__(host, port, timeout=timeout, context=ssl.create_default_context())
+        self.address = address
+
+    def connect(self) -> None:
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def _post(url: str, address: str, body: bytes, headers: dict[str, str]) -> int:
+    """POST to `url` over a connection to `address`; redirects are returned, never followed."""
+    parts = urlsplit(url)
+    connection_type = _PinnedHTTPSConnection if parts.scheme == "https" else _PinnedHTTPConnection
+    connection = connection_type(parts.hostname or "", parts.port, address, timeout=WEBHOOK_TIMEOUT_SECONDS)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    try:
+        connection.request("POST", path, body=body, headers=headers)
+        return connection.getresponse().status
+    except (OSError, http.client.HTTPException):
+        return 0
+    finally:
+        connection.close()
+
+
+def _resolve_host(host: str) -> list[str]:
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except OSError:
+        return []
+    # Drop any IPv6 zone suffix (`fe80::1%eth0`), which `ip_address` does not parse.
+    return [str(info[4][0]).split("%", 1)[0] for info in infos]
+
+
+def _host_allowed(host: str, allowed_hosts: tuple[str, ...]) -> bool:
+    """`*` allows any host, `.example.com` any subdomain of example.com, other entries one exact host."""
+    return any(
+        entry == "*" or host == entry or (entry.startswith(".") and host.endswith(entry))
+        for entry in allowed_hosts
+    )
+
+
+def _public(job: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in job.items() if key not in PRIVATE_FIELDS}
+
+
+def _encode(job: dict[str, Any]) -> str:
+    return json.dumps(job, separators=(",", ":"))
+
+
+def _resolve_store_path(raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path
+    return Path(__file__).resolve().parent / path
+
+
+def _now_iso() -> str:
+    return datetime.now(UTC).isoformat()
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+import dspy
+
+from settings import Settings
+
+
+SHARED_CACHE_BACKENDS = {"none", "sqlite", "redis"}
+COMPRESSION_LEVEL = 6
+EVICTION_CHECK_INTERVAL = 32
+
+
+class RedisLike(Protocol):
+    def get(self, name: str) -> bytes | None: ...
+
+    def set(self, name: str, value: bytes, ex: int | None = None) -> Any: ...
+
+    def delete(self, *names: str) -> Any: ...
+
+
+@dataclass
+class CacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    expired: int = 0
+    errors: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "errors": self.errors,
+            }
+
+
+class SqliteCacheBackend:
+    """Cross-process LM response cache stored in a single SQLite file.
+
+    Every uvicorn worker opening the same path shares entries; WAL mode keeps
+    concurrent readers from blocking the writer.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_bytes: int, metrics: CacheMetrics | None = None) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.metrics = metrics or CacheMetrics()
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connect()
+        # A pre-forked worker (`prefork.py`) must not keep using the parent's SQLite handle.
+        os.register_at_fork(after_in_child=self._reopen)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT expires_at FROM lm_cache WHERE key = ?", (key,)).fetchone()
+        return row is not None and not _is_expired(row[0])
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT value, expires_at FROM lm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and _is_expired(row[1]):
+                    self._conn.execute("DELETE FROM lm_cache WHERE key = ?", (key,))
+                    self.metrics.incr("expired")
+                    row = None
+                if row is not None:
+                    self._conn.execute("UPDATE lm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error:
+            self.metrics.incr("errors")
+            return default
+
+        if row is None:
+            self.metrics.incr("misses")
+            return default
+        try:
+            value = _decode(row[0])
+        except Exception:  # noqa: BLE001
+            self.metrics.incr("errors")
+            self.delete(key)
+            return default
+        self.metrics.incr("hits")
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        payload = _encode(value)
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds > 0 else None
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO lm_cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), expires_at, now),
+                )
+                self._writes_since_eviction += 1
+                if self._writes_since_eviction >= EVICTION_CHECK_INTERVAL:
+                    self._writes_since_eviction = 0
+                    self._evict_locked(now)
+        except sqlite3.Error:
+            self.metrics.incr("errors")
+            return
+        self.metrics.incr("writes")
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM lm_cache WHERE key = ?", (key,))
+        except sqlite3.Error:
+            self.metrics.incr("errors")
+
+    def _evict_locked(self, now: float) -> None:
+        expired = self._conn.execute(
+            "DELETE FROM lm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        ).rowcount
+        if expired > 0:
+            self.metrics.incr("expired", expired)
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM lm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until the file is back under its budget.
+        overflow = total - self.max_bytes
+        evicted = 0
+        freed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM lm_cache ORDER BY accessed_at ASC").fetchall():
+            if freed >= overflow:
+                break
+            self._conn.execute("DELETE FROM lm_cache WHERE key = ?", (key,))
+            freed += size
+            evicted += 1
+        self.metrics.incr("evictions", evicted)
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS lm_cache_accessed_at ON lm_cache (accessed_at)")
+
+    def _reopen(self) -> None:
+        self._lock = threading.Lock()
+        self._connect()
+
+
+class RedisCacheBackend:
+    """LM response cache backed by any client exposing Redis `get`/`set(ex=)`/`delete`.
+
+    Size-based eviction is delegated to the server (`maxmemory` + an LRU policy).
+    """
+
+    def __init__(self, client: RedisLike, ttl_seconds: int, prefix: str = "dspy:lm:", metrics: CacheMetrics | None = None) -> None:
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.metrics = metrics or CacheMetrics()
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            return self.client.get(self.prefix + key) is not None
+        except Exception:  # noqa: BLE001
+            self.metrics.incr("errors")
+            return False
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception:  # noqa: BLE001
+            self.metrics.incr("errors")
+            return default
+        if raw is None:
+            self.metrics.incr("misses")
+            return default
+        try:
+            value = _decode(raw)
+        except Exception:  # noqa: BLE001
+            self.metrics.incr("errors")
+            self.delete(key)
+            return default
+        self.metrics.incr("hits")
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            self.client.set(self.prefix + key, _encode(value), ex=self.ttl_seconds if self.ttl_seconds > 0 else None)
+        except Exception:  # noqa: BLE001
+            self.metrics.incr("errors")
+            return
+        self.metrics.incr("writes")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception:  # noqa: BLE001
+            self.metrics.incr("errors")
+
+
+def create_shared_cache_backend(settings: Settings) -> SqliteCacheBackend | RedisCacheBackend | None:
+    backend = settings.shared_cache_backend
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        return SqliteCacheBackend(
+            path=str(_resolve_cache_path(settings.shared_cache_path)),
+            ttl_seconds=settings.shared_cache_ttl_seconds,
+            max_bytes=settings.shared_cache_max_bytes,
+        )
+    if backend == "redis":
+        try:
+            import redis  # type: ignore[import-not-found]
+        except ImportError as exc:
+            raise RuntimeError("DSPY_SHARED_CACHE_BACKEND=redis requires the `redis` package.") from exc
+        if not settings.shared_cache_redis_url:
+            raise RuntimeError("DSPY_SHARED_CACHE_REDIS_URL is required when DSPY_SHARED_CACHE_BACKEND=redis")
+        return RedisCacheBackend(
+            client=redis.Redis.from_url(settings.shared_cache_redis_url),
+            ttl_seconds=settings.shared_cache_ttl_seconds,
+        )
+    raise RuntimeError(f"Unsupported shared cache backend: {backend}")
+
+
+def install_shared_cache(backend: SqliteCacheBackend | RedisCacheBackend) -> None:
+    # DSPy's second cache tier only needs a mapping with get/set/delete/__contains__,
+    # so the shared backend replaces the per-instance diskcache directory.
+    cache = getattr(dspy, "cache", None)
+    if cache is None:
+        raise RuntimeError("dspy.cache is unavailable; cannot install shared LM cache backend.")
+    cache.disk_cache = backend
+    cache.enable_disk_cache = True
+
+
+def _encode(value: Any) -> bytes:
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), COMPRESSION_LEVEL)
+
+
+def _decode(payload: bytes) -> Any:
+    return pickle.loads(zlib.decompress(payload))
+
+
+def _is_expired(expires_at: float | None) -> bool:
+    return expires_at is not None and expires_at <= time.time()
+
+
+def _resolve_cache_path(raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path
+    return Path(__file__).resolve().parent / path
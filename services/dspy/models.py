@@ -3,7 +3,7 @@ from __future__ import annotations
 from enum import Enum
 from typing import Literal, Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, HttpUrl, field_validator
 
 
 class EvidenceHighlight(BaseModel):
@@ -76,9 +76,47 @@ class ProcessReviewRequest(BaseModel):
         return trimmed if trimmed else None
 
 
+class ReviewJobRequest(ProcessReviewRequest):
+    callbackUrl: Optional[HttpUrl] = None
+
+
+class BatchVerifyItem(BaseModel):
+    reviewId: str = Field(min_length=1)
+    evidence: EvidenceSnapshot
+    candidateDraftText: str = Field(min_length=1)
+
+    @field_validator("candidateDraftText")
+    @classmethod
+    def normalize_draft_text(cls, value: str) -> str:
+        return value.strip()
+
+
+class BatchVerifyRequest(BaseModel):
+    orgId: str = Field(min_length=1)
+    items: list[BatchVerifyItem] = Field(min_length=1, max_length=50)
+    requestId: Optional[str] = None
+    execution: Optional[ProcessExecutionOverrides] = None
+
+
+class BulkProcessItem(BaseModel):
+    reviewId: str = Field(min_length=1)
+    evidence: EvidenceSnapshot
+    currentDraftText: Optional[str] = None
+
+
+class BulkProcessRequest(BaseModel):
+    orgId: str = Field(min_length=1)
+    items: list[BulkProcessItem] = Field(min_length=1, max_length=5000)
+    execution: Optional[ProcessExecutionOverrides] = None
+
+
 class ErrorResponse(BaseModel):
     error: str = Field(min_length=1)
     message: str = Field(min_length=1)
+    retryable: bool = False
+    retryAfterMs: Optional[int] = Field(default=None, ge=0)
+    stage: Optional[Literal["draft", "verify"]] = None
+    attempt: Optional[int] = Field(default=None, ge=1)
 
 
 class VerifierViolation(BaseModel):
@@ -107,6 +145,9 @@ class GenerationPayload(BaseModel):
     attempted: bool
     changed: bool
     attemptCount: int = Field(ge=1)
+    earlyRejected: bool = False
+    repairCount: int = Field(default=0, ge=0)
+    variant: Optional[Literal["fast", "reasoning"]] = None
 
 
 class ModelsPayload(BaseModel):
@@ -137,6 +178,17 @@ class SeoQualityPayload(BaseModel):
     missingRequiredKeywords: list[str] = Field(default_factory=list)
 
 
+class StageUsagePayload(BaseModel):
+    promptTokens: int = Field(ge=0)
+    completionTokens: int = Field(ge=0)
+    cachedPromptTokens: int = Field(ge=0)
+
+
+class UsagePayload(BaseModel):
+    draft: Optional[StageUsagePayload] = None
+    verify: Optional[StageUsagePayload] = None
+
+
 class ProcessReviewResponse(BaseModel):
     decision: Literal["READY", "BLOCKED_BY_VERIFIER"]
     draftText: str = Field(min_length=1)
@@ -146,4 +198,45 @@ class ProcessReviewResponse(BaseModel):
     program: ProgramPayload
     models: ModelsPayload
     trace: TracePayload
+    usage: Optional[UsagePayload] = None
+    latencyMs: int = Field(ge=0)
+
+
+class BatchVerifyItemResult(BaseModel):
+    reviewId: str = Field(min_length=1)
+    result: Optional[ProcessReviewResponse] = None
+    error: Optional[ErrorResponse] = None
+
+
+class BatchVerifyStats(BaseModel):
+    items: int = Field(ge=0)
+    batchSize: int = Field(ge=1)
+    batchCalls: int = Field(ge=0)
+    fallbacks: int = Field(ge=0)
+
+
+class BatchVerifyResponse(BaseModel):
+    results: list[BatchVerifyItemResult]
+    batch: BatchVerifyStats
     latencyMs: int = Field(ge=0)
+
+
+class BulkProcessResponse(BaseModel):
+    bulkId: str = Field(min_length=1)
+    status: Literal["RUNNING", "COMPLETED", "FAILED"]
+    items: int = Field(ge=1)
+    submittedAtUtc: str
+    completedAtUtc: Optional[str] = None
+    results: Optional[list[BatchVerifyItemResult]] = None
+    error: Optional[ErrorResponse] = None
+
+
+class ReviewJobResponse(BaseModel):
+    jobId: str = Field(min_length=1)
+    status: Literal["QUEUED", "RUNNING", "COMPLETED", "FAILED"]
+    submittedAtUtc: str
+    startedAtUtc: Optional[str] = None
+    completedAtUtc: Optional[str] = None
+    result: Optional[ProcessReviewResponse] = None
+    error: Optional[ErrorResponse] = None
+    callbackStatus: Optional[Literal["DELIVERED", "FAILED"]] = None
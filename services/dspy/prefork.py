@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import random
+import resource
+import signal
+import socket
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Any
+
+import uvicorn
+
+# A worker that dies this soon after forking is restarted with a pause, so a bad deploy
+# does not turn into a fork loop.
+MIN_WORKER_LIFETIME_SECONDS = 1.0
+POLL_SECONDS = 0.2
+# Uvicorn cancels outstanding requests at the graceful timeout; the master kills only after this margin.
+KILL_MARGIN_SECONDS = 5
+
+_worker: dict[str, Any] | None = None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pre-fork production server for the DSPy service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8787")))
+    parser.add_argument("--backlog", type=int, default=2048)
+    return parser.parse_args(argv)
+
+
+def worker_metadata() -> dict[str, Any]:
+    """This worker's launch timings and current memory, for `/api/healthz`."""
+    if _worker is None:
+        return {"enabled": False}
+    return {"enabled": True, **_worker, "memory": process_memory()}
+
+
+def process_memory() -> dict[str, float]:
+    """RSS, PSS and private (unshared) memory of this process in MiB.
+
+    Pages still shared copy-on-write with the parent count fully in RSS but only
+    proportionally in PSS; `privateMiB` is what the worker added on its own.
+    """
+    rollup = Path("/proc/self/smaps_rollup")
+    if not rollup.exists():
+        # No per-page accounting outside Linux; peak RSS is the best available.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rssMiB": round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)}
+    fields: dict[str, int] = {}
+    for line in rollup.read_text(encoding="utf-8").splitlines()[1:]:
+        name, _, value = line.partition(":")
+        fields[name] = int(value.split()[0])
+    return {
+        "rssMiB": round(fields.get("Rss", 0) / 1024, 1),
+        "pssMiB": round(fields.get("Pss", 0) / 1024, 1),
+        "privateMiB": round((fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1),
+    }
+
+
+def worker_count(configured: int) -> int:
+    if configured:
+        return configured
+    if hasattr(os, "sched_getaffinity"):
+        # Respects CPU pinning and container cpusets, unlike `os.cpu_count()`.
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class Arbiter:
+    """Preloads the app once, then forks and supervises uvicorn workers on a shared socket.
+
+    Signals to the master process:
+    - `SIGTERM` / `SIGINT`: stop every worker gracefully, killing stragglers after the timeout.
+    - `SIGHUP`: recycle the workers one at a time. Each replacement forks from the preloaded
+      master, so it comes up in milliseconds rather than re-importing DSPy.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        sock: socket.socket,
+        workers: int,
+        max_requests: int,
+        graceful_timeout: int,
+        preload_ms: float,
+    ) -> None:
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.graceful_timeout = graceful_timeout
+        self.preload_ms = preload_ms
+        self._children: dict[int, tuple[int, float]] = {}
+        self._recycle: list[int] = []
+        self._stopping = False
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_recycle)
+        for index in range(self.workers):
+            self._spawn(index)
+        while not self._stopping:
+            self._reap()
+            time.sleep(POLL_SECONDS)
+        self._shutdown()
+
+    def _spawn(self, index: int) -> None:
+        forked_at = time.monotonic()
+        pid = os.fork()
+        if pid:
+            self._children[pid] = (index, forked_at)
+            return
+        code = 0
+        try:
+            self._serve(index, forked_at)
+        except SystemExit as exc:
+            code = exc.code if isinstance(exc.code, int) else 1
+        except BaseException:  # noqa: BLE001
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            # Skip the master's exit handlers and cleanup; the worker owns none of them.
+            os._exit(code)
+
+    def _serve(self, index: int, forked_at: float) -> None:
+        global _worker
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # Jitter keeps workers that started together from all recycling at once.
+        limit = self.max_requests + random.randint(0, self.max_requests // 10) if self.max_requests else None
+        _worker = {
+            "pid": os.getpid(),
+            "index": index,
+            "preloadMs": self.preload_ms,
+            "startupMs": None,
+            "maxRequests": limit,
+        }
+
+        class WorkerServer(uvicorn.Server):
+            async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+                await super().startup(sockets=sockets)
+                _worker["startupMs"] = round((time.monotonic() - forked_at) * 1000, 1)
+                _log(
+                    f"worker {index} (pid {os.getpid()}) ready in {_worker['startupMs']} ms, "
+                    + ", ".join(f"{name} {value}" for name, value in process_memory().items())
+                )
+
+        config = uvicorn.Config(
+            self.app,
+            limit_max_requests=limit,
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+        WorkerServer(config).run(sockets=[self.sock])
+
+    def _reap(self) -> None:
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            index, forked_at = self._children.pop(pid)
+            code = os.waitstatus_to_exitcode(status)
+            lifetime = time.monotonic() - forked_at
+            _log(f"worker {index} (pid {pid}) exited with {code} after {lifetime:.1f}s")
+            if self._stopping:
+                continue
+            recycled = pid in self._recycle
+            # Uvicorn re-raises SIGTERM after its graceful shutdown, so recycled workers exit with -15.
+            if code != 0 and not recycled and lifetime < MIN_WORKER_LIFETIME_SECONDS:
+                time.sleep(MIN_WORKER_LIFETIME_SECONDS)
+            self._spawn(index)
+            if recycled:
+                # Only the head of the queue was signalled; a queued worker that exited on its
+                # own must not re-signal it, since uvicorn takes a second SIGTERM as force-exit.
+                draining = self._recycle[0] == pid
+                self._recycle.remove(pid)
+                if draining:
+                    self._recycle_next()
+
+    def _recycle_next(self) -> None:
+        while self._recycle:
+            pid = self._recycle[0]
+            if pid in self._children:
+                os.kill(pid, signal.SIGTERM)
+                return
+            self._recycle.pop(0)
+
+    def _shutdown(self) -> None:
+        for pid in list(self._children):
+            _signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout + KILL_MARGIN_SECONDS
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(POLL_SECONDS)
+        for pid in list(self._children):
+            _log(f"worker {self._children[pid][0]} (pid {pid}) did not stop in time; killing it")
+            _signal(pid, signal.SIGKILL)
+        while self._children:
+            pid, _ = os.waitpid(-1, 0)
+            self._children.pop(pid, None)
+
+    def _handle_stop(self, signum: int, frame: Any) -> None:  # noqa: ARG002
+        self._stopping = True
+
+    def _handle_recycle(self, signum: int, frame: Any) -> None:  # noqa: ARG002
+        if self._recycle:
+            return
+        _log(f"recycling {len(self._children)} workers")
+        self._recycle = list(self._children)
+        self._recycle_next()
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    started = time.monotonic()
+    # Everything the workers only read is built here once: imports, settings, programs and
+    # their artifacts, LM clients, token budget table and demo index.
+    import app as service
+    from settings import get_settings
+
+    settings = get_settings()
+    service.get_program_manager()
+    preload_ms = round((time.monotonic() - started) * 1000, 1)
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    workers = worker_count(settings.server_workers)
+    arbiter = Arbiter(
+        service.app,
+        sock,
+        workers=workers,
+        max_requests=settings.server_max_requests,
+        graceful_timeout=settings.server_graceful_timeout_seconds,
+        preload_ms=preload_ms,
+    )
+    _log(
+        f"preloaded in {preload_ms} ms ("
+        + ", ".join(f"{name} {value}" for name, value in process_memory().items())
+        + f"); starting {workers} workers on {args.host}:{args.port}"
+    )
+    # Move preloaded objects out of the collector's reach, so collections in the workers do
+    # not write to (and so copy) the pages they share with the master.
+    gc.freeze()
+    arbiter.run()
+
+
+def _signal(pid: int, signum: int) -> None:
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def _log(message: str) -> None:
+    print(f"[prefork {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    # Run through the importable module so `app` reads the same worker state from `worker_metadata()`.
+    from prefork import main as run_prefork
+
+    run_prefork()
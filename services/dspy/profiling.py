@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import cProfile
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from settings import Settings
+
+
+RECENT_SAMPLES = 100
+FUNCTIONS_PER_SAMPLE = 200
+
+
+class RequestProfiler:
+    """Sampled cProfile capture of process pipelines, written as `.prof` files.
+
+    Requests are picked at `sample_rate`, or on demand via the `x-dspy-profile` header when
+    `allow_header` is set. Only one request is profiled at a time (Python 3.12+ allows a
+    single active profiler per process); samples that arrive while one is running are skipped.
+    The last `RECENT_SAMPLES` are kept in memory for `summary`.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        sample_rate: float,
+        allow_header: bool,
+        max_files: int,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.allow_header = allow_header
+        self.max_files = max_files
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+        self._recent: deque[dict[str, Any]] = deque(maxlen=RECENT_SAMPLES)
+        self._counts = {"profiled": 0, "skipped": 0, "errors": 0}
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def should_profile(self, requested: bool = False) -> bool:
+        if requested and self.allow_header:
+            return True
+        with self._lock:
+            return self._rng.random() < self.sample_rate
+
+    def run(self, fn: Callable[[], dict[str, Any]], *, mode: str) -> dict[str, Any]:
+        if not self._active.acquire(blocking=False):
+            self._incr("skipped")
+            return fn()
+        profiler = cProfile.Profile()
+        result: dict[str, Any] | None = None
+        error: str | None = None
+        started_wall = time.perf_counter()
+        started_cpu = time.thread_time()
+        try:
+            profiler.enable()
+            try:
+                result = fn()
+            except BaseException as exc:
+                error = getattr(exc, "code", None) or type(exc).__name__
+                raise
+            finally:
+                profiler.disable()
+        finally:
+            wall_ms = (time.perf_counter() - started_wall) * 1000
+            cpu_ms = (time.thread_time() - started_cpu) * 1000
+            self._active.release()
+            self._record(profiler, mode=mode, result=result, error=error, wall_ms=wall_ms, cpu_ms=cpu_ms)
+        return result
+
+    def summary(self, limit: int = 25) -> dict[str, Any]:
+        with self._lock:
+            samples = list(self._recent)
+            counts = dict(self._counts)
+        wall_ms = sum(sample["wallMs"] for sample in samples)
+        cpu_ms = sum(sample["cpuMs"] for sample in samples)
+        totals: dict[str, list[float]] = {}
+        for sample in samples:
+            for name, (calls, self_ms, cumulative_ms) in sample["functions"].items():
+                total = totals.setdefault(name, [0, 0.0, 0.0, 0])
+                total[0] += calls
+                total[1] += self_ms
+                total[2] += cumulative_ms
+                total[3] += 1
+        hot = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return {
+            "enabled": True,
+            "sampleRate": self.sample_rate,
+            "allowHeader": self.allow_header,
+            "directory": str(self.directory),
+            **counts,
+            "samples": len(samples),
+            "wallMs": round(wall_ms, 1),
+            "cpuMs": round(cpu_ms, 1),
+            # Wall time the profiled thread spent off-CPU: mostly waiting on the LM provider.
+            "waitMs": round(max(wall_ms - cpu_ms, 0.0), 1),
+            "hotFunctions": [
+                {
+                    "function": name,
+                    "calls": int(calls),
+                    "selfMs": round(self_ms, 2),
+                    "cumulativeMs": round(cumulative_ms, 2),
+                    "selfShare": round(self_ms / wall_ms, 4) if wall_ms else 0.0,
+                    "samples": int(sample_count),
+                }
+                for name, (calls, self_ms, cumulative_ms, sample_count) in hot
+            ],
+            "recent": [
+                {key: value for key, value in sample.items() if key != "functions"}
+                for sample in reversed(samples[-20:])
+            ],
+        }
+
+    def _record(
+        self,
+        profiler: cProfile.Profile,
+        *,
+        mode: str,
+        result: dict[str, Any] | None,
+        error: str | None,
+        wall_ms: float,
+        cpu_ms: float,
+    ) -> None:
+        trace = (result or {}).get("trace") or {}
+        trace_id = trace.get("draftTraceId") or trace.get("verifyTraceId") or uuid.uuid4().hex
+        path = self.directory / f"{datetime.now(UTC).strftime('%Y%m%dT%H%M%S%f')}-{trace_id}.prof"
+        try:
+            stats = pstats.Stats(profiler)
+            profiler.dump_stats(str(path))
+            self._prune()
+        except Exception:  # noqa: BLE001
+            self._incr("errors")
+            return
+        ranked = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:FUNCTIONS_PER_SAMPLE]
+        sample = {
+            "capturedAtUtc": datetime.now(UTC).isoformat(),
+            "file": path.name,
+            "traceId": trace_id,
+            "mode": mode,
+            "error": error,
+            "wallMs": round(wall_ms, 1),
+            "cpuMs": round(cpu_ms, 1),
+            "functions": {
+                _function_label(key): (calls, self_seconds * 1000, cumulative_seconds * 1000)
+                for key, (_, calls, self_seconds, cumulative_seconds, _) in ranked
+            },
+        }
+        with self._lock:
+            self._recent.append(sample)
+            self._counts["profiled"] += 1
+
+    def _prune(self) -> None:
+        # File names start with a UTC timestamp, so name order is age order.
+        files = sorted(self.directory.glob("*.prof"))
+        for stale in files[: max(len(files) - self.max_files, 0)]:
+            stale.unlink(missing_ok=True)
+
+    def _incr(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+
+def create_request_profiler(settings: Settings) -> RequestProfiler | None:
+    if settings.profile_sample_rate <= 0 and not settings.profile_allow_header:
+        return None
+    return RequestProfiler(
+        directory=_resolve_profile_dir(settings.profile_dir),
+        sample_rate=settings.profile_sample_rate,
+        allow_header=settings.profile_allow_header,
+        max_files=settings.profile_max_files,
+    )
+
+
+def _function_label(key: tuple[str, int, str]) -> str:
+    filename, line, name = key
+    if filename == "~":
+        return name
+    path = Path(filename)
+    return f"{path.parent.name}/{path.name}:{line}({name})"
+
+
+def _resolve_profile_dir(raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path
+    return Path(__file__).resolve().parent / path
@@ -1,20 +1,51 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import re
+import threading
 import time
 import uuid
 import hashlib
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Any
+from typing import Any, Protocol
 
 import dspy
+import litellm
+from dspy.utils.exceptions import AdapterParseError, DSPyError
 
-from models import VerifierViolation
+import tracing
+from demo_index import create_demo_selector
+from draft_routing import FAST, create_draft_router
+from lm_cache import create_shared_cache_backend, install_shared_cache
 from settings import Settings
+from token_budget import TokenBudget, create_token_budget_policy, track_finish_reasons, watch_finish_reasons
 
 
+class BatchClient(Protocol):
+    """Provider batch API: submit chat requests, poll, then collect outputs keyed by `customId`.
+
+    Requests are `{customId, model, messages, temperature, maxTokens}`. `status` returns
+    `running`, `completed` or a terminal failure state. `results` maps each `customId` to
+    `{content, usage}` or `{error}`.
+    """
+
+    def submit(self, requests: list[dict[str, Any]]) -> str: ...
+
+    def status(self, batch_id: str) -> str: ...
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]: ...
+
+
+RETRYABLE_ERROR_CODES = frozenset({"MODEL_TIMEOUT", "MODEL_RATE_LIMIT"})
+
+_TRAILING_WORD_RE = re.compile(r"\w+$")
+
 BASE_POLICY_RULES = [
     "The reply must not claim actions were taken unless the review comment explicitly states it.",
     "The reply must not invent menu items, timing, staff names, refunds, fixes, or other specifics not present in evidence.comment.",
@@ -22,13 +53,65 @@ BASE_POLICY_RULES = [
     "Do not include private data, phone numbers, or fabricated compensation offers.",
 ]
 
+# Inputs that only vary per location (or not at all). The stable-prefix adapter emits
+# them ahead of per-review inputs so repeated prompts share a byte-identical prefix.
+STABLE_PREFIX_INPUT_FIELDS = ("policy_rules_json", "policy_json", "seo_brief")
+
+SEO_POLICY_RULES = [
+    "Use SEO targets naturally: include at least one required keyword when available, optional keywords only if relevant, and at most one geo term.",
+    "Never repeat keywords unnaturally or force phrases that do not match the review context.",
+]
+
+
+class StablePrefixJSONAdapter(dspy.JSONAdapter):
+    def format_user_message_content(
+        self,
+        signature: type[dspy.Signature],
+        inputs: dict[str, Any],
+        prefix: str = "",
+        suffix: str = "",
+        main_request: bool = False,
+    ) -> str:
+        return super().format_user_message_content(
+            _stable_input_order(signature),
+            inputs,
+            prefix=prefix,
+            suffix=suffix,
+            main_request=main_request,
+        )
+
 
 class ServiceError(Exception):
-    def __init__(self, code: str, message: str, status_code: int) -> None:
+    def __init__(
+        self,
+        code: str,
+        message: str,
+        status_code: int,
+        *,
+        retryable: bool | None = None,
+        retry_after_ms: int | None = None,
+        stage: str | None = None,
+        attempt: int | None = None,
+    ) -> None:
         super().__init__(message)
         self.code = code
         self.message = message
         self.status_code = status_code
+        self.retryable = code in RETRYABLE_ERROR_CODES if retryable is None else retryable
+        self.retry_after_ms = retry_after_ms
+        self.stage = stage
+        self.attempt = attempt
+
+    def payload(self) -> dict[str, Any]:
+        """The `ErrorResponse` body, including the hints schedulers use to decide whether and when to retry."""
+        return {
+            "error": self.code,
+            "message": self.message,
+            "retryable": self.retryable,
+            "retryAfterMs": self.retry_after_ms,
+            "stage": self.stage,
+            "attempt": self.attempt,
+        }
 
 
 class DraftSignature(dspy.Signature):
@@ -56,6 +139,40 @@ class VerifySignature(dspy.Signature):
     )
 
 
+class VerdictSignature(dspy.Signature):
+    """Evaluate whether the draft reply complies with policy, evidence, and SEO constraints without hallucinations."""
+
+    # Same fields, in the same order, as the head of VerifySignature: DSPy restores saved field
+    # descriptions by position, so the compiled verify artifact loads into this signature too.
+    evidence_json: str = dspy.InputField()
+    draft_text: str = dspy.InputField()
+    policy_json: str = dspy.InputField()
+    passed: bool = dspy.OutputField(desc="True only when the draft is compliant.")
+    violations: list[dict[str, str]] = dspy.OutputField(desc="List of policy violations with code/message/snippet.")
+
+
+class RewriteSignature(dspy.Signature):
+    """Rewrite a draft reply that failed verification so it fixes every listed violation, using evidence only."""
+
+    evidence_json: str = dspy.InputField()
+    draft_text: str = dspy.InputField()
+    policy_json: str = dspy.InputField()
+    violations_json: str = dspy.InputField(desc="Violations found in draft_text, as a JSON list of {code, message, snippet}.")
+    suggested_rewrite: str = dspy.OutputField(desc="Safer rewrite. Reply text only. No markdown, no JSON wrappers.")
+
+
+class BatchVerifySignature(dspy.Signature):
+    """Evaluate each draft reply in items_json independently against policy_rules_json and that item's own evidence and SEO targets, without hallucinations. Return exactly one verdict per item id."""
+
+    policy_rules_json: str = dspy.InputField(
+        desc="Rules shared by every item. SEO rules apply only to items with non-empty seoTargets."
+    )
+    items_json: str = dspy.InputField(desc="JSON list of {id, evidence, draftText, seoTargets}.")
+    verdicts: list[dict[str, Any]] = dspy.OutputField(
+        desc="One entry per item: {id, passed, violations: [{code, message, snippet}], suggested_rewrite}."
+    )
+
+
 class DraftProgram(dspy.Module):
     def __init__(self) -> None:
         super().__init__()
@@ -67,17 +184,34 @@ class DraftProgram(dspy.Module):
         seo_brief: str,
         previous_draft_text: str = "",
         regeneration_attempt: int = 1,
+        max_tokens: int | None = None,
+        demos: list[dspy.Example] | None = None,
     ) -> str:
         prediction = self.generate(
             evidence_json=evidence_json,
             seo_brief=seo_brief,
             previous_draft_text=previous_draft_text,
             regeneration_attempt=regeneration_attempt,
+            **_lm_config(max_tokens),
+            **_demo_config(demos),
+        )
+        return _draft_reply_text(prediction)
+
+    def stream(self, **kwargs: Any) -> AsyncIterator[Any]:
+        # Listeners keep per-stream parse state, so each call gets a fresh one.
+        streaming_generate = dspy.streamify(
+            self.generate,
+            stream_listeners=[dspy.streaming.StreamListener(signature_field_name="reply")],
         )
-        text = str(getattr(prediction, "reply", "")).strip()
-        if not text:
-            raise ServiceError("MODEL_SCHEMA_ERROR", "DSPy draft output was empty.", 502)
-        return text
+        return streaming_generate(**kwargs)
+
+
+class FastDraftProgram(DraftProgram):
+    """Draft variant that answers directly, without the reasoning tokens `ChainOfThought` spends."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.generate = dspy.Predict(DraftSignature)
 
 
 class VerifyProgram(dspy.Module):
@@ -90,25 +224,143 @@ class VerifyProgram(dspy.Module):
         evidence_json: str,
         draft_text: str,
         policy_json: str | None = None,
+        max_tokens: int | None = None,
+        demos: list[dspy.Example] | None = None,
     ) -> dict[str, Any]:
         prediction = self.verify(
             evidence_json=evidence_json,
             draft_text=draft_text,
             policy_json=policy_json or json.dumps({"rules": BASE_POLICY_RULES}, separators=(",", ":")),
+            **_lm_config(max_tokens),
+            **_demo_config(demos),
         )
-        violations = _normalize_violations(getattr(prediction, "violations", []))
-        return {
-            "pass": bool(getattr(prediction, "passed", False)),
-            "violations": violations,
-            "suggestedRewrite": _normalize_optional_text(getattr(prediction, "suggested_rewrite", "")),
-        }
+        return _verifier_payload(prediction)
+
+
+class LeanVerifyProgram(dspy.Module):
+    """Verify in two phases: a compact pass/fail verdict, then a rewrite only for failing drafts.
+
+    Passing drafts, the common case, no longer pay for an empty `suggested_rewrite` field.
+    The verdict predictor is named like `VerifyProgram`'s so the compiled verify artifact
+    loads into it; the rewrite predictor runs zero-shot.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.verify = dspy.Predict(VerdictSignature)
+
+    def forward(
+        self,
+        evidence_json: str,
+        draft_text: str,
+        policy_json: str | None = None,
+        max_tokens: int | None = None,
+        demos: list[dspy.Example] | None = None,
+    ) -> dict[str, Any]:
+        prediction = self.verify(
+            evidence_json=evidence_json,
+            draft_text=draft_text,
+            policy_json=policy_json or json.dumps({"rules": BASE_POLICY_RULES}, separators=(",", ":")),
+            **_lm_config(max_tokens),
+            **_demo_config(demos),
+        )
+        return _verifier_payload(prediction)
+
+
+class RewriteProgram(dspy.Module):
+    def __init__(self) -> None:
+        super().__init__()
+        self.rewrite = dspy.Predict(RewriteSignature)
+
+    def forward(
+        self,
+        evidence_json: str,
+        draft_text: str,
+        policy_json: str,
+        violations: list[dict[str, str]],
+        max_tokens: int | None = None,
+    ) -> str | None:
+        prediction = self.rewrite(
+            evidence_json=evidence_json,
+            draft_text=draft_text,
+            policy_json=policy_json,
+            violations_json=json.dumps(violations, separators=(",", ":")),
+            **_lm_config(max_tokens),
+        )
+        return _normalize_optional_text(getattr(prediction, "suggested_rewrite", ""))
+
+
+@dataclass(frozen=True)
+class ReviewContext:
+    mode: str
+    evidence_json: str
+    evidence: dict[str, Any]
+    policy: dict[str, Any]
+    policy_json: str
+    seo_brief: str
+    program_version: str
+    draft_model_name: str
+    verify_model_name: str
+    draft_lm: dspy.LM
+    verify_lm: dspy.LM
+    started: float
+    draft_variant: str
+    draft_demos: list[dspy.Example] | None = None
+    usage: dict[str, dict[str, int]] = field(default_factory=dict)
+
+
+class BatchVerifyProgram(dspy.Module):
+    def __init__(self) -> None:
+        super().__init__()
+        self.verify = dspy.Predict(BatchVerifySignature)
+
+    def forward(
+        self,
+        items: list[dict[str, Any]],
+        max_tokens: int | None = None,
+    ) -> dict[str, dict[str, Any] | None]:
+        """Return verifier payloads keyed by item id; `None` marks an item whose verdict was missing or ambiguous."""
+        prediction = self.verify(
+            policy_rules_json=json.dumps({"rules": [*BASE_POLICY_RULES, *SEO_POLICY_RULES]}, separators=(",", ":")),
+            items_json=json.dumps(items, separators=(",", ":")),
+            **_lm_config(max_tokens),
+        )
+        raw_verdicts = getattr(prediction, "verdicts", [])
+        if isinstance(raw_verdicts, str):
+            try:
+                raw_verdicts = json.loads(raw_verdicts)
+            except json.JSONDecodeError:
+                raw_verdicts = []
+        if not isinstance(raw_verdicts, list):
+            raw_verdicts = []
+
+        grouped: dict[str, list[dict[str, Any]]] = {}
+        for verdict in raw_verdicts:
+            if isinstance(verdict, dict) and verdict.get("id") is not None:
+                grouped.setdefault(str(verdict["id"]), []).append(verdict)
+
+        results: dict[str, dict[str, Any] | None] = {}
+        for item in items:
+            matches = grouped.get(item["id"], [])
+            if len(matches) != 1 or not isinstance(matches[0].get("passed"), bool):
+                results[item["id"]] = None
+                continue
+            verdict = matches[0]
+            results[item["id"]] = {
+                "pass": verdict["passed"],
+                "violations": _normalize_violations(verdict.get("violations", [])),
+                "suggestedRewrite": _normalize_optional_text(verdict.get("suggested_rewrite")),
+            }
+        return results
 
 
 class ProgramManager:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(self, settings: Settings, lm_factory: Callable[..., dspy.BaseLM] | None = None) -> None:
         self.settings = settings
+        self.lm_factory = lm_factory or _create_lm
         self.program_version = settings.program_version
         self.draft_artifact_version = _artifact_version(settings.draft_artifact_path)
+        self.fast_draft_artifact_version = _artifact_version(settings.fast_draft_artifact_path)
         self.verify_artifact_version = _artifact_version(settings.verify_artifact_path)
 
         os.environ.setdefault("OPENAI_API_KEY", settings.openai_api_key)
@@ -119,40 +371,128 @@ class ProgramManager:
                 enable_memory_cache=settings.enable_memory_cache,
                 memory_max_entries=settings.memory_cache_max_entries,
             )
+        self.shared_cache = create_shared_cache_backend(settings)
+        if self.shared_cache is not None:
+            install_shared_cache(self.shared_cache)
+        self.tracer = tracing.create_tracer(settings)
+        if self.tracer is not None:
+            tracing.install_tracer(self.tracer)
+
+        self.token_budget = create_token_budget_policy(settings)
+        self.demo_selector = create_demo_selector(settings)
 
-        self.draft_lm = dspy.LM(
+        self.draft_lm = track_finish_reasons(self.lm_factory(
             settings.draft_model,
             temperature=settings.draft_temperature,
             max_tokens=settings.draft_max_tokens,
             cache=True,
             num_retries=settings.num_retries,
-        )
-        self.verify_lm = dspy.LM(
+        ))
+        self.verify_lm = track_finish_reasons(self.lm_factory(
             settings.verify_model,
             temperature=settings.verify_temperature,
             max_tokens=settings.verify_max_tokens,
             cache=True,
             num_retries=settings.num_retries,
-        )
-        self.adapter = _create_json_adapter()
+        ))
+        self.adapter = _create_json_adapter(stable_prefix=settings.stable_prompt_prefix)
+        self._usage_lock = threading.Lock()
+        self._usage_totals = {"promptTokens": 0, "completionTokens": 0, "cachedPromptTokens": 0}
+        self._verify_totals = {
+            outcome: {"calls": 0, "rewriteCalls": 0, "completionTokens": 0, "latencyMs": 0.0}
+            for outcome in ("passing", "failing")
+        }
 
-        dspy.configure(lm=self.verify_lm, adapter=self.adapter)
+        dspy.configure(lm=self.verify_lm, adapter=self.adapter, callbacks=tracing.lm_callbacks())
 
         self.draft_program = DraftProgram()
+        self.fast_draft_program = FastDraftProgram()
+        self.draft_router = create_draft_router(settings)
         self.verify_program = VerifyProgram()
+        self.lean_verify_program = LeanVerifyProgram()
+        self.rewrite_program = RewriteProgram()
+        self.batch_verify_program = BatchVerifyProgram()
         self._draft_lm_cache: dict[str, dspy.LM] = {settings.draft_model: self.draft_lm}
         self._verify_lm_cache: dict[str, dspy.LM] = {settings.verify_model: self.verify_lm}
 
         _maybe_load_program(self.draft_program, settings.draft_artifact_path)
+        _maybe_load_program(self.fast_draft_program, settings.fast_draft_artifact_path)
         _maybe_load_program(self.verify_program, settings.verify_artifact_path)
+        if settings.verify_mode == "lean":
+            _maybe_load_program(self.lean_verify_program, settings.verify_artifact_path)
 
     def program_metadata(self) -> dict[str, str]:
         return {
             "version": self.program_version,
             "draftArtifactVersion": self.draft_artifact_version,
+            "fastDraftArtifactVersion": self.fast_draft_artifact_version,
             "verifyArtifactVersion": self.verify_artifact_version,
         }
 
+    def cache_metadata(self) -> dict[str, Any]:
+        if self.shared_cache is None:
+            return {"backend": "none"}
+        return {
+            "backend": self.settings.shared_cache_backend,
+            **self.shared_cache.metrics.snapshot(),
+        }
+
+    def prompt_cache_metadata(self) -> dict[str, Any]:
+        with self._usage_lock:
+            totals = dict(self._usage_totals)
+        prompt_tokens = totals["promptTokens"]
+        return {
+            "stablePrefix": self.settings.stable_prompt_prefix,
+            **totals,
+            "cachedPromptRatio": round(totals["cachedPromptTokens"] / prompt_tokens, 4) if prompt_tokens else 0.0,
+        }
+
+    def verify_metadata(self) -> dict[str, Any]:
+        """Verify cost split by verdict; compare `passing` across modes to see what lean verify saves."""
+        with self._usage_lock:
+            totals = {outcome: dict(values) for outcome, values in self._verify_totals.items()}
+        for values in totals.values():
+            calls = values["calls"]
+            values["latencyMs"] = round(values["latencyMs"], 1)
+            values["meanCompletionTokens"] = round(values["completionTokens"] / calls, 1) if calls else 0.0
+            values["meanLatencyMs"] = round(values["latencyMs"] / calls, 1) if calls else 0.0
+        return {"mode": self.settings.verify_mode, **totals}
+
+    def _record_usage(self, context: ReviewContext, stage: str, totals: dict[str, dict[str, Any]]) -> None:
+        summary = summarize_usage(totals)
+        stage_usage = context.usage.setdefault(stage, dict.fromkeys(summary, 0))
+        for key, value in summary.items():
+            stage_usage[key] += value
+        with self._usage_lock:
+            for key, value in summary.items():
+                self._usage_totals[key] += value
+
+    def _call_with_budget(self, budget: TokenBudget, call: Callable[..., Any]) -> Any:
+        """Run `call(max_tokens=...)` under `budget`, once more at the ceiling if the completion was cut off.
+
+        A clipped completion either fails JSON parsing or yields a reply that ends mid-sentence,
+        so a truncated call below the ceiling is repeated rather than returned.
+        """
+        failure: Exception | None = None
+        with watch_finish_reasons() as finish_reasons:
+            try:
+                output = call(max_tokens=budget.tokens)
+            except Exception as exc:  # noqa: BLE001
+                failure = exc
+        truncated = self.token_budget.record(budget, finish_reasons)
+        tracing.annotate(**{"lm.max_tokens": budget.tokens, "lm.budget_bucket": budget.bucket, "lm.truncated": truncated})
+        if truncated and budget.tokens < budget.ceiling:
+            ceiling = budget.at_ceiling()
+            with watch_finish_reasons() as finish_reasons:
+                try:
+                    return call(max_tokens=ceiling.tokens)
+                finally:
+                    self.token_budget.record(ceiling, finish_reasons, retry=True)
+                    tracing.annotate(**{"lm.max_tokens": ceiling.tokens, "lm.budget_retried": True})
+        if failure is not None:
+            raise failure
+        return output
+
     def process_review(
         self,
         mode: str,
@@ -161,10 +501,501 @@ class ProgramManager:
         candidate_draft_text: str | None = None,
         execution_overrides: dict[str, str] | None = None,
     ) -> dict[str, Any]:
+        with tracing.span("review.process", **{"review.mode": mode}):
+            try:
+                context = self._prepare_review(mode, evidence_json, execution_overrides)
+                generation = _new_generation(attempted=False)
+                draft_trace_id: str | None = None
+                draft_ms: float | None = None
+                if context.mode == "VERIFY_EXISTING_DRAFT":
+                    draft_text = _require_candidate_draft(candidate_draft_text)
+                else:
+                    generation["attempted"] = True
+                    generation["variant"] = context.draft_variant
+                    current_text = (current_draft_text or "").strip()
+                    draft_text = ""
+                    budget = self.token_budget.draft(context.evidence, context.mode)
+                    draft_started = time.perf_counter()
+                    for attempt in range(1, _max_draft_attempts(current_text) + 1):
+                        draft_trace_id = str(uuid.uuid4())
+                        with (
+                            tracing.span("review.draft", **_draft_span_attributes(context, attempt, draft_trace_id)),
+                            _model_call("draft", attempt),
+                            dspy.context(lm=context.draft_lm, adapter=self.adapter),
+                            dspy.track_usage() as usage,
+                        ):
+                            candidate = self._call_with_budget(budget, partial(
+                                self._generate_draft, context, current_text, attempt
+                            ))
+                            tracing.annotate(**_usage_span_attributes(usage.get_total_tokens()))
+                        self._record_usage(context, "draft", usage.get_total_tokens())
+                        draft_text = candidate.strip()
+                        if _accept_draft(current_text, draft_text, attempt, generation):
+                            break
+
+                    if not draft_text:
+                        raise ServiceError("MODEL_SCHEMA_ERROR", "DSPy draft output was empty.", 502)
+                    draft_ms = (time.perf_counter() - draft_started) * 1000
+
+                result = self._finalize_review(context, draft_text, generation, draft_trace_id)
+                self._record_route(context, result, draft_ms)
+                return result
+            except Exception as exc:  # noqa: BLE001
+                if isinstance(exc, ServiceError):
+                    raise
+                raise _map_model_error(exc) from exc
+
+    async def stream_process_review(
+        self,
+        mode: str,
+        evidence_json: str,
+        current_draft_text: str | None = None,
+        candidate_draft_text: str | None = None,
+        execution_overrides: dict[str, str] | None = None,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """Yield `(event, payload)` pairs: `token`/`draft` while drafting, then a terminal `result`."""
+        with tracing.span("review.process", **{"review.mode": mode, "review.stream": True}):
+            try:
+                context = self._prepare_review(mode, evidence_json, execution_overrides)
+                generation = _new_generation(attempted=False)
+                draft_trace_id: str | None = None
+                draft_ms: float | None = None
+                if context.mode == "VERIFY_EXISTING_DRAFT":
+                    draft_text = _require_candidate_draft(candidate_draft_text)
+                else:
+                    generation["attempted"] = True
+                    generation["variant"] = context.draft_variant
+                    current_text = (current_draft_text or "").strip()
+                    draft_text = ""
+                    budget = self.token_budget.draft(context.evidence, context.mode)
+                    draft_started = time.perf_counter()
+                    max_attempts = _max_draft_attempts(current_text)
+                    for attempt in range(1, max_attempts + 1):
+                        draft_trace_id = str(uuid.uuid4())
+                        prediction = None
+                        partial_text = ""
+                        reply_stream = _JsonStringStream()
+                        truncated = False
+                        abandoned = False
+                        with (
+                            tracing.span("review.draft", **_draft_span_attributes(context, attempt, draft_trace_id)),
+                            _model_call("draft", attempt),
+                            dspy.context(lm=context.draft_lm, adapter=self.adapter),
+                            dspy.track_usage() as usage,
+                            watch_finish_reasons() as finish_reasons,
+                        ):
+                            stream = _cancellable(self._draft_program(context).stream(
+                                evidence_json=context.evidence_json,
+                                seo_brief=context.seo_brief,
+                                previous_draft_text=current_text,
+                                regeneration_attempt=attempt,
+                                **_lm_config(budget.tokens),
+                                **_demo_config(context.draft_demos),
+                            ))
+                            try:
+                                async for chunk in stream:
+                                    if isinstance(chunk, dspy.Prediction):
+                                        prediction = chunk
+                                    elif isinstance(chunk, dspy.streaming.StreamResponse) and chunk.chunk:
+                                        text = reply_stream.feed(chunk.chunk)
+                                        if not text:
+                                            continue
+                                        partial_text += text
+                                        yield "token", {"attempt": attempt, "text": text}
+                                        # The last attempt always runs to completion, so a reply cut off
+                                        # mid-sentence never becomes the draft.
+                                        if (
+                                            self.settings.early_seo_reject
+                                            and attempt < max_attempts
+                                            and _partial_draft_doomed(partial_text, context.policy)
+                                        ):
+                                            abandoned = True
+                                            tracing.annotate(**{"review.draft_abandoned": True})
+                                            break
+                            except Exception:  # noqa: BLE001
+                                # A clipped completion usually fails JSON parsing; it is redrafted below.
+                                if "length" not in finish_reasons or budget.tokens >= budget.ceiling:
+                                    raise
+                            await stream.aclose()
+                            # An early SEO reject cancels the call before it finishes, leaving no finish reason.
+                            if finish_reasons:
+                                truncated = self.token_budget.record(budget, finish_reasons)
+                            tracing.annotate(**_usage_span_attributes(usage.get_total_tokens()))
+                        self._record_usage(context, "draft", usage.get_total_tokens())
+                        if truncated and budget.tokens < budget.ceiling:
+                            # The tokens streamed so far were a clipped reply; the `draft` event carries the full one.
+                            draft_text = await asyncio.to_thread(
+                                self._redraft_at_ceiling, context, current_text, attempt, budget
+                            )
+                            prediction = dspy.Prediction(reply=draft_text)
+                        if abandoned:
+                            # The partial reply already fails SEO checks that more tokens cannot undo;
+                            # it is discarded and the next attempt's tokens supersede it.
+                            continue
+                        draft_text = _draft_reply_text(prediction)
+                        accepted = _accept_draft(current_text, draft_text, attempt, generation)
+                        yield "draft", {"attempt": attempt, "draftText": draft_text, "changed": generation["changed"]}
+                        if accepted:
+                            break
+                    draft_ms = (time.perf_counter() - draft_started) * 1000
+
+                result = await asyncio.to_thread(
+                    self._finalize_review, context, draft_text, generation, draft_trace_id
+                )
+                self._record_route(context, result, draft_ms)
+                yield "result", result
+            except Exception as exc:  # noqa: BLE001
+                if isinstance(exc, ServiceError):
+                    raise
+                raise _map_model_error(exc) from exc
+
+    def verify_batch(
+        self,
+        items: list[dict[str, str]],
+        execution_overrides: dict[str, str] | None = None,
+    ) -> dict[str, Any]:
+        """Verify `{reviewId, evidenceJson, draftText}` items, packing up to `verify_batch_size` per LM call.
+
+        Items whose batched verdict is missing or ambiguous are re-verified one at a time.
+        """
+        outcomes: list[dict[str, Any]] = [{"reviewId": item["reviewId"], "result": None, "error": None} for item in items]
+        pending: list[tuple[int, ReviewContext, str]] = []
+        for index, item in enumerate(items):
+            try:
+                context = self._prepare_review("VERIFY_EXISTING_DRAFT", item["evidenceJson"], execution_overrides)
+                draft_text = _require_candidate_draft(item.get("draftText"))
+            except Exception as exc:  # noqa: BLE001
+                outcomes[index]["error"] = _error_payload(exc)
+                continue
+            if self.settings.early_seo_reject and _seo_rejects_draft(
+                _evaluate_seo_quality(draft_text=draft_text, policy=context.policy)
+            ):
+                outcomes[index].update(self._verify_single(context, draft_text))
+                continue
+            pending.append((index, context, draft_text))
+
+        batch_size = self.settings.verify_batch_size
+        batch_calls = 0
+        fallback_count = 0
+        for offset in range(0, len(pending), batch_size):
+            chunk = pending[offset:offset + batch_size]
+            verdicts: dict[str, dict[str, Any] | None] = {}
+            if len(chunk) > 1:
+                batch_calls += 1
+                verdicts = self._run_batch_verify(chunk)
+            for index, context, draft_text in chunk:
+                verdict = verdicts.get(str(index))
+                if verdict is None and len(chunk) > 1:
+                    fallback_count += 1
+                outcomes[index].update(self._verify_single(context, draft_text, verify_result=verdict))
+
+        return {
+            "results": outcomes,
+            "batch": {
+                "items": len(items),
+                "batchSize": batch_size,
+                "batchCalls": batch_calls,
+                "fallbacks": fallback_count,
+            },
+        }
+
+    def process_bulk(
+        self,
+        items: list[dict[str, Any]],
+        batch_client: BatchClient,
+        execution_overrides: dict[str, str] | None = None,
+        poll_seconds: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> list[dict[str, Any]]:
+        """Run a bulk run to completion in this thread; `bulk.BulkRuns` advances runs without blocking."""
+        state = self.start_bulk(items, execution_overrides)
+        while (state := self.advance_bulk(state, batch_client))["stage"] != "done":
+            sleep(poll_seconds)
+        return state["outcomes"]
+
+    def start_bulk(
+        self,
+        items: list[dict[str, Any]],
+        execution_overrides: dict[str, str] | None = None,
+    ) -> dict[str, Any]:
+        """Return the state of a new `AUTO` bulk run over `{reviewId, evidenceJson, currentDraftText}` items.
+
+        `advance_bulk` moves it through one provider batch per stage: every draft prompt, then
+        every verify prompt, then in lean mode the failing drafts' rewrites. Prompts and parsing
+        match the interactive path, including the routed draft variant, per-call demos and lean
+        verify. Drafts get a single attempt and are not repaired. The state is plain JSON and
+        names the provider batch in flight, so any process can pick the run up.
+        """
+        outcomes: list[dict[str, Any]] = [{"reviewId": item["reviewId"], "result": None, "error": None} for item in items]
+        for index, item in enumerate(items):
+            try:
+                self._prepare_review("AUTO", item["evidenceJson"], execution_overrides)
+            except Exception as exc:  # noqa: BLE001
+                outcomes[index]["error"] = _error_payload(exc)
+        return {
+            "items": items,
+            "executionOverrides": execution_overrides,
+            "stage": "draft",
+            "batchId": None,
+            "outcomes": outcomes,
+            "drafts": {},
+            "verdicts": {},
+            "rewrites": {},
+            "usage": {},
+        }
+
+    def advance_bulk(self, state: dict[str, Any], batch_client: BatchClient) -> dict[str, Any]:
+        """Move a bulk run forward without waiting on the provider and return its state.
+
+        A stage with no batch in flight submits one; a stage whose batch has finished is
+        collected and the next stage submitted. `stage` is `"done"` once `outcomes` (one
+        `{reviewId, result, error}` per item, in input order) is final.
+        """
+        contexts = self._bulk_contexts(state)
+        while (stage := state["stage"]) != "done":
+            error_stage = "draft" if stage == "draft" else "verify"
+            with _model_call(error_stage):
+                if state["batchId"] is None:
+                    requests = self._bulk_requests(stage, state, contexts)
+                    if requests:
+                        state["batchId"] = batch_client.submit(requests)
+                        return state
+                    outputs: dict[str, dict[str, Any]] = {}
+                else:
+                    status = batch_client.status(state["batchId"])
+                    if status == "running":
+                        return state
+                    if status != "completed":
+                        raise ServiceError(
+                            "INTERNAL_ERROR",
+                            f"Provider batch {state['batchId']} {status}.",
+                            502,
+                            retryable=True,
+                            stage=error_stage,
+                        )
+                    outputs = batch_client.results(state["batchId"])
+            self._collect_bulk(stage, state, contexts, outputs)
+            state.update(stage=_NEXT_BULK_STAGE[stage], batchId=None)
+        return state
+
+    def _bulk_contexts(self, state: dict[str, Any]) -> dict[int, ReviewContext]:
+        """Rebuild the review contexts of items still in progress; they derive only from the item and overrides."""
+        contexts: dict[int, ReviewContext] = {}
+        for index, item in enumerate(state["items"]):
+            outcome = state["outcomes"][index]
+            if outcome["result"] is not None or outcome["error"] is not None:
+                continue
+            context = self._prepare_review("AUTO", item["evidenceJson"], state["executionOverrides"])
+            # Usage from earlier stages, which may have run in another process, keeps accumulating here.
+            contexts[index] = replace(context, usage=state["usage"].setdefault(str(index), {}))
+        return contexts
+
+    def _bulk_requests(
+        self,
+        stage: str,
+        state: dict[str, Any],
+        contexts: dict[int, ReviewContext],
+    ) -> list[dict[str, Any]]:
+        if stage == "draft":
+            return [
+                self._batch_request(
+                    f"draft-{index}",
+                    context.draft_model_name,
+                    context.draft_lm,
+                    _single_predictor(self._draft_program(context)),
+                    {
+                        "evidence_json": context.evidence_json,
+                        "seo_brief": context.seo_brief,
+                        "previous_draft_text": _bulk_current_text(state, index),
+                        "regeneration_attempt": 1,
+                    },
+                    demos=context.draft_demos,
+                )
+                for index, context in contexts.items()
+            ]
+        if stage == "verify":
+            verify_predictor = _single_predictor(self._bulk_verify_program())
+            requests = []
+            for key, draft in state["drafts"].items():
+                context = contexts.get(int(key))
+                if context is None:
+                    continue
+                demos = (
+                    self.demo_selector.verify(context.evidence, draft["draftText"])
+                    if self.demo_selector is not None
+                    else None
+                )
+                requests.append(self._batch_request(f"verify-{key}", context.verify_model_name, context.verify_lm, verify_predictor, {
+                    "evidence_json": context.evidence_json,
+                    "draft_text": draft["draftText"],
+                    "policy_json": context.policy_json,
+                }, demos=demos))
+            return requests
+        rewrite_predictor = _single_predictor(self.rewrite_program)
+        return [
+            self._batch_request(f"rewrite-{key}", context.verify_model_name, context.verify_lm, rewrite_predictor, {
+                "evidence_json": context.evidence_json,
+                "draft_text": state["drafts"][key]["draftText"],
+                "policy_json": context.policy_json,
+                "violations_json": json.dumps(violations, separators=(",", ":")),
+            })
+            for key, violations in state["rewrites"].items()
+            if (context := contexts.get(int(key))) is not None
+        ]
+
+    def _collect_bulk(
+        self,
+        stage: str,
+        state: dict[str, Any],
+        contexts: dict[int, ReviewContext],
+        outputs: dict[str, dict[str, Any]],
+    ) -> None:
+        outcomes = state["outcomes"]
+        if stage == "draft":
+            for index, context in contexts.items():
+                generation = _new_generation(attempted=True, variant=context.draft_variant)
+                draft_trace_id = str(uuid.uuid4())
+                predictor = _single_predictor(self._draft_program(context))
+                try:
+                    prediction = self._parse_batch_output(context, "draft", predictor, outputs.get(f"draft-{index}"))
+                    draft_text = _draft_reply_text(prediction)
+                    _accept_draft(_bulk_current_text(state, index), draft_text, 1, generation)
+                    if self.settings.early_seo_reject and _seo_rejects_draft(
+                        _evaluate_seo_quality(draft_text=draft_text, policy=context.policy)
+                    ):
+                        outcomes[index]["result"] = self._finalize_review(context, draft_text, generation, draft_trace_id)
+                        continue
+                except Exception as exc:  # noqa: BLE001
+                    outcomes[index]["error"] = _error_payload(exc)
+                    continue
+                state["drafts"][str(index)] = {"draftText": draft_text, "generation": generation, "draftTraceId": draft_trace_id}
+            return
+
+        if stage == "verify":
+            verify_predictor = _single_predictor(self._bulk_verify_program())
+            for key, draft in state["drafts"].items():
+                context = contexts.get(int(key))
+                if context is None:
+                    continue
+                try:
+                    prediction = self._parse_batch_output(context, "verify", verify_predictor, outputs.get(f"verify-{key}"))
+                except Exception as exc:  # noqa: BLE001
+                    outcomes[int(key)]["error"] = _error_payload(exc)
+                    continue
+                verdict = _verifier_payload(prediction)
+                state["verdicts"][key] = verdict
+                if self.settings.verify_mode != "lean":
+                    continue
+                # As in `_verify_draft`, a draft failing only the local SEO checks is rewritten too.
+                merged = _merge_seo_quality_with_verifier(
+                    verdict, _evaluate_seo_quality(draft_text=draft["draftText"], policy=context.policy)
+                )
+                if not merged["pass"]:
+                    state["rewrites"][key] = merged["violations"]
+            return
+
+        rewrite_predictor = _single_predictor(self.rewrite_program)
+        for key in state["rewrites"]:
+            context = contexts.get(int(key))
+            if context is None or key not in state["verdicts"]:
+                continue
+            try:
+                prediction = self._parse_batch_output(context, "verify", rewrite_predictor, outputs.get(f"rewrite-{key}"))
+                state["verdicts"][key]["suggestedRewrite"] = _normalize_optional_text(
+                    getattr(prediction, "suggested_rewrite", "")
+                )
+            except Exception as exc:  # noqa: BLE001
+                del state["verdicts"][key]
+                outcomes[int(key)]["error"] = _error_payload(exc)
+        for key, draft in state["drafts"].items():
+            context = contexts.get(int(key))
+            if context is None or key not in state["verdicts"]:
+                continue
+            try:
+                outcomes[int(key)]["result"] = self._finalize_review(
+                    context, draft["draftText"], draft["generation"], draft["draftTraceId"], verify_result=state["verdicts"][key]
+                )
+            except Exception as exc:  # noqa: BLE001
+                outcomes[int(key)]["error"] = _error_payload(exc)
+
+    def _bulk_verify_program(self) -> dspy.Module:
+        return self.lean_verify_program if self.settings.verify_mode == "lean" else self.verify_program
+
+    def _batch_request(
+        self,
+        custom_id: str,
+        model_name: str,
+        lm: dspy.BaseLM,
+        predictor: dspy.Predict,
+        inputs: dict[str, Any],
+        demos: list[dspy.Example] | None = None,
+    ) -> dict[str, Any]:
+        # `demos`, as chosen per call by the demo selector, replace the predictor's compiled ones.
+        return {
+            "customId": custom_id,
+            "model": model_name,
+            "messages": self.adapter.format(predictor.signature, predictor.demos if demos is None else demos, inputs),
+            "temperature": lm.kwargs.get("temperature"),
+            "maxTokens": lm.kwargs.get("max_tokens"),
+        }
+
+    def _parse_batch_output(
+        self,
+        context: ReviewContext,
+        stage: str,
+        predictor: dspy.Predict,
+        output: dict[str, Any] | None,
+    ) -> dspy.Prediction:
+        if output is None or output.get("error"):
+            message = (output or {}).get("error") or "Provider batch returned no output for this request."
+            raise ServiceError("INTERNAL_ERROR", str(message), 502, retryable=True, stage=stage)
+        model_name = context.draft_model_name if stage == "draft" else context.verify_model_name
+        self._record_usage(context, stage, {model_name: output.get("usage") or {}})
+        with _model_call(stage):
+            return dspy.Prediction(**self.adapter.parse(predictor.signature, output["content"]))
+
+    def _run_batch_verify(self, chunk: list[tuple[int, ReviewContext, str]]) -> dict[str, dict[str, Any] | None]:
+        _, first_context, _ = chunk[0]
+        packed = [
+            {
+                "id": str(index),
+                "evidence": context.evidence,
+                "draftText": draft_text,
+                "seoTargets": context.policy.get("seoTargets", {}),
+            }
+            for index, context, draft_text in chunk
+        ]
+        with _model_call("verify"), dspy.context(lm=first_context.verify_lm, adapter=self.adapter):
+            try:
+                # The output budget scales with the chunk, so it is set per call rather than on the shared LM.
+                return self.batch_verify_program(
+                    items=packed,
+                    max_tokens=self.settings.verify_max_tokens * len(chunk),
+                )
+            except (AdapterParseError, ValueError, TypeError):
+                # A reply that does not parse degrades to per-item verification; provider errors
+                # such as rate limits and timeouts propagate, since K single calls would hit them too.
+                return {}
+
+    def _verify_single(
+        self,
+        context: ReviewContext,
+        draft_text: str,
+        verify_result: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        generation = _new_generation(attempted=False)
+        try:
+            return {"result": self._finalize_review(context, draft_text, generation, None, verify_result=verify_result)}
+        except Exception as exc:  # noqa: BLE001
+            return {"error": _error_payload(exc)}
+
+    def _prepare_review(
+        self,
+        mode: str,
+        evidence_json: str,
+        execution_overrides: dict[str, str] | None,
+    ) -> ReviewContext:
         started = time.perf_counter()
-        draft_trace_id: str | None = None
-        verify_trace_id = str(uuid.uuid4())
-        normalized_mode = mode.upper().strip()
         program_version = self.program_version
         draft_model_name = self.settings.draft_model
         verify_model_name = self.settings.verify_model
@@ -197,79 +1028,248 @@ class ProgramManager:
                     max_tokens=self.settings.verify_max_tokens,
                     num_retries=self.settings.num_retries,
                 )
-        try:
-            evidence = _parse_evidence_json(evidence_json)
-            policy = _build_policy(evidence)
-            seo_brief = _build_seo_brief(policy)
-            policy_json = json.dumps(policy, separators=(",", ":"))
-
-            if normalized_mode not in {"AUTO", "MANUAL_REGENERATE", "VERIFY_EXISTING_DRAFT"}:
-                raise ServiceError("INVALID_REQUEST", f"Unsupported process mode: {mode}", 400)
-
-            generation = {"attempted": False, "changed": False, "attemptCount": 1}
-            if normalized_mode == "VERIFY_EXISTING_DRAFT":
-                if not (candidate_draft_text or "").strip():
-                    raise ServiceError("INVALID_REQUEST", "candidateDraftText is required for verify mode.", 400)
-                draft_text = str(candidate_draft_text).strip()
-            else:
-                generation["attempted"] = True
-                current_text = (current_draft_text or "").strip()
-                max_attempts = 3 if current_text else 1
-                draft_text = ""
-                for attempt in range(1, max_attempts + 1):
-                    draft_trace_id = str(uuid.uuid4())
-                    with dspy.context(lm=draft_lm, adapter=self.adapter):
-                        candidate = self.draft_program(
-                            evidence_json=evidence_json,
-                            seo_brief=seo_brief,
-                            previous_draft_text=current_text,
-                            regeneration_attempt=attempt,
-                        )
-                    if not current_text or not _drafts_equivalent(current_text, candidate):
-                        generation["changed"] = True
-                        generation["attemptCount"] = attempt
-                        draft_text = candidate.strip()
-                        break
-                    draft_text = candidate.strip()
 
-                if not draft_text:
-                    raise ServiceError("MODEL_SCHEMA_ERROR", "DSPy draft output was empty.", 502)
+        evidence = _parse_evidence_json(evidence_json)
+        policy = _build_policy(evidence)
+        normalized_mode = mode.upper().strip()
+        if normalized_mode not in {"AUTO", "MANUAL_REGENERATE", "VERIFY_EXISTING_DRAFT"}:
+            raise ServiceError("INVALID_REQUEST", f"Unsupported process mode: {mode}", 400)
 
-            with dspy.context(lm=verify_lm, adapter=self.adapter):
-                result = self.verify_program(
-                    evidence_json=evidence_json,
+        return ReviewContext(
+            mode=normalized_mode,
+            evidence_json=evidence_json,
+            evidence=evidence,
+            policy=policy,
+            policy_json=json.dumps(policy, separators=(",", ":")),
+            seo_brief=_build_seo_brief(policy),
+            program_version=program_version,
+            draft_model_name=draft_model_name,
+            verify_model_name=verify_model_name,
+            draft_lm=draft_lm,
+            verify_lm=verify_lm,
+            started=started,
+            draft_variant=self.draft_router.route(evidence, normalized_mode),
+            draft_demos=(
+                self.demo_selector.draft(evidence)
+                if self.demo_selector is not None and normalized_mode != "VERIFY_EXISTING_DRAFT"
+                else None
+            ),
+        )
+
+    def _finalize_review(
+        self,
+        context: ReviewContext,
+        draft_text: str,
+        generation: dict[str, Any],
+        draft_trace_id: str | None,
+        verify_result: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        verify_trace_id = str(uuid.uuid4())
+        # Local SEO scoring is sub-millisecond, so it gates the verify LM call instead of racing it.
+        with tracing.span("review.seo_score"):
+            seo_quality = _evaluate_seo_quality(draft_text=draft_text, policy=context.policy)
+        if verify_result is not None:
+            result = verify_result
+        elif self.settings.early_seo_reject and _seo_rejects_draft(seo_quality):
+            generation["earlyRejected"] = True
+            # The SEO findings are merged in below; this one tells the caller policy checks never ran.
+            result: dict[str, Any] = {
+                "pass": False,
+                "violations": [_violation(
+                    "SEO_EARLY_REJECTED",
+                    "Draft failed SEO checks that a rewrite must fix first; policy verification was skipped.",
+                )],
+                "suggestedRewrite": None,
+            }
+        else:
+            result = self._verify_draft(context, draft_text, verify_trace_id, seo_quality)
+        verifier = _merge_seo_quality_with_verifier(result, seo_quality)
+        if not verifier["pass"] and verify_result is None and generation["attempted"] and self.settings.max_repairs:
+            if generation["earlyRejected"]:
+                # Skipping verify left no rewrite for the repair loop to start from.
+                verifier["suggestedRewrite"] = self._suggest_rewrite(context, draft_text, verifier["violations"])
+            repaired = self._repair_draft(context, verifier, generation)
+            if repaired is not None:
+                draft_text, seo_quality, verifier, verify_trace_id = repaired
+        decision = "READY" if verifier["pass"] else "BLOCKED_BY_VERIFIER"
+        tracing.annotate(**{
+            "review.decision": decision,
+            "review.draft_trace_id": draft_trace_id,
+            "review.verify_trace_id": verify_trace_id,
+            "review.early_rejected": generation.get("earlyRejected", False),
+            "review.repair_count": generation["repairCount"],
+        })
+        latency_ms = int((time.perf_counter() - context.started) * 1000)
+        return {
+            "decision": decision,
+            "draftText": draft_text,
+            "verifier": verifier,
+            "seoQuality": seo_quality,
+            "generation": generation,
+            "program": {
+                "version": context.program_version,
+                "draftArtifactVersion": (
+                    self.fast_draft_artifact_version if generation.get("variant") == FAST else self.draft_artifact_version
+                ),
+                "verifyArtifactVersion": self.verify_artifact_version,
+            },
+            "models": {
+                "draft": context.draft_model_name,
+                "verify": context.verify_model_name,
+            },
+            "trace": {
+                "draftTraceId": draft_trace_id,
+                "verifyTraceId": verify_trace_id,
+            },
+            "usage": {"draft": context.usage.get("draft"), "verify": context.usage.get("verify")} if context.usage else None,
+            "latencyMs": latency_ms,
+        }
+
+    def _verify_draft(
+        self,
+        context: ReviewContext,
+        draft_text: str,
+        verify_trace_id: str,
+        seo_quality: dict[str, Any],
+    ) -> dict[str, Any]:
+        lean = self.settings.verify_mode == "lean"
+        verify_started = time.perf_counter()
+        with (
+            tracing.span(
+                "review.verify",
+                **{
+                    "review.verify_trace_id": verify_trace_id,
+                    "gen_ai.request.model": context.verify_model_name,
+                    "review.verify_mode": self.settings.verify_mode,
+                },
+            ),
+            _model_call("verify"),
+            dspy.context(lm=context.verify_lm, adapter=self.adapter),
+            dspy.track_usage() as usage,
+        ):
+            budget = self.token_budget.verify(draft_text)
+            demos = self.demo_selector.verify(context.evidence, draft_text) if self.demo_selector is not None else None
+            result = self._call_with_budget(budget, partial(
+                self.lean_verify_program if lean else self.verify_program,
+                evidence_json=context.evidence_json,
+                draft_text=draft_text,
+                policy_json=context.policy_json,
+                demos=demos,
+            ))
+            # A draft the LM passes can still fail the local SEO checks; it needs a rewrite all the same.
+            merged = _merge_seo_quality_with_verifier(result, seo_quality)
+            rewritten = lean and not merged["pass"]
+            if rewritten:
+                result["suggestedRewrite"] = self._call_with_budget(budget, partial(
+                    self.rewrite_program,
+                    evidence_json=context.evidence_json,
                     draft_text=draft_text,
-                    policy_json=policy_json,
+                    policy_json=context.policy_json,
+                    violations=merged["violations"],
+                ))
+            tracing.annotate(**_usage_span_attributes(usage.get_total_tokens()))
+        self._record_usage(context, "verify", usage.get_total_tokens())
+        self._record_verify(merged["pass"], rewritten, usage.get_total_tokens(), verify_started)
+        return result
+
+    def _suggest_rewrite(
+        self,
+        context: ReviewContext,
+        draft_text: str,
+        violations: list[dict[str, str]],
+    ) -> str | None:
+        """A rewrite of `draft_text` fixing `violations`, for failed drafts that no verify call rewrote."""
+        with (
+            tracing.span("review.rewrite", **{"gen_ai.request.model": context.verify_model_name}),
+            _model_call("verify"),
+            dspy.context(lm=context.verify_lm, adapter=self.adapter),
+            dspy.track_usage() as usage,
+        ):
+            rewrite = self._call_with_budget(self.token_budget.verify(draft_text), partial(
+                self.rewrite_program,
+                evidence_json=context.evidence_json,
+                draft_text=draft_text,
+                policy_json=context.policy_json,
+                violations=violations,
+            ))
+            tracing.annotate(**_usage_span_attributes(usage.get_total_tokens()))
+        self._record_usage(context, "verify", usage.get_total_tokens())
+        return rewrite
+
+    def _repair_draft(
+        self,
+        context: ReviewContext,
+        verifier: dict[str, Any],
+        generation: dict[str, Any],
+    ) -> tuple[str, dict[str, Any], dict[str, Any], str] | None:
+        """Try the verifier's own rewrites, up to `max_repairs` deep, and return the first that passes.
+
+        Each rewrite is scored locally first and only re-verified when SEO checks cannot already
+        fail it. When none passes, the original blocked draft and verdict stand.
+        """
+        for repair in range(1, self.settings.max_repairs + 1):
+            candidate = (verifier.get("suggestedRewrite") or "").strip()
+            if not candidate:
+                return None
+            generation["repairCount"] = repair
+            with tracing.span("review.repair", **{"review.repair": repair}):
+                seo_quality = _evaluate_seo_quality(draft_text=candidate, policy=context.policy)
+                if _seo_blocks_draft(seo_quality):
+                    return None
+                verify_trace_id = str(uuid.uuid4())
+                verifier = _merge_seo_quality_with_verifier(
+                    self._verify_draft(context, candidate, verify_trace_id, seo_quality), seo_quality
                 )
-            seo_quality = _evaluate_seo_quality(draft_text=draft_text, policy=policy)
-            verifier = _merge_seo_quality_with_verifier(result, seo_quality)
-            decision = "READY" if verifier["pass"] else "BLOCKED_BY_VERIFIER"
-            latency_ms = int((time.perf_counter() - started) * 1000)
-            return {
-                "decision": decision,
-                "draftText": draft_text,
-                "verifier": verifier,
-                "seoQuality": seo_quality,
-                "generation": generation,
-                "program": {
-                    "version": program_version,
-                    "draftArtifactVersion": self.draft_artifact_version,
-                    "verifyArtifactVersion": self.verify_artifact_version,
-                },
-                "models": {
-                    "draft": draft_model_name,
-                    "verify": verify_model_name,
-                },
-                "trace": {
-                    "draftTraceId": draft_trace_id,
-                    "verifyTraceId": verify_trace_id,
-                },
-                "latencyMs": latency_ms,
-            }
-        except Exception as exc:  # noqa: BLE001
-            if isinstance(exc, ServiceError):
-                raise
-            raise _map_model_error(exc) from exc
+            if verifier["pass"]:
+                generation["changed"] = True
+                return candidate, seo_quality, verifier, verify_trace_id
+        return None
+
+    def _record_verify(
+        self,
+        passed: bool,
+        rewritten: bool,
+        totals: dict[str, dict[str, Any]],
+        started: float,
+    ) -> None:
+        latency_ms = (time.perf_counter() - started) * 1000
+        completion_tokens = summarize_usage(totals)["completionTokens"]
+        with self._usage_lock:
+            values = self._verify_totals["passing" if passed else "failing"]
+            values["calls"] += 1
+            values["rewriteCalls"] += int(rewritten)
+            values["completionTokens"] += completion_tokens
+            values["latencyMs"] += latency_ms
+
+    def _draft_program(self, context: ReviewContext) -> DraftProgram:
+        return self.fast_draft_program if context.draft_variant == FAST else self.draft_program
+
+    def _record_route(self, context: ReviewContext, result: dict[str, Any], draft_ms: float | None) -> None:
+        if draft_ms is not None:
+            self.draft_router.record(context.draft_variant, draft_ms, result["verifier"]["pass"])
+
+    def _generate_draft(self, context: ReviewContext, current_text: str, attempt: int, max_tokens: int) -> str:
+        return self._draft_program(context)(
+            evidence_json=context.evidence_json,
+            seo_brief=context.seo_brief,
+            previous_draft_text=current_text,
+            regeneration_attempt=attempt,
+            max_tokens=max_tokens,
+            demos=context.draft_demos,
+        )
+
+    def _redraft_at_ceiling(self, context: ReviewContext, current_text: str, attempt: int, budget: TokenBudget) -> str:
+        ceiling = budget.at_ceiling()
+        with (
+            _model_call("draft", attempt),
+            dspy.context(lm=context.draft_lm, adapter=self.adapter),
+            dspy.track_usage() as usage,
+            watch_finish_reasons() as finish_reasons,
+        ):
+            draft_text = self._generate_draft(context, current_text, attempt, ceiling.tokens)
+        self.token_budget.record(ceiling, finish_reasons, retry=True)
+        self._record_usage(context, "draft", usage.get_total_tokens())
+        return draft_text
 
     def _resolve_lm(
         self,
@@ -284,29 +1284,268 @@ class ProgramManager:
         if existing is not None:
             return existing
 
-        model = dspy.LM(
+        model = track_finish_reasons(self.lm_factory(
             model_name,
             temperature=temperature,
             max_tokens=max_tokens,
             cache=True,
             num_retries=num_retries,
-        )
+        ))
         cache[model_name] = model
         return model
 
 
-def _map_model_error(error: Exception) -> ServiceError:
-    message = str(error)
-    lowered = message.lower()
+def _create_lm(model_name: str, **kwargs: Any) -> dspy.LM:
+    return dspy.LM(model_name, **kwargs)
+
+
+def _lm_config(max_tokens: int | None) -> dict[str, Any]:
+    return {"config": {"max_tokens": max_tokens}} if max_tokens else {}
+
+
+def _demo_config(demos: list[dspy.Example] | None) -> dict[str, Any]:
+    # `None` keeps the predictor's compiled demos; a list, even empty, replaces them for this call.
+    return {} if demos is None else {"demos": demos}
+
+
+_NEXT_BULK_STAGE = {"draft": "verify", "verify": "rewrite", "rewrite": "done"}
+
+
+def _bulk_current_text(state: dict[str, Any], index: int) -> str:
+    return (state["items"][index].get("currentDraftText") or "").strip()
+
+
+def _error_payload(error: Exception) -> dict[str, Any]:
+    mapped = error if isinstance(error, ServiceError) else _map_model_error(error)
+    return mapped.payload()
+
 
-    if "timed out" in lowered or "timeout" in lowered:
-        return ServiceError("MODEL_TIMEOUT", message or "Model call timed out.", 504)
-    if "rate" in lowered and "limit" in lowered:
-        return ServiceError("MODEL_RATE_LIMIT", message or "Rate limited by model provider.", 429)
-    if "schema" in lowered or "json" in lowered:
-        return ServiceError("MODEL_SCHEMA_ERROR", message or "Model returned invalid schema.", 502)
+@contextmanager
+def _model_call(stage: str, attempt: int = 1) -> Iterator[None]:
+    """Map failures inside an LM call to a `ServiceError` that records which call failed."""
+    try:
+        yield
+    except ServiceError:
+        raise
+    except Exception as exc:  # noqa: BLE001
+        raise _map_model_error(exc, stage=stage, attempt=attempt) from exc
+
+
+def _map_model_error(error: Exception, *, stage: str | None = None, attempt: int | None = None) -> ServiceError:
+    code, status_code, retryable = _classify_model_error(error)
+    return ServiceError(
+        code,
+        str(error) or _DEFAULT_ERROR_MESSAGES[code],
+        status_code,
+        retryable=retryable,
+        retry_after_ms=_retry_after_ms(error),
+        stage=stage,
+        attempt=attempt,
+    )
+
+
+def _classify_model_error(error: Exception) -> tuple[str, int, bool]:
+    """Return `(code, status_code, retryable)` from the exception type, never from its message text.
+
+    DSPy's own LM errors carry a stable `code`; legacy `BaseLM` subclasses and older DSPy
+    versions surface litellm's exceptions directly, so both hierarchies are recognised.
+    """
+    if isinstance(error, AdapterParseError):
+        # Sampling the same prompt again usually parses, so this is worth a retry.
+        return "MODEL_SCHEMA_ERROR", 502, True
+    lm_code = getattr(error, "code", None) if isinstance(error, DSPyError) else None
+    if lm_code in _DSPY_ERROR_CLASSES:
+        return _DSPY_ERROR_CLASSES[lm_code]
+    for error_types, classification in _LITELLM_ERROR_CLASSES:
+        if isinstance(error, error_types):
+            return classification
+    if isinstance(error, TimeoutError):
+        return _TIMEOUT
+    # An error nobody classified is more likely a bug than a blip; retrying it only repeats the failure.
+    return "INTERNAL_ERROR", 502, False
+
+
+def _retry_after_ms(error: Exception) -> int | None:
+    retry_after = getattr(error, "retry_after", None)
+    if isinstance(retry_after, (int, float)) and retry_after >= 0:
+        return int(retry_after * 1000)
+    headers = getattr(error, "headers", None)
+    if not isinstance(headers, dict):
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+    for name, scale in (("retry-after-ms", 1), ("retry-after", 1000)):
+        raw = headers.get(name)
+        if raw is None:
+            continue
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            # HTTP-date values are rare from model providers; let the caller's own backoff apply.
+            continue
+        if value >= 0:
+            return int(value * scale)
+    return None
+
+
+_TIMEOUT = ("MODEL_TIMEOUT", 504, True)
+_RATE_LIMIT = ("MODEL_RATE_LIMIT", 429, True)
+_PROVIDER_UNAVAILABLE = ("INTERNAL_ERROR", 503, True)
+_PROVIDER_MISCONFIGURED = ("INTERNAL_ERROR", 502, False)
+_PROVIDER_REJECTED = ("INVALID_REQUEST", 400, False)
+
+_DSPY_ERROR_CLASSES: dict[str, tuple[str, int, bool]] = {
+    "timeout": _TIMEOUT,
+    "rate_limit": _RATE_LIMIT,
+    "server": _PROVIDER_UNAVAILABLE,
+    "transport": _PROVIDER_UNAVAILABLE,
+    "lock_timeout": _PROVIDER_UNAVAILABLE,
+    "auth": _PROVIDER_MISCONFIGURED,
+    "billing": _PROVIDER_MISCONFIGURED,
+    "configuration": _PROVIDER_MISCONFIGURED,
+    "not_configured": _PROVIDER_MISCONFIGURED,
+    "unsupported_model": _PROVIDER_MISCONFIGURED,
+    "unsupported_feature": _PROVIDER_MISCONFIGURED,
+    "invalid_request": _PROVIDER_REJECTED,
+    "context_window_exceeded": _PROVIDER_REJECTED,
+}
+
+# Order matters: litellm.Timeout subclasses APIConnectionError, and BadRequestError has subclasses of its own.
+_LITELLM_ERROR_CLASSES: tuple[tuple[tuple[type[Exception], ...], tuple[str, int, bool]], ...] = (
+    ((litellm.Timeout,), _TIMEOUT),
+    ((litellm.RateLimitError,), _RATE_LIMIT),
+    (
+        (
+            litellm.APIConnectionError,
+            litellm.ServiceUnavailableError,
+            litellm.InternalServerError,
+            litellm.BadGatewayError,
+        ),
+        _PROVIDER_UNAVAILABLE,
+    ),
+    (
+        (litellm.AuthenticationError, litellm.PermissionDeniedError, litellm.NotFoundError),
+        _PROVIDER_MISCONFIGURED,
+    ),
+    ((litellm.BadRequestError, litellm.UnprocessableEntityError), _PROVIDER_REJECTED),
+)
+
+_DEFAULT_ERROR_MESSAGES = {
+    "MODEL_TIMEOUT": "Model call timed out.",
+    "MODEL_RATE_LIMIT": "Rate limited by model provider.",
+    "MODEL_SCHEMA_ERROR": "Model returned invalid schema.",
+    "INVALID_REQUEST": "Model provider rejected the request.",
+    "INTERNAL_ERROR": "Unhandled model error.",
+}
+
+
+async def _cancellable(stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    # Drive the stream from its own task so abandoning it mid-way cancels the
+    # underlying LM call inside the task that opened it.
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    finished = object()
+
+    async def pump() -> None:
+        try:
+            async for item in stream:
+                queue.put_nowait(item)
+        except Exception as exc:  # noqa: BLE001
+            queue.put_nowait(exc)
+        else:
+            queue.put_nowait(finished)
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if not task.done():
+            task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+class _JsonStringStream:
+    """Decodes streamed fragments of one JSON string value into plain text.
+
+    The JSON adapter's stream listener forwards the raw field content: the opening and
+    closing quotes plus escapes such as `\\"`, `\\n` and `\\uXXXX`, which can be split across
+    fragments. Incomplete escapes (and the first half of a surrogate pair) are held back
+    until the fragment that completes them arrives.
+    """
+
+    def __init__(self) -> None:
+        self._raw = ""
+        self._opened = False
+        self._closed = False
+
+    def feed(self, fragment: str) -> str:
+        if self._closed:
+            return ""
+        raw = self._raw + fragment
+        if not self._opened:
+            raw = raw.lstrip()
+            if not raw:
+                return ""
+            self._opened = True
+            if raw.startswith('"'):
+                raw = raw[1:]
+        index = 0
+        while index < len(raw):
+            char = raw[index]
+            if char == '"':
+                self._closed = True
+                break
+            width = _json_escape_width(raw, index) if char == "\\" else 1
+            if index + width > len(raw):
+                break
+            index += width
+        self._raw = "" if self._closed else raw[index:]
+        try:
+            return json.loads(f'"{raw[:index]}"')
+        except json.JSONDecodeError:
+            return raw[:index]
 
-    return ServiceError("INTERNAL_ERROR", message or "Unhandled model error.", 502)
+
+def _json_escape_width(raw: str, index: int) -> int:
+    if raw[index + 1:index + 2] != "u":
+        return 2
+    try:
+        high_surrogate = 0xD800 <= int(raw[index + 2:index + 6], 16) < 0xDC00
+    except ValueError:
+        return 6
+    # A high surrogate only decodes together with the `\uXXXX` low surrogate after it.
+    return 12 if high_surrogate else 6
+
+
+def _draft_reply_text(prediction: Any) -> str:
+    text = str(getattr(prediction, "reply", "") or "").strip()
+    if not text:
+        raise ServiceError("MODEL_SCHEMA_ERROR", "DSPy draft output was empty.", 502)
+    return text
+
+
+def _require_candidate_draft(candidate_draft_text: str | None) -> str:
+    if not (candidate_draft_text or "").strip():
+        raise ServiceError("INVALID_REQUEST", "candidateDraftText is required for verify mode.", 400)
+    return str(candidate_draft_text).strip()
+
+
+def _max_draft_attempts(current_text: str) -> int:
+    return 3 if current_text else 1
+
+
+def _accept_draft(current_text: str, draft_text: str, attempt: int, generation: dict[str, Any]) -> bool:
+    if current_text and _drafts_equivalent(current_text, draft_text):
+        return False
+    generation["changed"] = True
+    generation["attemptCount"] = attempt
+    return True
 
 
 def _maybe_load_program(program: dspy.Module, artifact_path: str) -> None:
@@ -320,7 +1559,22 @@ def _maybe_load_program(program: dspy.Module, artifact_path: str) -> None:
         raise RuntimeError(f"Failed loading DSPy program artifact: {path}") from exc
 
 
-def _normalize_violations(raw_value: Any) -> list[dict[str, str]]:
+def _single_predictor(program: dspy.Module) -> dspy.Predict:
+    predictors = [predictor for _, predictor in program.named_predictors()]
+    if len(predictors) != 1:
+        raise RuntimeError(f"{type(program).__name__} must have exactly one predictor to run in a provider batch.")
+    return predictors[0]
+
+
+def _verifier_payload(prediction: Any) -> dict[str, Any]:
+    return {
+        "pass": bool(getattr(prediction, "passed", False)),
+        "violations": _normalize_violations(getattr(prediction, "violations", [])),
+        "suggestedRewrite": _normalize_optional_text(getattr(prediction, "suggested_rewrite", "")),
+    }
+
+
+def _normalize_violations(raw_value: Any) -> list[dict[str, str | None]]:
     if isinstance(raw_value, str):
         try:
             decoded = json.loads(raw_value)
@@ -332,7 +1586,7 @@ def _normalize_violations(raw_value: Any) -> list[dict[str, str]]:
     if not isinstance(decoded, list):
         decoded = []
 
-    cleaned: list[dict[str, str]] = []
+    cleaned: list[dict[str, str | None]] = []
     for item in decoded:
         if not isinstance(item, dict):
             continue
@@ -341,15 +1595,13 @@ def _normalize_violations(raw_value: Any) -> list[dict[str, str]]:
             "message": str(item.get("message", "Verifier flagged this draft.")),
         }
         snippet = item.get("snippet")
-        if snippet is not None:
-            candidate["snippet"] = str(snippet)
+        candidate["snippet"] = None if snippet is None else str(snippet)
         cleaned.append(candidate)
 
     if not cleaned:
         return []
 
-    validated = [VerifierViolation.model_validate(item).model_dump(exclude_none=True) for item in cleaned]
-    return validated
+    return [_violation(**item) for item in cleaned]
 
 
 def _resolve_artifact_path(artifact_path: str) -> Path:
@@ -374,12 +1626,66 @@ def _normalize_optional_text(value: Any) -> str | None:
     return text if text else None
 
 
-def _create_json_adapter():
+def _create_json_adapter(stable_prefix: bool = False):
+    adapter_class = StablePrefixJSONAdapter if stable_prefix else dspy.JSONAdapter
     try:
-        return dspy.JSONAdapter(use_native_function_calling=True)
+        return adapter_class(use_native_function_calling=True)
     except TypeError:
         # Backward compatibility for DSPy builds where JSONAdapter has no kwargs.
-        return dspy.JSONAdapter()
+        return adapter_class()
+
+
+@lru_cache(maxsize=64)
+def _stable_input_order(signature: type[dspy.Signature]) -> type[dspy.Signature]:
+    input_names = list(signature.input_fields)
+    ordered_inputs = sorted(
+        input_names,
+        key=lambda name: (
+            STABLE_PREFIX_INPUT_FIELDS.index(name) if name in STABLE_PREFIX_INPUT_FIELDS else len(STABLE_PREFIX_INPUT_FIELDS),
+            input_names.index(name),
+        ),
+    )
+    if ordered_inputs == input_names:
+        return signature
+    fields = signature.fields
+    reordered = {name: fields[name] for name in ordered_inputs}
+    reordered.update({name: fields[name] for name in signature.output_fields})
+    return dspy.Signature(reordered, signature.instructions)
+
+
+def _draft_span_attributes(context: ReviewContext, attempt: int, draft_trace_id: str) -> dict[str, Any]:
+    return {
+        "review.attempt": attempt,
+        "review.draft_trace_id": draft_trace_id,
+        "gen_ai.request.model": context.draft_model_name,
+        "review.draft_variant": context.draft_variant,
+    }
+
+
+def _usage_span_attributes(totals: dict[str, dict[str, Any]]) -> dict[str, int]:
+    summary = summarize_usage(totals)
+    return {
+        "gen_ai.usage.input_tokens": summary["promptTokens"],
+        "gen_ai.usage.output_tokens": summary["completionTokens"],
+        "gen_ai.usage.cached_input_tokens": summary["cachedPromptTokens"],
+    }
+
+
+def summarize_usage(totals: dict[str, dict[str, Any]]) -> dict[str, int]:
+    prompt_tokens = 0
+    completion_tokens = 0
+    cached_prompt_tokens = 0
+    for entry in totals.values():
+        prompt_tokens += int(entry.get("prompt_tokens") or 0)
+        completion_tokens += int(entry.get("completion_tokens") or 0)
+        details = entry.get("prompt_tokens_details")
+        if isinstance(details, dict):
+            cached_prompt_tokens += int(details.get("cached_tokens") or 0)
+    return {
+        "promptTokens": prompt_tokens,
+        "completionTokens": completion_tokens,
+        "cachedPromptTokens": cached_prompt_tokens,
+    }
 
 
 def _drafts_equivalent(previous_draft_text: str, next_draft_text: str) -> bool:
@@ -425,16 +1731,16 @@ def _build_policy(evidence: dict[str, Any]) -> dict[str, Any]:
     }
 
     if required_keywords or optional_keywords or optional_geo_terms:
-        policy["rules"].append(
-            "Use SEO targets naturally: include at least one required keyword when available, optional keywords only if relevant, and at most one geo term."
-        )
-        policy["rules"].append(
-            "Never repeat keywords unnaturally or force phrases that do not match the review context."
-        )
+        policy["rules"].extend(SEO_POLICY_RULES)
 
     return policy
 
 
+def seo_brief_for_evidence(evidence: dict[str, Any]) -> str:
+    """The `seo_brief` the service would send for this evidence; shared with the offline scripts."""
+    return _build_seo_brief(_build_policy(evidence))
+
+
 def _build_seo_brief(policy: dict[str, Any]) -> str:
     targets = policy.get("seoTargets", {})
     required = targets.get("requiredKeywords", [])
@@ -566,7 +1872,7 @@ def _merge_seo_quality_with_verifier(verifier: dict[str, Any], seo_quality: dict
             "message": "Draft appears keyword-stuffed and should be rewritten naturally.",
         })
 
-    deduped: list[dict[str, str]] = []
+    deduped: list[dict[str, str | None]] = []
     seen_keys: set[tuple[str, str]] = set()
     for violation in violations:
         if not isinstance(violation, dict):
@@ -577,20 +1883,62 @@ def _merge_seo_quality_with_verifier(verifier: dict[str, Any], seo_quality: dict
         if key in seen_keys:
             continue
         seen_keys.add(key)
-        entry = {"code": code, "message": message}
         snippet = violation.get("snippet")
-        if snippet is not None:
-            entry["snippet"] = str(snippet)
-        deduped.append(entry)
+        deduped.append(_violation(code, message, None if snippet is None else str(snippet)))
 
-    validated = [VerifierViolation.model_validate(v).model_dump(exclude_none=True) for v in deduped]
     return {
         "pass": passed,
-        "violations": validated,
+        "violations": deduped,
         "suggestedRewrite": verifier.get("suggestedRewrite"),
     }
 
 
+def _violation(code: str, message: str, snippet: str | None = None) -> dict[str, str | None]:
+    """Build a violation already in `VerifierViolation` shape, so responses need no per-item validation."""
+    return {
+        "code": code or "INVALID",
+        "message": message or "Verifier flagged this draft.",
+        "snippet": snippet,
+    }
+
+
+def _new_generation(*, attempted: bool, variant: str | None = None) -> dict[str, Any]:
+    # Every `GenerationPayload` field, in declaration order, so the fast serializer matches `response_model`.
+    return {
+        "attempted": attempted,
+        "changed": False,
+        "attemptCount": 1,
+        "earlyRejected": False,
+        "repairCount": 0,
+        "variant": variant,
+    }
+
+
+def _seo_rejects_draft(seo_quality: dict[str, Any]) -> bool:
+    return bool(seo_quality.get("stuffingRisk") or seo_quality.get("geoTermOveruse"))
+
+
+def _seo_blocks_draft(seo_quality: dict[str, Any]) -> bool:
+    """True when `_merge_seo_quality_with_verifier` will fail the draft whatever the verifier says."""
+    return bool(seo_quality.get("missingRequiredKeywords")) or _seo_rejects_draft(seo_quality)
+
+
+def _partial_draft_doomed(partial_text: str, policy: dict[str, Any]) -> bool:
+    # Only counts are checked here: they can only grow as tokens arrive, unlike keyword density.
+    # A word still streaming in ("pizza" of "pizzas") is dropped, so only finished words count.
+    partial_text = _TRAILING_WORD_RE.sub("", partial_text)
+    targets = policy.get("seoTargets", {})
+    phrases = [
+        *_normalize_target_terms(targets.get("requiredKeywords")),
+        *_normalize_target_terms(targets.get("optionalKeywords")),
+    ]
+    geo_terms = _normalize_target_terms(targets.get("geoTerms"))
+    geo_hits = sum(1 for term in geo_terms if _count_phrase_occurrences(partial_text, term) > 0)
+    if geo_hits > 1:
+        return True
+    return any(_count_phrase_occurrences(partial_text, term) >= 3 for term in [*phrases, *geo_terms])
+
+
 def _normalize_target_terms(value: Any) -> list[str]:
     if not isinstance(value, list):
         return []
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# The service refuses to start without these; the benchmark never talks to OpenAI.
+os.environ.setdefault("DSPY_SERVICE_TOKEN", "benchmark-token")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-offline")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import httpx  # noqa: E402
+
+import app as service_app  # noqa: E402
+from fake_lm import FakeLMProfile, fake_lm_factory  # noqa: E402
+from programs import ProgramManager  # noqa: E402
+from settings import get_settings  # noqa: E402
+
+
+MODES = ("AUTO", "MANUAL_REGENERATE", "VERIFY_EXISTING_DRAFT")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark /api/review/process offline against a fake LM")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per (mode, concurrency) cell")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--draft-latency-ms", type=float, default=400.0)
+    parser.add_argument("--verify-latency-ms", type=float, default=250.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.35, help="Log-normal sigma for fake LM latency")
+    parser.add_argument("--output-token-ms", type=float, default=0.0, help="Fake LM decode time per completion token")
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--schema-error-rate", type=float, default=0.0)
+    parser.add_argument("--verify-fail-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="artifacts/benchmark_report.json", help="Output report path")
+    parser.add_argument("--baseline", help="Previous benchmark report to compare against")
+    parser.add_argument("--tag", default="manual", help="Run tag for report metadata")
+    return parser.parse_args()
+
+
+def build_manager(args: argparse.Namespace) -> ProgramManager:
+    settings = get_settings()
+    failure_rates = {
+        "latency_sigma": args.latency_sigma,
+        "output_token_ms": args.output_token_ms,
+        "timeout_rate": args.timeout_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "schema_error_rate": args.schema_error_rate,
+        "verify_fail_rate": args.verify_fail_rate,
+    }
+    draft_factory = fake_lm_factory(FakeLMProfile(latency_ms=args.draft_latency_ms, **failure_rates), seed=args.seed)
+    verify_factory = fake_lm_factory(FakeLMProfile(latency_ms=args.verify_latency_ms, **failure_rates), seed=args.seed + 1)
+    draft_models = {settings.draft_model}
+
+    def lm_factory(model_name: str, **kwargs: Any):
+        factory = draft_factory if model_name in draft_models else verify_factory
+        return factory(model_name, **kwargs)
+
+    return ProgramManager(settings, lm_factory=lm_factory)
+
+
+def build_payload(mode: str, index: int, rng: random.Random) -> dict[str, Any]:
+    comment_words = rng.choice([0, 8, 40, 160])
+    comment = " ".join(rng.choice(["great", "pizza", "service", "slow", "friendly", "cold", "staff"]) for _ in range(comment_words))
+    payload: dict[str, Any] = {
+        "orgId": "benchmark-org",
+        "reviewId": f"review-{index}",
+        "mode": mode,
+        "requestId": f"bench-{mode.lower()}-{index}",
+        "evidence": {
+            "starRating": rng.randint(1, 5),
+            # The index keeps every prompt unique so DSPy's response cache never short-circuits a call.
+            "comment": f"{comment} #{index}" if comment else None,
+            "reviewerDisplayName": f"Reviewer {index}",
+            "reviewerIsAnonymous": False,
+            "locationDisplayName": "Benchmark Pizzeria",
+            "createTime": "2026-01-01T00:00:00Z",
+            "highlights": [],
+            "mentionKeywords": [],
+            "seoProfile": {"primaryKeywords": ["pizza"], "secondaryKeywords": ["wood fired"], "geoTerms": ["leeds"]},
+            "tone": {"preset": "friendly"},
+        },
+    }
+    if mode == "MANUAL_REGENERATE":
+        payload["currentDraftText"] = f"Thanks for visiting us, reviewer {index}."
+    if mode == "VERIFY_EXISTING_DRAFT":
+        payload["candidateDraftText"] = f"Thank you for the pizza love, reviewer {index}!"
+    return payload
+
+
+async def run_cell(
+    client: httpx.AsyncClient,
+    token: str,
+    mode: str,
+    concurrency: int,
+    total: int,
+    warmup: int,
+    rng: random.Random,
+) -> dict[str, Any]:
+    payloads = [build_payload(mode, index, rng) for index in range(total + warmup)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies_ms: list[float] = []
+    statuses: dict[str, int] = {}
+    headers = {"authorization": f"Bearer {token}"}
+
+    async def one(payload: dict[str, Any], record: bool) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/api/review/process", json=payload, headers=headers)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        if not record:
+            return
+        latencies_ms.append(elapsed_ms)
+        if response.status_code == 200:
+            key = response.json()["decision"]
+        else:
+            key = f"{response.status_code}:{response.json().get('error', 'UNKNOWN')}"
+        statuses[key] = statuses.get(key, 0) + 1
+
+    await asyncio.gather(*(one(payload, record=False) for payload in payloads[:warmup]))
+
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(payload, record=True) for payload in payloads[warmup:]))
+    wall_s = time.perf_counter() - wall_started
+    cpu_s = time.process_time() - cpu_started
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": total,
+        "outcomes": dict(sorted(statuses.items())),
+        "latencyMs": {
+            "p50": percentile(latencies_ms, 50),
+            "p95": percentile(latencies_ms, 95),
+            "p99": percentile(latencies_ms, 99),
+            "max": round(max(latencies_ms, default=0.0), 2),
+        },
+        "requestsPerSecond": round(total / wall_s, 2) if wall_s > 0 else 0.0,
+        "cpuMsPerRequest": round(cpu_s * 1000 / total, 3) if total else 0.0,
+    }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return round(ordered[rank], 2)
+
+
+def compare(results: list[dict[str, Any]], baseline: dict[str, Any]) -> list[dict[str, Any]]:
+    previous = {(cell["mode"], cell["concurrency"]): cell for cell in baseline.get("results", [])}
+    deltas: list[dict[str, Any]] = []
+    for cell in results:
+        before = previous.get((cell["mode"], cell["concurrency"]))
+        if before is None:
+            continue
+        deltas.append({
+            "mode": cell["mode"],
+            "concurrency": cell["concurrency"],
+            "p50DeltaPct": _delta_pct(before["latencyMs"]["p50"], cell["latencyMs"]["p50"]),
+            "p95DeltaPct": _delta_pct(before["latencyMs"]["p95"], cell["latencyMs"]["p95"]),
+            "p99DeltaPct": _delta_pct(before["latencyMs"]["p99"], cell["latencyMs"]["p99"]),
+            "rpsDeltaPct": _delta_pct(before["requestsPerSecond"], cell["requestsPerSecond"]),
+            "cpuMsPerRequestDeltaPct": _delta_pct(before["cpuMsPerRequest"], cell["cpuMsPerRequest"]),
+        })
+    return deltas
+
+
+def _delta_pct(before: float, after: float) -> float | None:
+    if not before:
+        return None
+    return round((after - before) / before * 100, 2)
+
+
+async def run(args: argparse.Namespace, manager: ProgramManager) -> dict[str, Any]:
+    service_app.app.dependency_overrides[service_app.get_program_manager] = lambda: manager
+    token = get_settings().service_token
+    rng = random.Random(args.seed)
+
+    results: list[dict[str, Any]] = []
+    transport = httpx.ASGITransport(app=service_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for mode in args.modes:
+            for concurrency in args.concurrency:
+                cell = await run_cell(client, token, mode, concurrency, args.requests, args.warmup, rng)
+                print(json.dumps(cell, sort_keys=True), file=sys.stderr)
+                results.append(cell)
+
+    return {
+        "tag": args.tag,
+        "ranAtUtc": datetime.now(UTC).isoformat(),
+        "config": {
+            "requestsPerCell": args.requests,
+            "warmup": args.warmup,
+            "draftLatencyMs": args.draft_latency_ms,
+            "verifyLatencyMs": args.verify_latency_ms,
+            "latencySigma": args.latency_sigma,
+            "timeoutRate": args.timeout_rate,
+            "rateLimitRate": args.rate_limit_rate,
+            "schemaErrorRate": args.schema_error_rate,
+            "verifyFailRate": args.verify_fail_rate,
+            "seed": args.seed,
+        },
+        "program": manager.program_metadata(),
+        "verify": manager.verify_metadata(),
+        "results": results,
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    # Built outside the event loop: `ProgramManager` configures dspy, which pins the owning async task.
+    report = asyncio.run(run(args, build_manager(args)))
+
+    if args.baseline:
+        baseline = json.loads(resolve_path(args.baseline).read_text(encoding="utf-8"))
+        report["comparison"] = {"baseline": args.baseline, "deltas": compare(report["results"], baseline)}
+
+    output_path = resolve_path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+def resolve_path(raw: str) -> Path:
+    path = Path(raw)
+    if path.is_absolute():
+        return path
+    return ROOT / path
+
+
+if __name__ == "__main__":
+    main()
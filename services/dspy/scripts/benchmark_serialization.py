@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# The benchmark never serves HTTP or talks to OpenAI; these only satisfy settings validation.
+os.environ.setdefault("DSPY_SERVICE_TOKEN", "benchmark-token")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-offline")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from pydantic_core import to_json  # noqa: E402
+
+from fake_lm import FakeLMProfile, fake_lm_factory  # noqa: E402
+from models import ProcessReviewResponse, VerifierViolation  # noqa: E402
+from programs import ProgramManager  # noqa: E402
+from settings import get_settings  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Measure CPU per response for the validated and direct /api/review/process serialization paths"
+    )
+    parser.add_argument("--results", type=int, default=200, help="Distinct pipeline results to serialize")
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over the results per path")
+    parser.add_argument("--verify-fail-rate", type=float, default=0.5, help="Share of results carrying violations")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="artifacts/serialization_benchmark.json", help="Output report path")
+    return parser.parse_args()
+
+
+def build_results(args: argparse.Namespace) -> list[dict[str, Any]]:
+    profile = FakeLMProfile(latency_ms=0.0, latency_sigma=0.0, verify_fail_rate=args.verify_fail_rate)
+    manager = ProgramManager(get_settings(), lm_factory=fake_lm_factory(profile, seed=args.seed))
+    rng = random.Random(args.seed)
+    results: list[dict[str, Any]] = []
+    for index in range(args.results):
+        evidence = {
+            "starRating": rng.randint(1, 5),
+            "comment": " ".join(rng.choice(["great", "pizza", "service", "slow", "friendly"]) for _ in range(rng.randint(0, 60))),
+            "reviewerIsAnonymous": False,
+            "locationDisplayName": "Benchmark Pizza",
+            "createTime": "2026-01-01T00:00:00Z",
+            "seoProfile": {"primaryKeywords": ["wood fired pizza"], "geoTerms": ["Leeds"]},
+        }
+        results.append(manager.process_review(
+            mode="AUTO" if index % 2 else "VERIFY_EXISTING_DRAFT",
+            evidence_json=json.dumps(evidence),
+            candidate_draft_text="Thanks for visiting our Leeds pizza place, we hope to see you again soon.",
+        ))
+    return results
+
+
+def validated_path(result: dict[str, Any]) -> bytes:
+    """The previous path: violations re-validated twice, the response validated, then FastAPI's response_model pass."""
+    violations = result["verifier"]["violations"]
+    for _ in range(2):
+        violations = [VerifierViolation.model_validate(item).model_dump(exclude_none=True) for item in violations]
+    model = ProcessReviewResponse.model_validate({**result, "verifier": {**result["verifier"], "violations": violations}})
+    content = ProcessReviewResponse.model_validate(model.model_dump(by_alias=True)).model_dump(mode="json", by_alias=True)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def direct_path(result: dict[str, Any]) -> bytes:
+    return to_json(result)
+
+
+def measure(name: str, serialize, results: list[dict[str, Any]], rounds: int) -> dict[str, Any]:
+    for result in results[:10]:
+        serialize(result)
+    started_cpu = time.process_time()
+    started = time.perf_counter()
+    total_bytes = 0
+    for _ in range(rounds):
+        for result in results:
+            total_bytes += len(serialize(result))
+    cpu_seconds = time.process_time() - started_cpu
+    calls = rounds * len(results)
+    return {
+        "path": name,
+        "calls": calls,
+        "cpuUsPerResponse": round(cpu_seconds / calls * 1_000_000, 2),
+        "wallUsPerResponse": round((time.perf_counter() - started) / calls * 1_000_000, 2),
+        "meanBytes": round(total_bytes / calls, 1),
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    results = build_results(args)
+    # The direct path skips validation, so confirm every payload it emits still satisfies the response model.
+    schema_failures = 0
+    for result in results:
+        try:
+            ProcessReviewResponse.model_validate_json(direct_path(result))
+        except ValueError:
+            schema_failures += 1
+
+    validated = measure("validated", validated_path, results, args.rounds)
+    direct = measure("direct", direct_path, results, args.rounds)
+    report = {
+        "ranAtUtc": datetime.now(UTC).isoformat(),
+        "config": {"results": len(results), "rounds": args.rounds, "verifyFailRate": args.verify_fail_rate},
+        "meanViolations": round(sum(len(r["verifier"]["violations"]) for r in results) / len(results), 2),
+        "schemaFailures": schema_failures,
+        "paths": [validated, direct],
+        "cpuUsSavedPerResponse": round(validated["cpuUsPerResponse"] - direct["cpuUsPerResponse"], 2),
+        "speedup": round(validated["cpuUsPerResponse"] / direct["cpuUsPerResponse"], 2) if direct["cpuUsPerResponse"] else None,
+    }
+    output_path = ROOT / args.output
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import similarity  # noqa: E402
+
+
+REFERENCE_BACKEND = "sequence"
+# Candidates edited at most this much should pass the metric; heavier edits and unrelated replies should fail.
+ACCEPT_EDIT_RATE = 0.2
+REJECT_EDIT_RATE = 0.4
+OPENERS = ["Thank you so much", "Thanks a lot", "We really appreciate", "Many thanks", "Thank you"]
+SUBJECTS = ["the wood fired pizza", "our friendly staff", "the cosy atmosphere", "the quick service", "our garden terrace"]
+CLOSERS = [
+    "We look forward to welcoming you back soon.",
+    "Hope to see you again next time you are in Leeds.",
+    "Your feedback means a great deal to the whole team.",
+    "Please ask for the manager on your next visit so we can say hello.",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark draft-metric similarity backends against difflib")
+    parser.add_argument("--dataset", help="Draft JSONL whose `reply` fields are used as expected replies")
+    parser.add_argument("--examples", type=int, default=200, help="Synthetic expected replies when no dataset is given")
+    parser.add_argument("--candidates", type=int, default=8, help="Candidate drafts scored per expected reply")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the trainset, as BootstrapFewShot rounds do")
+    parser.add_argument("--backends", nargs="+", choices=sorted(similarity.BACKENDS), default=sorted(similarity.BACKENDS))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="artifacts/similarity_benchmark.json", help="Output report path")
+    return parser.parse_args()
+
+
+def load_expected(args: argparse.Namespace, rng: random.Random) -> list[str]:
+    if args.dataset:
+        replies: list[str] = []
+        with Path(args.dataset).open("r", encoding="utf-8") as handle:
+            for raw in handle:
+                if raw.strip():
+                    reply = json.loads(raw).get("reply")
+                    if isinstance(reply, str) and reply.strip():
+                        replies.append(reply)
+        if not replies:
+            raise ValueError("Dataset has no `reply` fields")
+        return replies
+    return [synthetic_reply(rng) for _ in range(args.examples)]
+
+
+def synthetic_reply(rng: random.Random) -> str:
+    sentences = [f"{rng.choice(OPENERS)} for the kind words about {rng.choice(SUBJECTS)}."]
+    for _ in range(rng.randint(1, 4)):
+        sentences.append(f"It is lovely to hear that {rng.choice(SUBJECTS)} made your evening special.")
+    sentences.append(rng.choice(CLOSERS))
+    return " ".join(sentences)
+
+
+def mutate(reply: str, rate: float, rng: random.Random) -> str:
+    words = reply.split()
+    out: list[str] = []
+    for word in words:
+        roll = rng.random()
+        if roll < rate / 3:
+            continue
+        if roll < rate * 2 / 3:
+            out.append(rng.choice(words))
+        elif roll < rate:
+            out.extend([word, rng.choice(words)])
+        else:
+            out.append(word)
+    return " ".join(out)
+
+
+def build_trials(expected: list[str], candidates: int, rng: random.Random) -> list[tuple[str, str, bool]]:
+    """Labelled `(expected, candidate, should_accept)` trials; the ambiguous middle band of edit rates is left out."""
+    trials: list[tuple[str, str, bool]] = []
+    for reply in expected:
+        for _ in range(candidates):
+            if rng.random() < 0.2:
+                trials.append((reply, rng.choice(expected), False))
+                continue
+            if rng.random() < 0.5:
+                trials.append((reply, mutate(reply, rng.uniform(0.0, ACCEPT_EDIT_RATE), rng), True))
+            else:
+                trials.append((reply, mutate(reply, rng.uniform(REJECT_EDIT_RATE, 0.7), rng), False))
+    return trials
+
+
+def run_backend(name: str, trials: list[tuple[str, str, bool]], rounds: int) -> tuple[list[float], float]:
+    score = similarity.BACKENDS[name]
+    similarity.clear_caches()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        scores = [score(expected, actual) for expected, actual, _ in trials]
+    return scores, time.perf_counter() - started
+
+
+def accuracy(labels: list[bool], scores: list[float], threshold: float) -> float:
+    matches = sum(1 for label, value in zip(labels, scores, strict=True) if label == (value >= threshold))
+    return matches / len(labels) if labels else 0.0
+
+
+def main() -> None:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    trials = build_trials(load_expected(args, rng), args.candidates, rng)
+
+    labels = [label for _, _, label in trials]
+    calls = len(trials) * args.rounds
+
+    reference_scores, reference_seconds = run_backend(REFERENCE_BACKEND, trials, args.rounds)
+    reference_decisions = [value >= similarity.DEFAULT_THRESHOLDS[REFERENCE_BACKEND] for value in reference_scores]
+
+    results: list[dict[str, Any]] = []
+    for name in args.backends:
+        if name == REFERENCE_BACKEND:
+            scores, seconds = reference_scores, reference_seconds
+        else:
+            scores, seconds = run_backend(name, trials, args.rounds)
+        threshold = similarity.DEFAULT_THRESHOLDS[name]
+        sweep = {round(step * 0.02, 2): accuracy(labels, scores, step * 0.02) for step in range(10, 50)}
+        best_threshold = max(sweep, key=lambda value: (sweep[value], -abs(value - threshold)))
+        result = {
+            "backend": name,
+            "seconds": round(seconds, 4),
+            "usPerCall": round(seconds / calls * 1_000_000, 2),
+            "speedupVsSequence": round(reference_seconds / seconds, 2) if seconds else None,
+            "threshold": threshold,
+            "accuracy": round(accuracy(labels, scores, threshold), 4),
+            "bestThreshold": best_threshold,
+            "bestAccuracy": round(sweep[best_threshold], 4),
+            "agreementWithSequence": round(accuracy(reference_decisions, scores, threshold), 4),
+        }
+        print(json.dumps(result, sort_keys=True), file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "ranAtUtc": datetime.now(UTC).isoformat(),
+        "config": {
+            "dataset": args.dataset,
+            "trials": len(trials),
+            "rounds": args.rounds,
+            "acceptEditRate": ACCEPT_EDIT_RATE,
+            "rejectEditRate": REJECT_EDIT_RATE,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    output_path = resolve_path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+def resolve_path(raw: str) -> Path:
+    path = Path(raw)
+    if path.is_absolute():
+        return path
+    return ROOT / path
+
+
+if __name__ == "__main__":
+    main()
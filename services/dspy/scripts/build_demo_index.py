@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from demo_index import DEFAULT_DIM, draft_query, verify_query, write_demo_index  # noqa: E402
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+from compile_bootstrap_fewshot import build_draft_trainset, build_verify_trainset, load_jsonl  # noqa: E402
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the memory-mapped demo index used by DSPY_DYNAMIC_DEMOS")
+    parser.add_argument("--task", choices=["draft", "verify"], required=True)
+    parser.add_argument("--dataset", required=True, help="Path to JSONL training examples")
+    parser.add_argument("--output-dir", default="artifacts/demo_index", help="Index root (DSPY_DEMO_INDEX_DIR)")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM, help="Hashed feature dimensions")
+    return parser.parse_args(argv)
+
+
+def index_records(task: str, rows: list[dict[str, Any]]) -> list[tuple[str, dict[str, Any]]]:
+    """`(query text, demo fields)` per usable row, built exactly as the compile script builds its trainset."""
+    records: list[tuple[str, dict[str, Any]]] = []
+    if task == "draft":
+        for example in build_draft_trainset(rows):
+            evidence = json.loads(example.evidence_json)
+            records.append((draft_query(evidence if isinstance(evidence, dict) else {}), example.toDict()))
+    else:
+        for example in build_verify_trainset(rows):
+            evidence = json.loads(example.evidence_json)
+            query = verify_query(evidence if isinstance(evidence, dict) else {}, example.draft_text)
+            records.append((query, example.toDict()))
+    return records
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    records = index_records(args.task, load_jsonl(Path(args.dataset)))
+    meta = write_demo_index(resolve_path(args.output_dir) / args.task, args.task, records, dim=args.dim)
+    print(json.dumps(meta, indent=2, sort_keys=True))
+
+
+def resolve_path(raw: str) -> Path:
+    path = Path(raw)
+    if path.is_absolute():
+        return path
+    return ROOT / path
+
+
+if __name__ == "__main__":
+    main()
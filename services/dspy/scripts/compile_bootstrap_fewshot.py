@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import argparse
-import difflib
 import json
+import os
 import sys
 from pathlib import Path
 from typing import Any
@@ -13,17 +13,45 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from programs import DraftProgram, VerifyProgram  # noqa: E402
+from programs import DraftProgram, FastDraftProgram, VerifyProgram, seo_brief_for_evidence  # noqa: E402
 
+SCRIPTS_DIR = Path(__file__).resolve().parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
 
-def parse_args() -> argparse.Namespace:
+from demo_cache import CachedBootstrapFewShot, DemoCache  # noqa: E402
+from evaluate_program import DEFAULT_MODELS  # noqa: E402
+from similarity import BACKENDS, DEFAULT_THRESHOLDS  # noqa: E402
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Compile DSPy programs with BootstrapFewShot")
-    parser.add_argument("--task", choices=["draft", "verify"], required=True)
+    parser.add_argument("--task", choices=["draft", "draft_fast", "verify"], required=True)
     parser.add_argument("--dataset", required=True, help="Path to JSONL training examples")
     parser.add_argument("--output", required=True, help="Output artifact path")
     parser.add_argument("--max-demos", type=int, default=8)
-    parser.add_argument("--similarity-threshold", type=float, default=0.75)
-    return parser.parse_args()
+    parser.add_argument("--model", help="Teacher LM (defaults to the service's model for the task)")
+    parser.add_argument(
+        "--demo-cache",
+        default=".cache/demo_cache.sqlite3",
+        help="SQLite file of bootstrapped demos reused across runs",
+    )
+    parser.add_argument("--no-demo-cache", action="store_true", help="Bootstrap every example from scratch")
+    parser.add_argument(
+        "--similarity",
+        choices=sorted(BACKENDS),
+        default="sequence",
+        help="Draft metric similarity backend (sequence = difflib ratio; ngram and minhash are faster opt-ins)",
+    )
+    parser.add_argument(
+        "--similarity-threshold",
+        type=float,
+        help="Draft metric acceptance threshold (defaults to the backend's calibrated value)",
+    )
+    args = parser.parse_args(argv)
+    if args.similarity_threshold is None:
+        args.similarity_threshold = DEFAULT_THRESHOLDS[args.similarity]
+    return args
 
 
 def load_jsonl(path: Path) -> list[dict[str, Any]]:
@@ -45,23 +73,23 @@ def load_jsonl(path: Path) -> list[dict[str, Any]]:
     return rows
 
 
-def normalize_text(value: str) -> str:
-    return " ".join(value.lower().split())
-
+def draft_metric(threshold: float, similarity: str = "sequence"):
+    score = BACKENDS[similarity]
 
-def draft_metric(threshold: float):
     def _metric(example: dspy.Example, prediction: Any, trace: Any = None) -> bool:  # noqa: ARG001
-        expected = normalize_text(str(example.reply))
-        actual = normalize_text(str(getattr(prediction, "reply", prediction)))
-        if not expected or not actual:
+        expected = str(example.reply)
+        actual = str(getattr(prediction, "reply", prediction))
+        if not expected.strip() or not actual.strip():
             return False
-        ratio = difflib.SequenceMatcher(a=expected, b=actual).ratio()
-        return ratio >= threshold
+        return score(expected, actual) >= threshold
 
     return _metric
 
 
 def verify_metric(example: dspy.Example, prediction: Any, trace: Any = None) -> bool:  # noqa: ARG001
+    if isinstance(prediction, dict):
+        # VerifyProgram returns the service payload rather than the raw prediction.
+        prediction = dspy.Prediction(passed=prediction.get("pass"), violations=prediction.get("violations") or [])
     expected_pass = bool(example.passed)
     actual_pass = bool(getattr(prediction, "passed", False))
     if expected_pass != actual_pass:
@@ -94,9 +122,11 @@ def build_draft_trainset(rows: list[dict[str, Any]]) -> list[dspy.Example]:
         if evidence is None or not isinstance(reply, str):
             continue
         examples.append(
-            dspy.Example(evidence_json=json.dumps(evidence, separators=(",", ":")), reply=reply).with_inputs(
-                "evidence_json"
-            )
+            dspy.Example(
+                evidence_json=json.dumps(evidence, separators=(",", ":")),
+                seo_brief=seo_brief_for_evidence(evidence if isinstance(evidence, dict) else {}),
+                reply=reply,
+            ).with_inputs("evidence_json", "seo_brief")
         )
     if not examples:
         raise ValueError("No usable draft examples found in dataset")
@@ -126,31 +156,63 @@ def build_verify_trainset(rows: list[dict[str, Any]]) -> list[dspy.Example]:
     return examples
 
 
-def main() -> None:
-    args = parse_args()
+def compile_program(args: argparse.Namespace) -> dict[str, Any]:
+    """Compile and save the artifact for `args.task`; returns trainset size and demo cache reuse."""
     rows = load_jsonl(Path(args.dataset))
 
-    if args.task == "draft":
-        student = DraftProgram()
+    env_name, default_model = DEFAULT_MODELS[args.task]
+    dspy.configure(lm=dspy.LM(args.model or os.getenv(env_name, default_model)), adapter=dspy.JSONAdapter())
+
+    if args.task in {"draft", "draft_fast"}:
+        student = FastDraftProgram() if args.task == "draft_fast" else DraftProgram()
         trainset = build_draft_trainset(rows)
-        metric = draft_metric(args.similarity_threshold)
+        metric = draft_metric(args.similarity_threshold, args.similarity)
+        # Demos bootstrapped by the reasoning variant carry a `reasoning` field, so the variants cache apart.
+        metric_key = f"{args.task}:{args.similarity}:{args.similarity_threshold}"
     else:
         student = VerifyProgram()
         trainset = build_verify_trainset(rows)
         metric = verify_metric
+        metric_key = "verify"
 
-    optimizer = dspy.BootstrapFewShot(
-        metric=metric,
-        max_bootstrapped_demos=args.max_demos,
-        max_labeled_demos=args.max_demos,
-    )
-    compiled = optimizer.compile(student=student, trainset=trainset)
+    optimizer_kwargs = {
+        "metric": metric,
+        "max_bootstrapped_demos": args.max_demos,
+        "max_labeled_demos": args.max_demos,
+    }
+    demo_cache = None if args.no_demo_cache else DemoCache(resolve_path(args.demo_cache))
+    if demo_cache is None:
+        optimizer = dspy.BootstrapFewShot(**optimizer_kwargs)
+    else:
+        optimizer = CachedBootstrapFewShot(cache=demo_cache, metric_key=metric_key, **optimizer_kwargs)
+    try:
+        compiled = optimizer.compile(student=student, trainset=trainset)
+    finally:
+        if demo_cache is not None:
+            demo_cache.close()
 
     output_path = Path(args.output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     compiled.save(str(output_path))
+    return {
+        "examples": len(trainset),
+        "demoCache": demo_cache.stats() if demo_cache is not None else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    summary = compile_program(args)
+    print(f"Compiled {args.task} program to {args.output} using {summary['examples']} examples")
+    if summary["demoCache"] is not None:
+        print(f"Demo cache: {json.dumps(summary['demoCache'], sort_keys=True)}")
+
 
-    print(f"Compiled {args.task} program to {output_path} using {len(trainset)} examples")
+def resolve_path(raw: str) -> Path:
+    path = Path(raw)
+    if path.is_absolute():
+        return path
+    return ROOT / path
 
 
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import dspy
+
+
+class DemoCache:
+    """Persisted bootstrap outcomes: whether an example passed the metric and the demos its trace produced."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS demo_cache ("
+            " key TEXT PRIMARY KEY,"
+            " success INTEGER NOT NULL,"
+            " traces TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> tuple[bool, dict[str, list[dict[str, Any]]]] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT success, traces FROM demo_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return bool(row[0]), json.loads(row[1])
+
+    def set(self, key: str, success: bool, traces: dict[str, list[dict[str, Any]]]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO demo_cache (key, success, traces, created_at) VALUES (?, ?, ?, ?)",
+                (key, int(success), json.dumps(traces), time.time()),
+            )
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reuseRate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class CachedBootstrapFewShot(dspy.BootstrapFewShot):
+    """BootstrapFewShot that only pays LM calls for examples it has not bootstrapped before.
+
+    Entries are keyed by example content, the student's predictor signatures, the teacher
+    model, the bootstrap round and `metric_key`. The teacher's labeled demos are sampled from
+    the trainset and are deliberately left out of the key, so adding rows does not
+    invalidate earlier outcomes.
+    """
+
+    def __init__(self, *, cache: DemoCache, metric_key: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.metric_key = metric_key
+
+    def compile(self, student, *, teacher=None, trainset):
+        self._program_key = _program_fingerprint(student)
+        return super().compile(student, teacher=teacher, trainset=trainset)
+
+    def _bootstrap_one_example(self, example, round_idx=0):
+        key = self._cache_key(example, round_idx)
+        cached = self.cache.get(key)
+        if cached is not None:
+            success, traces = cached
+            if success:
+                for name, demos in traces.items():
+                    if name in self.name2traces:
+                        self.name2traces[name].extend(dspy.Example(augmented=True, **demo) for demo in demos)
+            return success
+
+        before = {name: len(demos) for name, demos in self.name2traces.items()}
+        errors_before = self.error_count
+        success = super()._bootstrap_one_example(example, round_idx)
+        if self.error_count != errors_before:
+            # Provider errors are transient; only genuine metric outcomes are worth remembering.
+            return success
+
+        try:
+            traces = {
+                name: [_demo_payload(demo) for demo in demos[before[name]:]]
+                for name, demos in self.name2traces.items()
+                if len(demos) > before[name]
+            }
+        except TypeError:
+            return success
+        self.cache.set(key, success, traces)
+        return success
+
+    def _cache_key(self, example: dspy.Example, round_idx: int) -> str:
+        lm = self.teacher_settings.get("lm") or dspy.settings.lm
+        payload = {
+            "example": example.toDict(),
+            "program": self._program_key,
+            "model": getattr(lm, "model", None),
+            "round": round_idx,
+            "metric": self.metric_key,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _program_fingerprint(program: dspy.Module) -> str:
+    signatures = {
+        name: {"fields": list(predictor.signature.fields), **predictor.signature.dump_state()}
+        for name, predictor in program.named_predictors()
+    }
+    return hashlib.sha256(json.dumps(signatures, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _demo_payload(demo: dspy.Example) -> dict[str, Any]:
+    payload = {key: value for key, value in demo.toDict().items() if key != "augmented"}
+    json.dumps(payload)  # Raises TypeError for outputs that cannot be persisted.
+    return payload
@@ -1,99 +1,273 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import os
 import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Any
 
+import dspy
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from programs import DraftProgram, VerifyProgram  # noqa: E402
+from programs import DraftProgram, FastDraftProgram, VerifyProgram, seo_brief_for_evidence, summarize_usage  # noqa: E402
+
 
+DEFAULT_MODELS = {
+    "draft": ("DSPY_OPENAI_MODEL_DRAFT", "openai/gpt-4o-mini"),
+    "draft_fast": ("DSPY_OPENAI_MODEL_DRAFT", "openai/gpt-4o-mini"),
+    "verify": ("DSPY_OPENAI_MODEL_VERIFY", "openai/gpt-4.1-mini"),
+}
 
-def parse_args() -> argparse.Namespace:
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Evaluate compiled DSPy programs")
-    parser.add_argument("--task", choices=["draft", "verify"], required=True)
+    parser.add_argument("--task", choices=sorted(DEFAULT_MODELS), required=True)
     parser.add_argument("--dataset", required=True, help="Path to JSONL evaluation examples")
     parser.add_argument("--artifact", required=True, help="Compiled program artifact path")
-    return parser.parse_args()
+    parser.add_argument("--model", help="LM to evaluate with (defaults to the service's model for the task)")
+    parser.add_argument("--workers", type=int, default=8, help="Examples evaluated concurrently")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Max examples started per second (0 = unlimited)")
+    parser.add_argument(
+        "--checkpoint",
+        help="Per-example results JSONL; rerunning with the same path resumes (default: next to the artifact)",
+    )
+    return parser.parse_args(argv)
+
 
+class RateLimiter:
+    def __init__(self, per_second: float) -> None:
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
 
-def load_jsonl(path: Path) -> list[dict[str, Any]]:
-    rows: list[dict[str, Any]] = []
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_s = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait_s > 0:
+            time.sleep(wait_s)
+
+
+def iter_jsonl(path: Path) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Yield `(example_key, row)` one line at a time.
+
+    The key is the line's content digest plus how many identical lines came before it, so
+    checkpoint entries survive rows being inserted or removed elsewhere in the file.
+    """
+    seen: Counter[str] = Counter()
     with path.open("r", encoding="utf-8") as handle:
         for raw in handle:
             line = raw.strip()
-            if line:
-                rows.append(json.loads(line))
-    if not rows:
-        raise ValueError("Dataset is empty")
-    return rows
+            if not line:
+                continue
+            digest = hashlib.sha256(line.encode("utf-8")).hexdigest()[:16]
+            seen[digest] += 1
+            yield f"{digest}:{seen[digest]}", json.loads(line)
+
+
+def default_checkpoint_path(task: str, artifact: Path, dataset: Path, model: str) -> Path:
+    # Keyed by artifact content and model so a recompiled artifact never resumes stale results.
+    digest = hashlib.sha256()
+    digest.update(artifact.read_bytes() if artifact.exists() else b"")
+    digest.update(str(dataset.resolve()).encode("utf-8"))
+    digest.update(model.encode("utf-8"))
+    return artifact.with_name(f"{artifact.name}.{task}-{digest.hexdigest()[:12]}.eval.jsonl")
+
+
+def load_checkpoint(path: Path) -> set[str]:
+    if not path.exists():
+        return set()
+    done: set[str] = set()
+    with path.open("r", encoding="utf-8") as handle:
+        for raw in handle:
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated final line; that example is simply rerun.
+                continue
+            if not record.get("error"):
+                done.add(record["key"])
+    return done
+
+
+def evaluate_draft_row(program: DraftProgram, row: dict[str, Any]) -> dict[str, Any] | None:
+    evidence = row.get("evidence")
+    if evidence is None:
+        return None
+    draft = program(
+        evidence_json=json.dumps(evidence, separators=(",", ":")),
+        seo_brief=seo_brief_for_evidence(evidence if isinstance(evidence, dict) else {}),
+    )
+    return {"non_empty": isinstance(draft, str) and bool(draft.strip())}
 
 
-def evaluate_draft(program: DraftProgram, rows: list[dict[str, Any]]) -> dict[str, Any]:
-    scored = 0
-    non_empty = 0
+def evaluate_verify_row(program: VerifyProgram, row: dict[str, Any]) -> dict[str, Any] | None:
+    evidence = row.get("evidence")
+    draft_text = row.get("draftText")
+    expected_pass = row.get("pass")
+    if evidence is None or not isinstance(draft_text, str) or not isinstance(expected_pass, bool):
+        return None
+    result = program(
+        evidence_json=json.dumps(evidence, separators=(",", ":")),
+        draft_text=draft_text,
+        policy_json=json.dumps(row.get("policy", {}), separators=(",", ":")),
+    )
+    return {"pass_match": bool(result.get("pass")) == expected_pass}
 
-    for row in rows:
-        evidence = row.get("evidence")
-        if evidence is None:
-            continue
-        scored += 1
-        draft = program(evidence_json=json.dumps(evidence, separators=(",", ":")))
-        if isinstance(draft, str) and draft.strip():
-            non_empty += 1
 
+def run_example(task: str, program: Any, key: str, row: dict[str, Any], limiter: RateLimiter) -> dict[str, Any] | None:
+    limiter.acquire()
+    evaluate_row = evaluate_verify_row if task == "verify" else evaluate_draft_row
+    started = time.perf_counter()
+    with dspy.track_usage() as usage:
+        try:
+            outcome = evaluate_row(program, row)
+            error = None
+        except Exception as exc:  # noqa: BLE001
+            outcome = {}
+            error = f"{type(exc).__name__}: {exc}"
+    if outcome is None:
+        return None
     return {
-        "examples": scored,
-        "non_empty_rate": (non_empty / scored) if scored else 0.0,
+        "key": key,
+        **outcome,
+        "error": error,
+        "latencyMs": round((time.perf_counter() - started) * 1000, 2),
+        "usage": summarize_usage(usage.get_total_tokens()),
     }
 
 
-def evaluate_verify(program: VerifyProgram, rows: list[dict[str, Any]]) -> dict[str, Any]:
-    scored = 0
-    pass_match = 0
+def evaluate(
+    task: str,
+    program: Any,
+    dataset: Path,
+    checkpoint: Path,
+    workers: int,
+    limiter: RateLimiter,
+) -> set[str]:
+    """Evaluate every dataset row without a checkpointed result; returns the dataset's example keys."""
+    done = load_checkpoint(checkpoint)
+    keys: set[str] = set()
+    checkpoint.parent.mkdir(parents=True, exist_ok=True)
+    in_flight: set[Future[dict[str, Any] | None]] = set()
+    max_in_flight = max(1, workers) * 2
+
+    with checkpoint.open("a", encoding="utf-8") as sink, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+
+        def drain(block_until: int) -> None:
+            nonlocal in_flight
+            while len(in_flight) > block_until:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    if record is not None:
+                        sink.write(json.dumps(record, sort_keys=True) + "\n")
+                        sink.flush()
+
+        for key, row in iter_jsonl(dataset):
+            keys.add(key)
+            if key in done:
+                continue
+            in_flight.add(pool.submit(run_example, task, program, key, row, limiter))
+            drain(max_in_flight - 1)
+        drain(0)
+    return keys
 
-    for row in rows:
-        evidence = row.get("evidence")
-        draft_text = row.get("draftText")
-        expected_pass = row.get("pass")
-        if evidence is None or not isinstance(draft_text, str) or not isinstance(expected_pass, bool):
-            continue
 
-        scored += 1
-        result = program(
-            evidence_json=json.dumps(evidence, separators=(",", ":")),
-            draft_text=draft_text,
-            policy_json=json.dumps(row.get("policy", {}), separators=(",", ":")),
-        )
-        if bool(result.get("pass")) == expected_pass:
-            pass_match += 1
+def summarize(task: str, checkpoint: Path, keys: set[str]) -> dict[str, Any]:
+    """Score the checkpoint records whose key is in `keys`, the current dataset's example keys.
+
+    Records for lines since edited or removed stay in the checkpoint but are left out.
+    """
+    hit_field = "pass_match" if task == "verify" else "non_empty"
+    # Errored examples are retried on resume, so only the latest record per example counts.
+    latest: dict[str, tuple[bool, bool, float, dict[str, int]]] = {}
+    with checkpoint.open("r", encoding="utf-8") as handle:
+        for raw in handle:
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if record["key"] not in keys:
+                continue
+            latest[record["key"]] = (
+                bool(record.get(hit_field)),
+                bool(record.get("error")),
+                float(record.get("latencyMs", 0.0)),
+                record.get("usage") or {},
+            )
+
+    scored = len(latest)
+    hits = sum(1 for hit, _, _, _ in latest.values() if hit)
+    errors = sum(1 for _, errored, _, _ in latest.values() if errored)
+    latencies = sorted(latency for _, _, latency, _ in latest.values())
+    usage = {"promptTokens": 0, "completionTokens": 0, "cachedPromptTokens": 0}
+    for _, _, _, record_usage in latest.values():
+        for name in usage:
+            usage[name] += int(record_usage.get(name, 0))
 
     return {
         "examples": scored,
-        "pass_match_rate": (pass_match / scored) if scored else 0.0,
+        f"{hit_field}_rate": (hits / scored) if scored else 0.0,
+        "error_rate": (errors / scored) if scored else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+        },
+        "usage": usage,
     }
 
 
-def main() -> None:
-    args = parse_args()
-    rows = load_jsonl(Path(args.dataset))
+def _percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    dataset = Path(args.dataset)
+    if not dataset.exists():
+        raise FileNotFoundError(f"Dataset not found: {dataset}")
+
+    env_name, default_model = DEFAULT_MODELS[args.task]
+    model = args.model or os.getenv(env_name, default_model)
+    dspy.configure(lm=dspy.LM(model, cache=False), adapter=dspy.JSONAdapter())
 
     if args.task == "draft":
         program = DraftProgram()
+    elif args.task == "draft_fast":
+        program = FastDraftProgram()
     else:
         program = VerifyProgram()
 
     program.load(args.artifact)
 
-    if args.task == "draft":
-        metrics = evaluate_draft(program, rows)
-    else:
-        metrics = evaluate_verify(program, rows)
+    checkpoint = Path(args.checkpoint or default_checkpoint_path(args.task, Path(args.artifact), dataset, model))
+    keys = evaluate(args.task, program, dataset, checkpoint, args.workers, RateLimiter(args.rate_limit))
+
+    metrics = summarize(args.task, checkpoint, keys)
+    if not metrics["examples"]:
+        raise ValueError("Dataset is empty")
+    return metrics
+
 
+def main(argv: list[str] | None = None) -> None:
+    metrics = run(parse_args(argv))
     print(json.dumps(metrics, indent=2, sort_keys=True))
 
 
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+
+import dspy
+import litellm
+
+
+DEFAULT_DRAFT_REPLY = (
+    "Thank you so much for the kind words about our pizza! We are delighted you enjoyed your visit "
+    "and look forward to welcoming you back soon."
+)
+
+
+@dataclass(frozen=True)
+class FakeLMProfile:
+    latency_ms: float = 400.0
+    latency_sigma: float = 0.35
+    timeout_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    schema_error_rate: float = 0.0
+    verify_fail_rate: float = 0.0
+    # Decode time per completion token, on top of `latency_ms`, so output budgets show up in latency.
+    output_token_ms: float = 0.0
+    draft_reply: str = DEFAULT_DRAFT_REPLY
+
+
+class FakeLM(dspy.BaseLM):
+    """Offline stand-in for `dspy.LM` with log-normal latency, injected failures and canned outputs.
+
+    The task is inferred from the output fields advertised in the system message, so one
+    instance can serve draft, verify and batched verify calls. Completions longer than the
+    call's `max_tokens` are clipped and reported with `finish_reason="length"`.
+    """
+
+    def __init__(self, model: str, profile: FakeLMProfile, seed: int | None = None, **kwargs: Any) -> None:
+        super().__init__(
+            model=model,
+            model_type="chat",
+            temperature=kwargs.get("temperature", 0.0),
+            max_tokens=kwargs.get("max_tokens", 1000),
+            cache=False,
+        )
+        self.profile = profile
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def forward(self, prompt: str | None = None, messages: list[dict[str, Any]] | None = None, **kwargs: Any):
+        messages = messages or [{"role": "user", "content": prompt or ""}]
+        with self._rng_lock:
+            latency_s = self.profile.latency_ms * self._rng.lognormvariate(0.0, self.profile.latency_sigma) / 1000
+            roll = self._rng.random()
+            verdict_roll = self._rng.random()
+
+        time.sleep(latency_s)
+        if roll < self.profile.timeout_rate:
+            raise litellm.Timeout(message="Fake LM request timed out", model=self.model, llm_provider="openai")
+        roll -= self.profile.timeout_rate
+        if roll < self.profile.rate_limit_rate:
+            raise litellm.RateLimitError(message="Fake LM rate limit exceeded", llm_provider="openai", model=self.model)
+        roll -= self.profile.rate_limit_rate
+        if roll < self.profile.schema_error_rate:
+            content = "this is not the JSON object you asked for"
+        else:
+            content = json.dumps(self._canned_output(messages, passed=verdict_roll >= self.profile.verify_fail_rate))
+
+        finish_reason = "stop"
+        max_tokens = kwargs.get("max_tokens") or self.kwargs.get("max_tokens")
+        if max_tokens and len(content) // 4 > max_tokens:
+            content = content[: max_tokens * 4]
+            finish_reason = "length"
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 4
+        completion_tokens = len(content) // 4
+        time.sleep(completion_tokens * self.profile.output_token_ms / 1000)
+        return SimpleNamespace(
+            model=self.model,
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content=content, tool_calls=None),
+                    finish_reason=finish_reason,
+                )
+            ],
+            usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+
+    def _canned_output(self, messages: list[dict[str, Any]], passed: bool) -> dict[str, Any]:
+        system = str(messages[0].get("content", "")) if messages else ""
+        if "`reply`" in system:
+            output: dict[str, Any] = {"reply": self.profile.draft_reply}
+            if "`reasoning`" in system:
+                output = {"reasoning": "The reviewer praised the food.", **output}
+            return output
+        if "`passed`" not in system and "`suggested_rewrite`" in system:
+            return {"suggested_rewrite": self.profile.draft_reply}
+        verdict: dict[str, Any] = {
+            "passed": passed,
+            "violations": [] if passed else [{"code": "UNSUPPORTED_CLAIM", "message": "Fake verifier rejection."}],
+        }
+        if "`suggested_rewrite`" in system:
+            verdict["suggested_rewrite"] = "" if passed else self.profile.draft_reply
+        if "`verdicts`" in system:
+            items_json = _last_field_value(messages, "items_json")
+            ids = [item.get("id") for item in json.loads(items_json or "[]") if isinstance(item, dict)]
+            return {"verdicts": [{"id": item_id, **verdict} for item_id in ids]}
+        return verdict
+
+
+def fake_lm_factory(profile: FakeLMProfile, seed: int | None = None):
+    def _factory(model_name: str, **kwargs: Any) -> FakeLM:
+        return FakeLM(model_name, profile=profile, seed=seed, **kwargs)
+
+    return _factory
+
+
+def _last_field_value(messages: list[dict[str, Any]], field_name: str) -> str | None:
+    content = str(messages[-1].get("content", ""))
+    marker = f"[[ ## {field_name} ## ]]\n"
+    start = content.find(marker)
+    if start < 0:
+        return None
+    value = content[start + len(marker):]
+    # The value runs until the next field or the adapter's closing output instructions.
+    ends = [end for end in (value.find("\n\n[[ ## "), value.find("\n\nRespond with ")) if end >= 0]
+    return value[:min(ends)] if ends else value
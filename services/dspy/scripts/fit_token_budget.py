@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from collections import defaultdict
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from token_budget import TOKEN_STEP, draft_bucket, length_bucket  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fit per-bucket draft/verify max_tokens from captured traffic")
+    parser.add_argument("--capture", required=True, help="Capture JSONL written by DSPY_CAPTURE_SAMPLE_RATE")
+    parser.add_argument("--percentile", type=float, default=95.0, help="Completion-token percentile to cover")
+    parser.add_argument("--margin", type=float, default=1.2, help="Headroom multiplier on the percentile")
+    parser.add_argument("--min-samples", type=int, default=30, help="Buckets with fewer samples keep the defaults")
+    parser.add_argument("--output", default="artifacts/token_budget.json", help="Output path (DSPY_TOKEN_BUDGET_PATH)")
+    return parser.parse_args()
+
+
+def collect_samples(path: Path) -> dict[str, dict[str, list[int]]]:
+    """Completion tokens per LM call, grouped by stage and bucket."""
+    samples: dict[str, dict[str, list[int]]] = {"draft": defaultdict(list), "verify": defaultdict(list)}
+    with path.open("r", encoding="utf-8") as handle:
+        for raw in handle:
+            if not raw.strip():
+                continue
+            record = json.loads(raw)
+            result = record.get("result")
+            if not result:
+                continue
+            usage = result.get("usage") or {}
+            generation = result.get("generation") or {}
+            # Cache hits report no tokens and say nothing about completion length.
+            draft_tokens = (usage.get("draft") or {}).get("completionTokens") or 0
+            if draft_tokens and not generation.get("earlyRejected"):
+                bucket = draft_bucket(record["request"]["evidence"], record["request"]["mode"])
+                samples["draft"][bucket].append(math.ceil(draft_tokens / max(generation.get("attemptCount") or 1, 1)))
+            verify_tokens = (usage.get("verify") or {}).get("completionTokens") or 0
+            if verify_tokens:
+                samples["verify"][length_bucket(len(result.get("draftText") or ""))].append(verify_tokens)
+    return samples
+
+
+def fit(samples: dict[str, dict[str, list[int]]], args: argparse.Namespace) -> dict[str, Any]:
+    table: dict[str, Any] = {
+        "fittedAtUtc": datetime.now(UTC).isoformat(),
+        "percentile": args.percentile,
+        "margin": args.margin,
+        "samples": {},
+    }
+    for stage, buckets in samples.items():
+        table[stage] = {}
+        table["samples"][stage] = {}
+        for bucket, values in sorted(buckets.items()):
+            table["samples"][stage][bucket] = len(values)
+            if len(values) < args.min_samples:
+                continue
+            tokens = percentile(sorted(values), args.percentile) * args.margin
+            table[stage][bucket] = math.ceil(tokens / TOKEN_STEP) * TOKEN_STEP
+    return table
+
+
+def percentile(ordered: list[int], pct: float) -> float:
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return float(ordered[rank])
+
+
+def main() -> None:
+    args = parse_args()
+    capture_path = resolve_path(args.capture)
+    if not capture_path.exists():
+        raise FileNotFoundError(f"Capture not found: {capture_path}")
+    table = fit(collect_samples(capture_path), args)
+    output_path = resolve_path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(table, indent=2, sort_keys=True), encoding="utf-8")
+    print(json.dumps(table, indent=2, sort_keys=True))
+
+
+def resolve_path(raw: str) -> Path:
+    path = Path(raw)
+    if path.is_absolute():
+        return path
+    return ROOT / path
+
+
+if __name__ == "__main__":
+    main()
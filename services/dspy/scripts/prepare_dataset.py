@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+from collections import Counter
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, TextIO
+
+from pydantic import ValidationError
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from models import EvidenceSnapshot  # noqa: E402
+
+
+DEDUPE_BATCH_SIZE = 1000
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Validate, dedupe and split a JSONL review corpus into deterministic train/eval shards"
+    )
+    parser.add_argument("--task", choices=["draft", "verify"], required=True)
+    parser.add_argument("--input", nargs="+", required=True, help="One or more source JSONL files, read in order")
+    parser.add_argument("--output-dir", required=True, help="Directory for shards, stats.json and rejects.jsonl")
+    parser.add_argument("--eval-fraction", type=float, default=0.1)
+    parser.add_argument("--train-shards", type=int, default=1)
+    parser.add_argument("--eval-shards", type=int, default=1)
+    parser.add_argument("--salt", default="v1", help="Changing the salt reshuffles which rows land in eval")
+    return parser.parse_args()
+
+
+def iter_rows(paths: list[Path]) -> Iterator[tuple[str, int, str]]:
+    for path in paths:
+        with path.open("r", encoding="utf-8") as handle:
+            for line_number, raw in enumerate(handle, start=1):
+                line = raw.strip()
+                if line:
+                    yield str(path), line_number, line
+
+
+def validate_row(task: str, raw: dict[str, Any]) -> tuple[dict[str, Any] | None, str | None]:
+    """Return `(canonical_row, None)` or `(None, reject_reason)`."""
+    try:
+        evidence = EvidenceSnapshot.model_validate(raw.get("evidence")).model_dump(mode="json")
+    except ValidationError:
+        return None, "invalid_evidence"
+
+    if task == "draft":
+        reply = raw.get("reply")
+        if not isinstance(reply, str) or not reply.strip():
+            return None, "missing_reply"
+        return {"evidence": evidence, "reply": reply.strip()}, None
+
+    draft_text = raw.get("draftText")
+    passed = raw.get("pass")
+    if not isinstance(draft_text, str) or not draft_text.strip():
+        return None, "missing_draft_text"
+    if not isinstance(passed, bool):
+        return None, "missing_pass"
+    violations = raw.get("violations") or []
+    if not isinstance(violations, list):
+        return None, "invalid_violations"
+    row: dict[str, Any] = {
+        "evidence": evidence,
+        "draftText": draft_text.strip(),
+        "pass": passed,
+        "violations": violations,
+        "suggestedRewrite": raw.get("suggestedRewrite") or "",
+    }
+    if isinstance(raw.get("policy"), dict):
+        row["policy"] = raw["policy"]
+    return row, None
+
+
+def dedupe_key(task: str, row: dict[str, Any]) -> str:
+    evidence = json.dumps(row["evidence"], sort_keys=True, separators=(",", ":"))
+    text = row["reply"] if task == "draft" else row["draftText"]
+    parts = [evidence, normalize_reply(text)]
+    if task == "verify":
+        parts.append(str(row["pass"]))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def normalize_reply(text: str) -> str:
+    # Case, punctuation and whitespace differences alone do not make a new example.
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def assign(key: str, salt: str, eval_fraction: float, train_shards: int, eval_shards: int) -> tuple[str, int]:
+    """Split and shard depend only on the row's dedupe key, never on input order or corpus size."""
+    digest = hashlib.sha256(f"{salt}:{key}".encode("utf-8")).digest()
+    bucket = int.from_bytes(digest[:8], "big") / 2**64
+    shard_seed = int.from_bytes(digest[8:16], "big")
+    if bucket < eval_fraction:
+        return "eval", shard_seed % eval_shards
+    return "train", shard_seed % train_shards
+
+
+class SeenKeys:
+    """On-disk set of dedupe keys so memory stays flat as the corpus grows."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.unlink(missing_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE seen (key BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._pending = 0
+
+    def add(self, key: str) -> bool:
+        """Record `key`; returns False if it was already present."""
+        cursor = self._conn.execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (bytes.fromhex(key),))
+        self._pending += 1
+        if self._pending >= DEDUPE_BATCH_SIZE:
+            self._conn.commit()
+            self._pending = 0
+        return cursor.rowcount == 1
+
+    def close(self) -> None:
+        self._conn.close()
+        self.path.unlink(missing_ok=True)
+
+
+def shard_path(output_dir: Path, split: str, index: int, total: int) -> Path:
+    return output_dir / f"{split}-{index:05d}-of-{total:05d}.jsonl"
+
+
+def main() -> None:
+    args = parse_args()
+    if not 0.0 <= args.eval_fraction < 1.0:
+        raise ValueError("--eval-fraction must be in [0, 1)")
+    if args.train_shards < 1 or args.eval_shards < 1:
+        raise ValueError("--train-shards and --eval-shards must be >= 1")
+
+    inputs = [Path(raw) for raw in args.input]
+    for path in inputs:
+        if not path.exists():
+            raise FileNotFoundError(f"Dataset not found: {path}")
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    shard_totals = {"train": args.train_shards, "eval": args.eval_shards}
+    sinks: dict[tuple[str, int], TextIO] = {
+        (split, index): shard_path(output_dir, split, index, total).open("w", encoding="utf-8")
+        for split, total in shard_totals.items()
+        for index in range(total)
+    }
+    shard_rows: Counter[tuple[str, int]] = Counter()
+    rejects: Counter[str] = Counter()
+    star_ratings: Counter[int] = Counter()
+    rows_read = 0
+    duplicates = 0
+    text_chars = 0
+
+    seen = SeenKeys(output_dir / ".dedupe.sqlite3")
+    try:
+        with (output_dir / "rejects.jsonl").open("w", encoding="utf-8") as reject_sink:
+            for source, line_number, line in iter_rows(inputs):
+                rows_read += 1
+                try:
+                    raw = json.loads(line)
+                except json.JSONDecodeError:
+                    raw, reason = None, "invalid_json"
+                else:
+                    row, reason = validate_row(args.task, raw) if isinstance(raw, dict) else (None, "not_an_object")
+                if reason is not None:
+                    rejects[reason] += 1
+                    reject_sink.write(json.dumps({"source": source, "line": line_number, "reason": reason}) + "\n")
+                    continue
+
+                key = dedupe_key(args.task, row)
+                if not seen.add(key):
+                    duplicates += 1
+                    continue
+
+                split, index = assign(key, args.salt, args.eval_fraction, args.train_shards, args.eval_shards)
+                sinks[(split, index)].write(json.dumps(row, sort_keys=True, separators=(",", ":")) + "\n")
+                shard_rows[(split, index)] += 1
+                star_ratings[row["evidence"]["starRating"]] += 1
+                text_chars += len(row["reply"] if args.task == "draft" else row["draftText"])
+    finally:
+        seen.close()
+        for sink in sinks.values():
+            sink.close()
+
+    written = sum(shard_rows.values())
+    stats = {
+        "task": args.task,
+        "ranAtUtc": datetime.now(UTC).isoformat(),
+        "inputs": [str(path) for path in inputs],
+        "salt": args.salt,
+        "evalFraction": args.eval_fraction,
+        "rowsRead": rows_read,
+        "rejected": dict(sorted(rejects.items())),
+        "duplicates": duplicates,
+        "written": written,
+        "splits": {
+            split: {
+                "rows": sum(shard_rows[(split, index)] for index in range(total)),
+                "shards": {
+                    shard_path(output_dir, split, index, total).name: shard_rows[(split, index)]
+                    for index in range(total)
+                },
+            }
+            for split, total in shard_totals.items()
+        },
+        "starRatings": {str(rating): count for rating, count in sorted(star_ratings.items())},
+        "meanTextChars": round(text_chars / written, 1) if written else 0.0,
+    }
+    (output_dir / "stats.json").write_text(json.dumps(stats, indent=2, sort_keys=True), encoding="utf-8")
+    print(json.dumps(stats, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
-import subprocess
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
@@ -11,6 +14,17 @@ from typing import Any
 
 ROOT = Path(__file__).resolve().parents[1]
 SCRIPTS_DIR = ROOT / "scripts"
+# Source files whose changes invalidate a stage's previous output.
+STAGE_CODE = {
+    "compile": (
+        SCRIPTS_DIR / "compile_bootstrap_fewshot.py",
+        SCRIPTS_DIR / "demo_cache.py",
+        SCRIPTS_DIR / "similarity.py",
+        ROOT / "programs.py",
+    ),
+    "eval": (SCRIPTS_DIR / "evaluate_program.py", ROOT / "programs.py"),
+}
+MODEL_ENV_VARS = ("DSPY_OPENAI_MODEL_DRAFT", "DSPY_OPENAI_MODEL_VERIFY")
 
 
 def parse_args() -> argparse.Namespace:
@@ -24,7 +38,14 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--artifacts-dir", default="artifacts", help="Artifact output directory")
     parser.add_argument("--report", default="artifacts/compile_report.json", help="Output report path")
     parser.add_argument("--max-demos", type=int, default=8)
-    parser.add_argument("--similarity-threshold", type=float, default=0.75)
+    parser.add_argument("--similarity", default="sequence", help="Draft metric similarity backend")
+    parser.add_argument("--similarity-threshold", type=float, help="Defaults to the backend's calibrated threshold")
+    parser.add_argument(
+        "--fast-draft",
+        action="store_true",
+        help="Also compile and evaluate the fast (non-reasoning) draft variant on the draft datasets",
+    )
+    parser.add_argument("--force", action="store_true", help="Rerun every stage even when its inputs are unchanged")
     parser.add_argument("--tag", default="manual", help="Run tag for report metadata")
     return parser.parse_args()
 
@@ -34,50 +55,53 @@ def main() -> None:
 
     artifacts_dir = resolve_path(args.artifacts_dir)
     artifacts_dir.mkdir(parents=True, exist_ok=True)
+    report_path = resolve_path(args.report)
+    previous = {} if args.force else load_previous_report(report_path)
 
-    draft_artifact = artifacts_dir / "draft_program.json"
-    verify_artifact = artifacts_dir / "verify_program.json"
-
-    run_compile(
-        task="draft",
-        dataset=resolve_path(args.draft_train),
-        output=draft_artifact,
-        max_demos=args.max_demos,
-        similarity_threshold=args.similarity_threshold,
-    )
-    run_compile(
-        task="verify",
-        dataset=resolve_path(args.verify_train),
-        output=verify_artifact,
-        max_demos=args.max_demos,
-        similarity_threshold=args.similarity_threshold,
-    )
+    pipelines = {
+        "draft": {
+            "train": resolve_path(args.draft_train),
+            "eval": resolve_path(args.draft_eval),
+            "artifact": artifacts_dir / "draft_program.json",
+        },
+        "verify": {
+            "train": resolve_path(args.verify_train),
+            "eval": resolve_path(args.verify_eval),
+            "artifact": artifacts_dir / "verify_program.json",
+        },
+    }
+    if args.fast_draft:
+        pipelines["draft_fast"] = {**pipelines["draft"], "artifact": artifacts_dir / "draft_fast_program.json"}
 
-    draft_eval_metrics = run_evaluate(
-        task="draft",
-        dataset=resolve_path(args.draft_eval),
-        artifact=draft_artifact,
-    )
-    verify_eval_metrics = run_evaluate(
-        task="verify",
-        dataset=resolve_path(args.verify_eval),
-        artifact=verify_artifact,
-    )
+    # Tasks share nothing, so each task's compile -> eval chain runs in its own process.
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(pipelines)) as pool:
+        futures = {
+            task: pool.submit(
+                run_pipeline,
+                task=task,
+                train_dataset=paths["train"],
+                eval_dataset=paths["eval"],
+                artifact=paths["artifact"],
+                max_demos=args.max_demos,
+                similarity=args.similarity,
+                similarity_threshold=args.similarity_threshold,
+                previous=previous,
+            )
+            for task, paths in pipelines.items()
+        }
+        outcomes = {task: future.result() for task, future in futures.items()}
+    wall_seconds = time.perf_counter() - started
 
     report = {
         "tag": args.tag,
         "ranAtUtc": datetime.now(UTC).isoformat(),
-        "artifacts": {
-            "draft": str(draft_artifact),
-            "verify": str(verify_artifact),
-        },
-        "eval": {
-            "draft": draft_eval_metrics,
-            "verify": verify_eval_metrics,
-        },
+        "artifacts": {task: str(paths["artifact"]) for task, paths in pipelines.items()},
+        "eval": {task: outcome["eval"] for task, outcome in outcomes.items()},
+        "stages": {name: stage for outcome in outcomes.values() for name, stage in outcome["stages"].items()},
+        "wallSeconds": round(wall_seconds, 3),
     }
 
-    report_path = resolve_path(args.report)
     report_path.parent.mkdir(parents=True, exist_ok=True)
     report_path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
     print(json.dumps(report, indent=2, sort_keys=True))
@@ -90,17 +114,120 @@ def resolve_path(raw: str) -> Path:
     return ROOT / path
 
 
+def load_previous_report(path: Path) -> dict[str, Any]:
+    if not path.exists():
+        return {}
+    try:
+        report = json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+    return report if isinstance(report, dict) else {}
+
+
+def run_pipeline(
+    *,
+    task: str,
+    train_dataset: Path,
+    eval_dataset: Path,
+    artifact: Path,
+    max_demos: int,
+    similarity: str,
+    similarity_threshold: float | None,
+    previous: dict[str, Any],
+) -> dict[str, Any]:
+    """Compile then evaluate one task inside a pool worker, skipping stages whose inputs are unchanged."""
+    previous_stages = previous.get("stages") or {}
+    stages: dict[str, dict[str, Any]] = {}
+
+    compile_name = f"{task}.compile"
+    compile_fingerprint = stage_fingerprint(
+        "compile",
+        files=(train_dataset,),
+        params={
+            "task": task,
+            "maxDemos": max_demos,
+            "similarity": similarity,
+            "similarityThreshold": similarity_threshold,
+            "models": {name: os.getenv(name, "") for name in MODEL_ENV_VARS},
+        },
+    )
+    prior = previous_stages.get(compile_name) or {}
+    reuse_compile = (
+        prior.get("fingerprint") == compile_fingerprint
+        and artifact.exists()
+        and prior.get("artifactSha256") == file_sha256(artifact)
+    )
+    started = time.perf_counter()
+    compile_summary: dict[str, Any] = {}
+    if not reuse_compile:
+        compile_summary = run_compile(
+            task=task,
+            dataset=train_dataset,
+            output=artifact,
+            max_demos=max_demos,
+            similarity=similarity,
+            similarity_threshold=similarity_threshold,
+        )
+    stages[compile_name] = {
+        "fingerprint": compile_fingerprint,
+        "artifactSha256": file_sha256(artifact),
+        "skipped": reuse_compile,
+        "seconds": round(time.perf_counter() - started, 3),
+        "examples": compile_summary.get("examples", prior.get("examples")),
+        "demoCache": compile_summary.get("demoCache"),
+    }
+
+    eval_name = f"{task}.eval"
+    # The artifact hash chains the stages: a recompile that changes demos forces a fresh eval.
+    eval_fingerprint = stage_fingerprint(
+        "eval",
+        files=(eval_dataset, artifact),
+        params={"task": task, "models": {name: os.getenv(name, "") for name in MODEL_ENV_VARS}},
+    )
+    prior = previous_stages.get(eval_name) or {}
+    previous_metrics = (previous.get("eval") or {}).get(task)
+    reuse_eval = prior.get("fingerprint") == eval_fingerprint and isinstance(previous_metrics, dict)
+    started = time.perf_counter()
+    metrics = previous_metrics if reuse_eval else run_evaluate(task=task, dataset=eval_dataset, artifact=artifact)
+    stages[eval_name] = {
+        "fingerprint": eval_fingerprint,
+        "skipped": reuse_eval,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+    return {"eval": metrics, "stages": stages}
+
+
+def stage_fingerprint(stage: str, *, files: tuple[Path, ...], params: dict[str, Any]) -> str:
+    digest = hashlib.sha256()
+    for path in (*STAGE_CODE[stage], *files):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(file_sha256(path).encode("utf-8"))
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def run_compile(
     *,
     task: str,
     dataset: Path,
     output: Path,
     max_demos: int,
-    similarity_threshold: float,
-) -> None:
-    command = [
-        sys.executable,
-        str(SCRIPTS_DIR / "compile_bootstrap_fewshot.py"),
+    similarity: str,
+    similarity_threshold: float | None,
+) -> dict[str, Any]:
+    _import_scripts()
+    import compile_bootstrap_fewshot
+
+    argv = [
         "--task",
         task,
         "--dataset",
@@ -109,25 +236,36 @@ def run_compile(
         str(output),
         "--max-demos",
         str(max_demos),
-        "--similarity-threshold",
-        str(similarity_threshold),
+        "--similarity",
+        similarity,
     ]
-    subprocess.run(command, check=True)
+    if similarity_threshold is not None:
+        argv += ["--similarity-threshold", str(similarity_threshold)]
+    args = compile_bootstrap_fewshot.parse_args(argv)
+    return compile_bootstrap_fewshot.compile_program(args)
 
 
 def run_evaluate(*, task: str, dataset: Path, artifact: Path) -> dict[str, Any]:
-    command = [
-        sys.executable,
-        str(SCRIPTS_DIR / "evaluate_program.py"),
-        "--task",
-        task,
-        "--dataset",
-        str(dataset),
-        "--artifact",
-        str(artifact),
-    ]
-    result = subprocess.run(command, check=True, capture_output=True, text=True)
-    return json.loads(result.stdout)
+    _import_scripts()
+    import evaluate_program
+
+    args = evaluate_program.parse_args(
+        [
+            "--task",
+            task,
+            "--dataset",
+            str(dataset),
+            "--artifact",
+            str(artifact),
+        ]
+    )
+    return evaluate_program.run(args)
+
+
+def _import_scripts() -> None:
+    # Stages run in-process in the pool worker, so dspy and the programs module load once per task.
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Replay never serves HTTP, so the service token only has to satisfy settings validation.
+os.environ.setdefault("DSPY_SERVICE_TOKEN", "replay-token")
+
+from programs import ProgramManager, ServiceError  # noqa: E402
+from settings import get_settings  # noqa: E402
+
+
+SEO_FLAGS = ("requiredKeywordUsed", "geoTermUsed", "geoTermOveruse", "stuffingRisk")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay captured /api/review/process traffic against a candidate config")
+    parser.add_argument("--capture", required=True, help="Capture JSONL written by DSPY_CAPTURE_SAMPLE_RATE")
+    parser.add_argument("--draft-artifact", help="Draft artifact to replay with (default: DSPY_DRAFT_ARTIFACT_PATH)")
+    parser.add_argument("--verify-artifact", help="Verify artifact to replay with (default: DSPY_VERIFY_ARTIFACT_PATH)")
+    parser.add_argument("--draft-model", help="Draft model to replay with; replaces captured per-request overrides")
+    parser.add_argument("--verify-model", help="Verify model to replay with; replaces captured per-request overrides")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, help="Replay at most this many records")
+    parser.add_argument("--fake-lm", action="store_true", help="Use the offline fake LM (pipeline smoke test)")
+    parser.add_argument("--output", default="artifacts/replay_report.json", help="Output report path")
+    parser.add_argument("--tag", default="manual", help="Run tag for report metadata")
+    return parser.parse_args()
+
+
+def build_manager(args: argparse.Namespace) -> ProgramManager:
+    settings = get_settings()
+    overrides: dict[str, Any] = {
+        # Replayed latencies should reflect real LM calls, not earlier replays' cache entries.
+        "enable_disk_cache": False,
+        "shared_cache_backend": "none",
+    }
+    if args.draft_artifact:
+        overrides["draft_artifact_path"] = str(resolve_path(args.draft_artifact))
+    if args.verify_artifact:
+        overrides["verify_artifact_path"] = str(resolve_path(args.verify_artifact))
+    if args.draft_model:
+        overrides["draft_model"] = args.draft_model
+    if args.verify_model:
+        overrides["verify_model"] = args.verify_model
+    settings = dataclasses.replace(settings, **overrides)
+
+    lm_factory = None
+    if args.fake_lm:
+        from fake_lm import FakeLMProfile, fake_lm_factory
+
+        lm_factory = fake_lm_factory(FakeLMProfile(latency_ms=50.0), seed=7)
+    return ProgramManager(settings, lm_factory=lm_factory)
+
+
+def iter_records(path: Path, limit: int | None) -> Iterator[dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as handle:
+        count = 0
+        for raw in handle:
+            if not raw.strip():
+                continue
+            if limit is not None and count >= limit:
+                return
+            count += 1
+            yield json.loads(raw)
+
+
+def replay_record(manager: ProgramManager, record: dict[str, Any], args: argparse.Namespace) -> dict[str, Any]:
+    request = record["request"]
+    execution = dict(request.get("execution") or {})
+    if args.draft_model:
+        execution.pop("draftModel", None)
+    if args.verify_model:
+        execution.pop("verifyModel", None)
+
+    started = time.perf_counter()
+    try:
+        result = manager.process_review(
+            mode=request["mode"],
+            evidence_json=json.dumps(request["evidence"], separators=(",", ":")),
+            current_draft_text=request.get("currentDraftText"),
+            candidate_draft_text=request.get("candidateDraftText"),
+            execution_overrides=execution or None,
+        )
+        error = None
+    except ServiceError as exc:
+        result = None
+        error = {"error": exc.code, "statusCode": exc.status_code}
+    return {
+        "baseline": _outcome(record.get("result"), record.get("error"), record.get("latencyMs")),
+        "replay": _outcome(result, error, int((time.perf_counter() - started) * 1000)),
+    }
+
+
+def _outcome(result: dict[str, Any] | None, error: dict[str, Any] | None, latency_ms: Any) -> dict[str, Any]:
+    """Reduce a response to the fields the report compares, so memory stays small on long captures."""
+    if result is None:
+        return {"decision": f"ERROR:{(error or {}).get('error', 'UNKNOWN')}", "latencyMs": latency_ms}
+    seo = result.get("seoQuality") or {}
+    usage = result.get("usage") or {}
+    return {
+        "decision": result.get("decision"),
+        "latencyMs": latency_ms,
+        "pass": bool((result.get("verifier") or {}).get("pass")),
+        "keywordCoverage": float(seo.get("keywordCoverage", 0.0)),
+        "seoFlags": {flag: bool(seo.get(flag)) for flag in SEO_FLAGS},
+        "tokens": sum(
+            int((usage.get(stage) or {}).get(key, 0))
+            for stage in ("draft", "verify")
+            for key in ("promptTokens", "completionTokens")
+        ),
+    }
+
+
+def summarize(pairs: list[dict[str, Any]]) -> dict[str, Any]:
+    transitions: Counter[str] = Counter()
+    agreements = 0
+    sides: dict[str, dict[str, Any]] = {}
+    for side in ("baseline", "replay"):
+        outcomes = [pair[side] for pair in pairs]
+        succeeded = [outcome for outcome in outcomes if "pass" in outcome]
+        latencies = sorted(float(outcome["latencyMs"]) for outcome in outcomes if outcome.get("latencyMs") is not None)
+        sides[side] = {
+            "decisions": dict(sorted(Counter(outcome["decision"] for outcome in outcomes).items())),
+            "passRate": _rate(sum(1 for outcome in succeeded if outcome["pass"]), len(succeeded)),
+            "meanKeywordCoverage": round(sum(o["keywordCoverage"] for o in succeeded) / len(succeeded), 4) if succeeded else 0.0,
+            "seoFlagRates": {
+                flag: _rate(sum(1 for outcome in succeeded if outcome["seoFlags"][flag]), len(succeeded))
+                for flag in SEO_FLAGS
+            },
+            "meanTokens": round(sum(o["tokens"] for o in succeeded) / len(succeeded), 1) if succeeded else 0.0,
+            "latencyMs": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            },
+        }
+    for pair in pairs:
+        before, after = pair["baseline"]["decision"], pair["replay"]["decision"]
+        if before == after:
+            agreements += 1
+        else:
+            transitions[f"{before}->{after}"] += 1
+
+    return {
+        "records": len(pairs),
+        "decisionAgreement": _rate(agreements, len(pairs)),
+        "decisionTransitions": dict(sorted(transitions.items())),
+        "baseline": sides["baseline"],
+        "replay": sides["replay"],
+        "delta": {
+            "passRate": round(sides["replay"]["passRate"] - sides["baseline"]["passRate"], 4),
+            "meanKeywordCoverage": round(
+                sides["replay"]["meanKeywordCoverage"] - sides["baseline"]["meanKeywordCoverage"], 4
+            ),
+            "meanTokens": round(sides["replay"]["meanTokens"] - sides["baseline"]["meanTokens"], 1),
+            "p50LatencyMs": round(sides["replay"]["latencyMs"]["p50"] - sides["baseline"]["latencyMs"]["p50"], 2),
+            "p95LatencyMs": round(sides["replay"]["latencyMs"]["p95"] - sides["baseline"]["latencyMs"]["p95"], 2),
+        },
+    }
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return round(ordered[rank], 2)
+
+
+def _rate(count: int, total: int) -> float:
+    return round(count / total, 4) if total else 0.0
+
+
+def main() -> None:
+    args = parse_args()
+    capture_path = resolve_path(args.capture)
+    if not capture_path.exists():
+        raise FileNotFoundError(f"Capture not found: {capture_path}")
+    manager = build_manager(args)
+
+    pairs: list[dict[str, Any]] = []
+    in_flight: set[Future[dict[str, Any]]] = set()
+    max_in_flight = max(1, args.concurrency) * 2
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        for record in iter_records(capture_path, args.limit):
+            in_flight.add(pool.submit(replay_record, manager, record, args))
+            while len(in_flight) >= max_in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                pairs.extend(future.result() for future in finished)
+        pairs.extend(future.result() for future in wait(in_flight).done)
+    wall_seconds = time.perf_counter() - started
+
+    report = {
+        "tag": args.tag,
+        "ranAtUtc": datetime.now(UTC).isoformat(),
+        "config": {
+            "capture": str(capture_path),
+            "concurrency": args.concurrency,
+            "draftModel": manager.settings.draft_model,
+            "verifyModel": manager.settings.verify_model,
+            "fakeLm": args.fake_lm,
+        },
+        "program": manager.program_metadata(),
+        "verify": manager.verify_metadata(),
+        "wallSeconds": round(wall_seconds, 3),
+        **summarize(pairs),
+    }
+    output_path = resolve_path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+def resolve_path(raw: str) -> Path:
+    path = Path(raw)
+    if path.is_absolute():
+        return path
+    return ROOT / path
+
+
+if __name__ == "__main__":
+    main()
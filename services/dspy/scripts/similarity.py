@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import difflib
+from collections import Counter
+from collections.abc import Callable
+from functools import lru_cache
+from typing import Any
+
+
+SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 128
+CACHE_SIZE = 8192
+# Largest prime below 2**32: (a * x + b) for a, x, b < p stays exact in uint64.
+_HASH_PRIME = 4294967291
+
+Similarity = Callable[[str, str], float]
+
+
+def normalize_text(value: str) -> str:
+    return " ".join(value.lower().split())
+
+
+def sequence_similarity(expected: str, actual: str) -> float:
+    """`difflib` ratio; quadratic in reply length, kept as the reference backend."""
+    return difflib.SequenceMatcher(a=normalize_text(expected), b=normalize_text(actual)).ratio()
+
+
+def ngram_similarity(expected: str, actual: str) -> float:
+    """Exact Jaccard over cached character-shingle sets, in plain Python; expected replies hit the cache on every trial."""
+    left = _shingles(normalize_text(expected))
+    right = _shingles(normalize_text(actual))
+    if not left or not right:
+        return 0.0
+    overlap = len(left & right)
+    return overlap / (len(left) + len(right) - overlap)
+
+
+def minhash_similarity(expected: str, actual: str) -> float:
+    """Estimated Jaccard from cached MinHash signatures; cost is independent of reply length once signed."""
+    left = _minhash_signature(normalize_text(expected))
+    right = _minhash_signature(normalize_text(actual))
+    if left is None or right is None:
+        return 0.0
+    return int((left == right).sum()) / MINHASH_PERMUTATIONS
+
+
+BACKENDS: dict[str, Similarity] = {
+    "sequence": sequence_similarity,
+    "ngram": ngram_similarity,
+    "minhash": minhash_similarity,
+}
+
+# Per-backend acceptance thresholds calibrated with scripts/benchmark_similarity.py; the
+# scales differ, so 0.75 on a difflib ratio is not 0.75 on a Jaccard index.
+DEFAULT_THRESHOLDS: dict[str, float] = {
+    "sequence": 0.75,
+    "ngram": 0.7,
+    "minhash": 0.7,
+}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _shingles(text: str) -> frozenset[str]:
+    """Character shingles, with repeats tagged by occurrence so set Jaccard equals multiset Jaccard."""
+    if len(text) <= SHINGLE_SIZE:
+        return frozenset([text]) if text else frozenset()
+    counts = Counter(text[index:index + SHINGLE_SIZE] for index in range(len(text) - SHINGLE_SIZE + 1))
+    shingles = set(counts)
+    for shingle, count in counts.items():
+        if count > 1:
+            shingles.update(f"{shingle}\x00{occurrence}" for occurrence in range(1, count))
+    return frozenset(shingles)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _minhash_signature(text: str) -> Any:
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    np = _numpy()
+    # Built-in string hashing is salted per process, which is fine: signatures never leave the process.
+    hashed = np.fromiter((hash(shingle) & 0xFFFFFFFF for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    hashed %= np.uint64(_HASH_PRIME)
+    a, b = _permutations()
+    signature = ((np.outer(a, hashed) + b[:, None]) % np.uint64(_HASH_PRIME)).min(axis=1)
+    signature.setflags(write=False)
+    return signature
+
+
+@lru_cache(maxsize=1)
+def _permutations() -> tuple[Any, Any]:
+    np = _numpy()
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, _HASH_PRIME, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+    b = rng.integers(0, _HASH_PRIME, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+    return a, b
+
+
+def _numpy() -> Any:
+    try:
+        import numpy  # type: ignore[import-not-found]
+    except ImportError as exc:
+        raise RuntimeError("The minhash similarity backend requires the `numpy` package.") from exc
+    return numpy
+
+
+def clear_caches() -> None:
+    _shingles.cache_clear()
+    _minhash_signature.cache_clear()
@@ -20,11 +20,55 @@ class Settings:
     verify_temperature: float
     draft_max_tokens: int
     verify_max_tokens: int
+    token_budget: str
+    token_budget_path: str
+    verify_mode: str
+    verify_batch_size: int
     enable_memory_cache: bool
     memory_cache_max_entries: int
     enable_disk_cache: bool
+    shared_cache_backend: str
+    shared_cache_path: str
+    shared_cache_ttl_seconds: int
+    shared_cache_max_bytes: int
+    shared_cache_redis_url: str | None
+    early_seo_reject: bool
+    max_repairs: int
+    stable_prompt_prefix: bool
+    capture_sample_rate: float
+    capture_path: str
+    capture_max_bytes: int
+    result_store_ttl_seconds: int
+    result_store_max_entries: int
+    result_store_path: str | None
+    request_deadline_seconds: int
+    bulk_batch_client: str
+    bulk_poll_seconds: int
+    job_workers: int
+    job_store_path: str | None
+    job_ttl_seconds: int
+    job_webhook_secret: str
+    job_callback_allowed_hosts: tuple[str, ...]
+    profile_sample_rate: float
+    profile_allow_header: bool
+    profile_dir: str
+    profile_max_files: int
+    trace_exporter: str
+    trace_file_path: str
+    trace_otlp_endpoint: str
+    draft_routing: str
+    fast_draft_min_rating: int
+    fast_draft_max_comment_chars: int
+    dynamic_demos: bool
+    demo_index_dir: str
+    demo_token_budget: int
+    demo_max_count: int
+    server_workers: int
+    server_max_requests: int
+    server_graceful_timeout_seconds: int
     program_version: str
     draft_artifact_path: str
+    fast_draft_artifact_path: str
     verify_artifact_path: str
 
 
@@ -43,11 +87,55 @@ def get_settings() -> Settings:
         verify_temperature=_read_float("DSPY_VERIFY_TEMPERATURE", default=0.0, minimum=0.0, maximum=2.0),
         draft_max_tokens=_read_int("DSPY_DRAFT_MAX_TOKENS", default=384, minimum=32),
         verify_max_tokens=_read_int("DSPY_VERIFY_MAX_TOKENS", default=768, minimum=64),
+        token_budget=_read_choice("DSPY_TOKEN_BUDGET", default="fixed", choices={"adaptive", "fixed"}),
+        token_budget_path=os.getenv("DSPY_TOKEN_BUDGET_PATH", "artifacts/token_budget.json").strip(),
+        verify_mode=_read_choice("DSPY_VERIFY_MODE", default="full", choices={"full", "lean"}),
+        verify_batch_size=_read_int("DSPY_VERIFY_BATCH_SIZE", default=8, minimum=1),
         enable_memory_cache=_read_bool("DSPY_ENABLE_MEMORY_CACHE", default=True),
         memory_cache_max_entries=_read_int("DSPY_MEMORY_CACHE_MAX_ENTRIES", default=4096, minimum=100),
         enable_disk_cache=_read_bool("DSPY_ENABLE_DISK_CACHE", default=False),
+        shared_cache_backend=_read_choice("DSPY_SHARED_CACHE_BACKEND", default="none", choices={"none", "sqlite", "redis"}),
+        shared_cache_path=os.getenv("DSPY_SHARED_CACHE_PATH", ".cache/lm_cache.sqlite3").strip(),
+        shared_cache_ttl_seconds=_read_int("DSPY_SHARED_CACHE_TTL_SECONDS", default=7 * 24 * 3600, minimum=0),
+        shared_cache_max_bytes=_read_int("DSPY_SHARED_CACHE_MAX_BYTES", default=256 * 1024 * 1024, minimum=1024 * 1024),
+        shared_cache_redis_url=os.getenv("DSPY_SHARED_CACHE_REDIS_URL", "").strip() or None,
+        early_seo_reject=_read_bool("DSPY_EARLY_SEO_REJECT", default=False),
+        max_repairs=_read_int("DSPY_MAX_REPAIRS", default=0, minimum=0),
+        stable_prompt_prefix=_read_bool("DSPY_STABLE_PROMPT_PREFIX", default=False),
+        capture_sample_rate=_read_float("DSPY_CAPTURE_SAMPLE_RATE", default=0.0, minimum=0.0, maximum=1.0),
+        capture_path=os.getenv("DSPY_CAPTURE_PATH", ".cache/traffic_capture.jsonl").strip(),
+        capture_max_bytes=_read_int("DSPY_CAPTURE_MAX_BYTES", default=512 * 1024 * 1024, minimum=1024 * 1024),
+        result_store_ttl_seconds=_read_int("DSPY_RESULT_STORE_TTL_SECONDS", default=900, minimum=0),
+        result_store_max_entries=_read_int("DSPY_RESULT_STORE_MAX_ENTRIES", default=2048, minimum=1),
+        result_store_path=os.getenv("DSPY_RESULT_STORE_PATH", "").strip() or None,
+        request_deadline_seconds=_read_int("DSPY_REQUEST_DEADLINE_SECONDS", default=15, minimum=1),
+        bulk_batch_client=_read_choice("DSPY_BULK_BATCH_CLIENT", default="openai", choices={"openai", "local"}),
+        bulk_poll_seconds=_read_int("DSPY_BULK_POLL_SECONDS", default=30, minimum=1),
+        job_workers=_read_int("DSPY_JOB_WORKERS", default=4, minimum=1),
+        job_store_path=os.getenv("DSPY_JOB_STORE_PATH", "").strip() or None,
+        job_ttl_seconds=_read_int("DSPY_JOB_TTL_SECONDS", default=24 * 3600, minimum=60),
+        job_webhook_secret=os.getenv("DSPY_JOB_WEBHOOK_SECRET", "").strip(),
+        job_callback_allowed_hosts=_read_list("DSPY_JOB_CALLBACK_ALLOWED_HOSTS"),
+        profile_sample_rate=_read_float("DSPY_PROFILE_SAMPLE_RATE", default=0.0, minimum=0.0, maximum=1.0),
+        profile_allow_header=_read_bool("DSPY_PROFILE_ALLOW_HEADER", default=False),
+        profile_dir=os.getenv("DSPY_PROFILE_DIR", ".cache/profiles").strip(),
+        profile_max_files=_read_int("DSPY_PROFILE_MAX_FILES", default=200, minimum=1),
+        trace_exporter=_read_choice("DSPY_TRACE_EXPORTER", default="none", choices={"none", "file", "otlp"}),
+        trace_file_path=os.getenv("DSPY_TRACE_FILE_PATH", ".cache/traces.jsonl").strip(),
+        trace_otlp_endpoint=os.getenv("DSPY_TRACE_OTLP_ENDPOINT", "http://localhost:4318").strip(),
+        draft_routing=_read_choice("DSPY_DRAFT_ROUTING", default="reasoning", choices={"reasoning", "fast", "auto"}),
+        fast_draft_min_rating=_read_int("DSPY_FAST_DRAFT_MIN_RATING", default=4, minimum=1),
+        fast_draft_max_comment_chars=_read_int("DSPY_FAST_DRAFT_MAX_COMMENT_CHARS", default=200, minimum=0),
+        dynamic_demos=_read_bool("DSPY_DYNAMIC_DEMOS", default=False),
+        demo_index_dir=os.getenv("DSPY_DEMO_INDEX_DIR", "artifacts/demo_index").strip(),
+        demo_token_budget=_read_int("DSPY_DEMO_TOKEN_BUDGET", default=1200, minimum=0),
+        demo_max_count=_read_int("DSPY_DEMO_MAX_COUNT", default=4, minimum=1),
+        server_workers=_read_int("DSPY_SERVER_WORKERS", default=0, minimum=0),
+        server_max_requests=_read_int("DSPY_SERVER_MAX_REQUESTS", default=0, minimum=0),
+        server_graceful_timeout_seconds=_read_int("DSPY_SERVER_GRACEFUL_TIMEOUT_SECONDS", default=30, minimum=1),
         program_version=os.getenv("DSPY_PROGRAM_VERSION", "default").strip() or "default",
         draft_artifact_path=os.getenv("DSPY_DRAFT_ARTIFACT_PATH", "artifacts/draft_program.json").strip(),
+        fast_draft_artifact_path=os.getenv("DSPY_FAST_DRAFT_ARTIFACT_PATH", "artifacts/draft_fast_program.json").strip(),
         verify_artifact_path=os.getenv("DSPY_VERIFY_ARTIFACT_PATH", "artifacts/verify_program.json").strip(),
     )
 
@@ -71,6 +159,21 @@ def _read_bool(name: str, default: bool) -> bool:
     raise RuntimeError(f"Invalid boolean value for {name}: {raw}")
 
 
+def _read_choice(name: str, default: str, choices: set[str]) -> str:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    normalized = raw.strip().lower()
+    if normalized not in choices:
+        raise RuntimeError(f"Invalid value for {name}: {raw} (expected one of {', '.join(sorted(choices))})")
+    return normalized
+
+
+def _read_list(name: str) -> tuple[str, ...]:
+    raw = os.getenv(name, "")
+    return tuple(item.strip().lower() for item in raw.split(",") if item.strip())
+
+
 def _read_int(name: str, default: int, minimum: int) -> int:
     raw = os.getenv(name)
     if raw is None or not raw.strip():
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / "scripts"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+# Settings refuse to load without these; no test talks to OpenAI.
+os.environ.setdefault("DSPY_SERVICE_TOKEN", "test-token")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test-offline")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import dspy
+import litellm
+
+EVIDENCE: dict[str, Any] = {
+    "starRating": 5,
+    "comment": "Great pizza",
+    "reviewerIsAnonymous": False,
+    "locationDisplayName": "Loc",
+    "createTime": "2026-01-01T00:00:00Z",
+    "seoProfile": {"primaryKeywords": []},
+    "tone": {"preset": "friendly"},
+}
+
+
+class ScriptedLM(dspy.LM):
+    """A litellm mock LM that answers each call with the next scripted response.
+
+    Dicts are sent as JSON replies and strings verbatim; litellm raises the named error for
+    strings such as `"litellm.RateLimitError"`.
+    Going through litellm keeps streaming, usage and finish reasons real.
+    """
+
+    def __init__(self, model: str, responses: list[Any]) -> None:
+        super().__init__(model, cache=False, num_retries=0)
+        self.responses = [json.dumps(response) if isinstance(response, dict) else response for response in responses]
+        self.requests: list[dict[str, Any]] = []
+
+    def __call__(self, prompt: str | None = None, *, messages: list[dict[str, Any]] | None = None, **kwargs: Any):
+        self.requests.append(kwargs)
+        return super().__call__(prompt, messages=messages, mock_response=self._next(), **kwargs)
+
+    async def acall(self, prompt: str | None = None, *, messages: list[dict[str, Any]] | None = None, **kwargs: Any):
+        self.requests.append(kwargs)
+        return await super().acall(prompt, messages=messages, mock_response=self._next(), **kwargs)
+
+    @property
+    def calls(self) -> int:
+        return len(self.requests)
+
+    def _next(self) -> Any:
+        return self.responses.pop(0)
+
+
+def warm_litellm() -> None:
+    # Resolve litellm's lazy imports up front; stream pumps run them from other threads.
+    litellm.completion(model="openai/gpt-4o-mini", mock_response="x", messages=[{"role": "user", "content": "hi"}])
+
+
+def use_lms(manager: Any, draft: dspy.BaseLM | None = None, verify: dspy.BaseLM | None = None) -> None:
+    if draft is not None:
+        manager.draft_lm = draft
+        manager._draft_lm_cache[manager.settings.draft_model] = draft
+    if verify is not None:
+        manager.verify_lm = verify
+        manager._verify_lm_cache[manager.settings.verify_model] = verify
+
+
+def verdict(passed: bool = True, rewrite: str = "") -> dict[str, Any]:
+    violations = [] if passed else [{"code": "UNSUPPORTED_CLAIM", "message": "Not in the review."}]
+    return {"passed": passed, "violations": violations, "suggested_rewrite": rewrite}
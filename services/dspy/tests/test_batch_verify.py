@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+
+import pytest
+
+from fakes import EVIDENCE, ScriptedLM, use_lms, verdict
+from programs import ProgramManager, ServiceError
+from settings import get_settings
+
+
+def _items(count: int) -> list[dict[str, str]]:
+    return [
+        {"reviewId": f"r{index}", "evidenceJson": json.dumps(EVIDENCE), "draftText": "Thanks for the kind words!"}
+        for index in range(count)
+    ]
+
+
+def _batch_reply(count: int) -> dict:
+    return {"verdicts": [{"id": str(index), **verdict()} for index in range(count)]}
+
+
+def _manager(verify: ScriptedLM) -> ProgramManager:
+    manager = ProgramManager(dataclasses.replace(get_settings(), verify_batch_size=4))
+    use_lms(manager, verify=verify)
+    return manager
+
+
+def test_batch_output_budget_scales_with_each_chunk():
+    verify = ScriptedLM("openai/gpt-4.1-mini", [_batch_reply(2), _batch_reply(3)])
+    manager = _manager(verify)
+
+    first = manager.verify_batch(_items(2))
+    second = manager.verify_batch(_items(3))
+
+    per_item = manager.settings.verify_max_tokens
+    assert [request["max_tokens"] for request in verify.requests] == [2 * per_item, 3 * per_item]
+    assert first["batch"]["fallbacks"] == second["batch"]["fallbacks"] == 0
+    assert all(outcome["result"]["decision"] == "READY" for outcome in second["results"])
+
+
+def test_unparseable_batch_reply_falls_back_to_single_verifies():
+    verify = ScriptedLM("openai/gpt-4.1-mini", ["not json at all", verdict(), verdict()])
+    manager = _manager(verify)
+
+    outcome = manager.verify_batch(_items(2))
+
+    assert outcome["batch"]["fallbacks"] == 2
+    assert verify.calls == 3
+    assert all(item["result"]["decision"] == "READY" for item in outcome["results"])
+
+
+def test_provider_errors_propagate_instead_of_fanning_out():
+    verify = ScriptedLM("openai/gpt-4.1-mini", ["litellm.RateLimitError"])
+    manager = _manager(verify)
+
+    with pytest.raises(ServiceError) as raised:
+        manager.verify_batch(_items(3))
+
+    assert raised.value.code == "MODEL_RATE_LIMIT"
+    assert raised.value.status_code == 429
+    assert verify.calls == 1
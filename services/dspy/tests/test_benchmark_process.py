@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+
+import app as service_app
+from benchmark_process import MODES, build_manager, build_payload, compare, percentile, run
+
+
+def _args(**overrides) -> argparse.Namespace:
+    defaults = {
+        "modes": list(MODES),
+        "concurrency": [1, 2],
+        "requests": 4,
+        "warmup": 1,
+        "draft_latency_ms": 0.0,
+        "verify_latency_ms": 0.0,
+        "latency_sigma": 0.0,
+        "output_token_ms": 0.0,
+        "timeout_rate": 0.0,
+        "rate_limit_rate": 0.0,
+        "schema_error_rate": 0.0,
+        "verify_fail_rate": 0.0,
+        "seed": 7,
+        "tag": "test",
+    }
+    return argparse.Namespace(**{**defaults, **overrides})
+
+
+def _run(args: argparse.Namespace) -> dict:
+    try:
+        return asyncio.run(run(args, build_manager(args)))
+    finally:
+        service_app.app.dependency_overrides.clear()
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(value) for value in range(10, 0, -1)]
+
+    assert percentile(values, 95) == 10.0
+    assert percentile(values, 99) == 10.0
+    assert percentile([3.0], 50) == 3.0
+    assert percentile([], 95) == 0.0
+
+
+def test_payloads_carry_the_draft_each_mode_needs():
+    rng = random.Random(0)
+
+    assert "currentDraftText" not in build_payload("AUTO", 0, rng)
+    assert "currentDraftText" in build_payload("MANUAL_REGENERATE", 1, rng)
+    assert "candidateDraftText" in build_payload("VERIFY_EXISTING_DRAFT", 2, rng)
+    # Unique request ids and comments keep the idempotency store and LM cache from short-circuiting calls.
+    assert build_payload("AUTO", 3, rng)["requestId"] != build_payload("AUTO", 4, rng)["requestId"]
+
+
+def test_compare_reports_deltas_for_cells_present_in_both_reports():
+    cell = {
+        "mode": "AUTO",
+        "concurrency": 4,
+        "latencyMs": {"p50": 100.0, "p95": 200.0, "p99": 400.0},
+        "requestsPerSecond": 10.0,
+        "cpuMsPerRequest": 2.0,
+    }
+    faster = {**cell, "latencyMs": {"p50": 50.0, "p95": 200.0, "p99": 400.0}, "requestsPerSecond": 20.0}
+    baseline = {"results": [cell, {**cell, "concurrency": 16}]}
+
+    deltas = compare([faster, {**cell, "mode": "VERIFY_EXISTING_DRAFT"}], baseline)
+
+    assert deltas == [{
+        "mode": "AUTO",
+        "concurrency": 4,
+        "p50DeltaPct": -50.0,
+        "p95DeltaPct": 0.0,
+        "p99DeltaPct": 0.0,
+        "rpsDeltaPct": 100.0,
+        "cpuMsPerRequestDeltaPct": 0.0,
+    }]
+
+
+def test_run_reports_one_cell_per_mode_and_concurrency():
+    report = _run(_args())
+
+    assert [(cell["mode"], cell["concurrency"]) for cell in report["results"]] == [
+        (mode, concurrency) for mode in MODES for concurrency in (1, 2)
+    ]
+    for cell in report["results"]:
+        assert sum(cell["outcomes"].values()) == 4
+        assert cell["outcomes"] == {"READY": 4}
+        assert cell["latencyMs"]["p50"] <= cell["latencyMs"]["p99"] <= cell["latencyMs"]["max"]
+    assert report["config"]["requestsPerCell"] == 4
+
+
+def test_run_counts_injected_failures_by_status_and_error_code():
+    report = _run(_args(modes=["VERIFY_EXISTING_DRAFT"], concurrency=[1], requests=6, timeout_rate=1.0))
+
+    assert report["results"][0]["outcomes"] == {"504:MODEL_TIMEOUT": 6}
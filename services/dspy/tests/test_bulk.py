@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import dspy
+
+from bulk import BulkRuns, MemoryBulkRunStore, SqliteBulkRunStore
+from fakes import EVIDENCE, verdict
+from programs import ProgramManager
+from settings import get_settings
+
+ROOT = Path(__file__).resolve().parents[1]
+
+REPLY = "Thanks so much for the kind words, see you again soon!"
+REWRITE = "Thank you for visiting, we hope to see you again."
+
+
+class ScriptedBatchClient:
+    """Completes every submitted batch at once, answering by the request's customId prefix."""
+
+    def __init__(self, replies: dict[str, dict[str, Any]]) -> None:
+        self.replies = replies
+        self.batches: list[list[dict[str, Any]]] = []
+
+    def submit(self, requests: list[dict[str, Any]]) -> str:
+        self.batches.append(requests)
+        return str(len(self.batches) - 1)
+
+    def status(self, batch_id: str) -> str:
+        return "completed"
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        return {
+            request["customId"]: {"content": json.dumps(self.replies[request["customId"].split("-")[0]]), "usage": {}}
+            for request in self.batches[int(batch_id)]
+        }
+
+
+class PendingBatchClient(ScriptedBatchClient):
+    """Reports every batch as running until `finish()`, like a provider batch that takes hours."""
+
+    def __init__(self, replies: dict[str, dict[str, Any]]) -> None:
+        super().__init__(replies)
+        self.state = "running"
+
+    def status(self, batch_id: str) -> str:
+        return self.state
+
+    def finish(self) -> None:
+        self.state = "completed"
+
+
+class FixedDemos:
+    def draft(self, evidence: dict[str, Any]) -> list[dspy.Example]:
+        return [dspy.Example(evidence_json="{}", seo_brief="", reply="DRAFT DEMO REPLY")]
+
+    def verify(self, evidence: dict[str, Any], draft_text: str) -> list[dspy.Example]:
+        return [dspy.Example(evidence_json="{}", draft_text="VERIFY DEMO DRAFT", passed=True, violations=[])]
+
+
+def _system_prompt(request: dict[str, Any]) -> str:
+    return request["messages"][0]["content"]
+
+
+def _all_content(request: dict[str, Any]) -> str:
+    return "\n".join(str(message["content"]) for message in request["messages"])
+
+
+def test_bulk_uses_routed_draft_variant_dynamic_demos_and_lean_verify():
+    manager = ProgramManager(dataclasses.replace(get_settings(), draft_routing="fast", verify_mode="lean"))
+    manager.demo_selector = FixedDemos()
+    client = ScriptedBatchClient({
+        "draft": {"reply": REPLY},
+        "verify": {"passed": False, "violations": [{"code": "UNSUPPORTED_CLAIM", "message": "No."}]},
+        "rewrite": {"suggested_rewrite": REWRITE},
+    })
+
+    outcomes = manager.process_bulk([{"reviewId": "r1", "evidenceJson": json.dumps(EVIDENCE)}], client, poll_seconds=0)
+
+    drafts, verifies, rewrites = client.batches
+    assert "`reasoning`" not in _system_prompt(drafts[0])
+    assert "DRAFT DEMO REPLY" in _all_content(drafts[0])
+    assert "`suggested_rewrite`" not in _system_prompt(verifies[0])
+    assert "VERIFY DEMO DRAFT" in _all_content(verifies[0])
+    assert [request["customId"] for request in rewrites] == ["rewrite-0"]
+    result = outcomes[0]["result"]
+    assert result["generation"]["variant"] == "fast"
+    assert result["decision"] == "BLOCKED_BY_VERIFIER"
+    assert result["verifier"]["suggestedRewrite"] == REWRITE
+
+
+def test_bulk_full_verify_skips_the_rewrite_batch():
+    manager = ProgramManager(dataclasses.replace(get_settings(), draft_routing="reasoning", verify_mode="full"))
+    client = ScriptedBatchClient({"draft": {"reasoning": "r", "reply": REPLY}, "verify": verdict()})
+
+    outcomes = manager.process_bulk([{"reviewId": "r1", "evidenceJson": json.dumps(EVIDENCE)}], client, poll_seconds=0)
+
+    assert len(client.batches) == 2
+    assert "`reasoning`" in _system_prompt(client.batches[0][0])
+    assert "`suggested_rewrite`" in _system_prompt(client.batches[1][0])
+    assert outcomes[0]["result"]["decision"] == "READY"
+    assert outcomes[0]["result"]["generation"]["variant"] == "reasoning"
+
+
+def test_bulk_lean_rewrites_drafts_that_fail_only_the_seo_checks():
+    manager = ProgramManager(dataclasses.replace(get_settings(), draft_routing="fast", verify_mode="lean"))
+    client = ScriptedBatchClient({
+        "draft": {"reply": REPLY},
+        "verify": {"passed": True, "violations": []},
+        "rewrite": {"suggested_rewrite": REWRITE},
+    })
+    evidence = {**EVIDENCE, "seoProfile": {"primaryKeywords": ["pizza"]}}
+
+    outcomes = manager.process_bulk([{"reviewId": "r1", "evidenceJson": json.dumps(evidence)}], client, poll_seconds=0)
+
+    assert len(client.batches) == 3
+    assert "SEO_REQUIRED_KEYWORD_MISSING" in _all_content(client.batches[2][0])
+    assert outcomes[0]["result"]["decision"] == "BLOCKED_BY_VERIFIER"
+    assert outcomes[0]["result"]["verifier"]["suggestedRewrite"] == REWRITE
+
+
+def _items(count: int) -> list[dict[str, Any]]:
+    return [{"reviewId": f"r{index}", "evidenceJson": json.dumps(EVIDENCE)} for index in range(count)]
+
+
+def _full_verify_manager() -> ProgramManager:
+    return ProgramManager(dataclasses.replace(get_settings(), draft_routing="reasoning", verify_mode="full"))
+
+
+def test_runs_poll_without_blocking_and_resume_after_a_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    manager = _full_verify_manager()
+    client = PendingBatchClient({"draft": {"reasoning": "r", "reply": REPLY}, "verify": verdict()})
+    runs = BulkRuns(SqliteBulkRunStore(path, ttl_seconds=60), manager, client, poll_seconds=0, start=False)
+
+    submitted = runs.submit(_items(2))
+    runs.poll()
+    runs.poll()
+
+    assert "state" not in submitted
+    assert runs.get(submitted["bulkId"])["status"] == "RUNNING"
+    assert len(client.batches) == 1
+
+    # A new process sees the same run and carries on from the provider batch in flight.
+    restarted = BulkRuns(SqliteBulkRunStore(path, ttl_seconds=60), manager, client, poll_seconds=0, start=False)
+    client.finish()
+    restarted.poll()
+    assert len(client.batches) == 2
+    restarted.poll()
+
+    run = restarted.get(submitted["bulkId"])
+    assert run["status"] == "COMPLETED"
+    assert [outcome["result"]["decision"] for outcome in run["results"]] == ["READY", "READY"]
+    assert len(client.batches) == 2
+
+
+def test_a_claimed_run_is_advanced_by_one_worker_only(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    client = PendingBatchClient({"draft": {"reasoning": "r", "reply": REPLY}, "verify": verdict()})
+    first = BulkRuns(SqliteBulkRunStore(path, ttl_seconds=60), _full_verify_manager(), client, poll_seconds=0, start=False)
+    second_store = SqliteBulkRunStore(path, ttl_seconds=60)
+    second = BulkRuns(second_store, first.manager, client, poll_seconds=0, start=False)
+    bulk_id = first.submit(_items(1))["bulkId"]
+
+    held = second_store.claim(bulk_id)
+    first.poll()
+
+    assert held is not None
+    assert client.batches == []
+    second_store.release(held, next_poll_at=0)
+    first.poll()
+    assert len(client.batches) == 1
+
+
+def test_a_failed_provider_batch_fails_the_run():
+    client = PendingBatchClient({"draft": {"reasoning": "r", "reply": REPLY}})
+    runs = BulkRuns(MemoryBulkRunStore(ttl_seconds=60), _full_verify_manager(), client, poll_seconds=0, start=False)
+    bulk_id = runs.submit(_items(1))["bulkId"]
+    runs.poll()
+
+    client.state = "expired"
+    runs.poll()
+
+    run = runs.get(bulk_id)
+    assert run["status"] == "FAILED"
+    assert run["completedAtUtc"] is not None
+    assert (run["error"]["error"], run["error"]["retryable"], run["error"]["stage"]) == ("INTERNAL_ERROR", True, "draft")
+
+
+def test_another_process_answers_for_a_run(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    client = ScriptedBatchClient({"draft": {"reasoning": "r", "reply": REPLY}, "verify": verdict()})
+    runs = BulkRuns(SqliteBulkRunStore(path, ttl_seconds=60), _full_verify_manager(), client, poll_seconds=0, start=False)
+    bulk_id = runs.submit(_items(2))["bulkId"]
+    for _ in range(3):
+        runs.poll()
+    script = (
+        "import json, os\n"
+        "from fastapi.testclient import TestClient\n"
+        "import app\n"
+        "client = TestClient(app.app)\n"
+        "client.headers['authorization'] = 'Bearer ' + os.environ['DSPY_SERVICE_TOKEN']\n"
+        "found = client.get('/api/review/bulk/' + os.environ['BULK_ID'])\n"
+        "missing = client.get('/api/review/bulk/unknown')\n"
+        "print(json.dumps([found.status_code, found.json(), missing.status_code]))\n"
+    )
+    env = {**os.environ, "DSPY_JOB_STORE_PATH": path, "DSPY_BULK_BATCH_CLIENT": "local", "BULK_ID": bulk_id}
+
+    completed = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+
+    assert completed.returncode == 0, completed.stderr
+    status_code, body, missing_status = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert status_code == 200
+    assert body == runs.get(bulk_id)
+    assert body["status"] == "COMPLETED"
+    assert missing_status == 404
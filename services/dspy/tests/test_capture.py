@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+import random
+import sys
+
+import pytest
+
+import replay_traffic
+from capture import TrafficCapture, redact_text
+from fakes import EVIDENCE
+from models import ProcessReviewRequest
+
+EMAIL = "jane.doe+pizza@example.co.uk"
+PHONE = "+44 (0)20 7946-0958"
+URL = "https://example.com/jane?id=42"
+COMMENT = f"Jane Doe here, loved it! Email {EMAIL} or call {PHONE}. Photos: {URL}"
+
+
+def _request(**overrides) -> ProcessReviewRequest:
+    evidence = {
+        **EVIDENCE,
+        "comment": COMMENT,
+        "reviewerDisplayName": "Jane Doe",
+        "highlights": [{"start": COMMENT.index(EMAIL), "end": COMMENT.index(EMAIL) + len(EMAIL), "label": "contact"}],
+    }
+    payload = {
+        "orgId": "org-secret-42",
+        "reviewId": "review-secret-7",
+        "mode": "VERIFY_EXISTING_DRAFT",
+        "evidence": evidence,
+        "candidateDraftText": "Thanks Jane, we will call you back on " + PHONE,
+        **overrides,
+    }
+    return ProcessReviewRequest.model_validate(payload)
+
+
+@pytest.mark.parametrize("text", [COMMENT, f"Reach me at {EMAIL}.", f"www.example.com/{EMAIL}", "Call 555 0100 99", "J"])
+def test_masks_preserve_length(text):
+    assert len(redact_text(text, ["Jane", "Doe"])) == len(text)
+
+
+def test_masks_keep_highlight_offsets_on_the_masked_span():
+    redacted = redact_text(COMMENT, ["Jane", "Doe"])
+    start = COMMENT.index(EMAIL)
+
+    assert redacted[start:start + len(EMAIL)].strip() == "[email]"
+    assert redacted.startswith("**** *** here")
+
+
+def test_short_matches_fall_back_to_asterisks():
+    assert redact_text("Thanks Al!", ["Al"]) == "Thanks **!"
+
+
+def test_no_pii_reaches_the_capture_file(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    capture = TrafficCapture(path, sample_rate=1.0, max_bytes=1 << 20, rng=random.Random(0))
+    result = {
+        "decision": "READY",
+        "draftText": f"Thanks Jane! Write to {EMAIL} any time.",
+        "verifier": {
+            "pass": True,
+            "violations": [{"code": "CONTACT", "message": "m", "snippet": PHONE}],
+            "suggestedRewrite": f"Thanks Doe, see {URL}",
+        },
+    }
+
+    capture.submit(_request(), result=result, latency_ms=12)
+    capture.close()
+
+    contents = path.read_text(encoding="utf-8")
+    for secret in (EMAIL, PHONE, URL, "Jane", "Doe", "org-secret-42", "review-secret-7"):
+        assert secret not in contents
+    assert capture.metadata()["captured"] == 1
+    record = json.loads(contents)
+    assert len(record["request"]["evidence"]["comment"]) == len(COMMENT)
+    assert record["result"]["decision"] == "READY"
+
+
+def test_unsampled_and_oversized_records_are_not_written(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    skipped = TrafficCapture(path, sample_rate=0.0, max_bytes=1 << 20)
+    skipped.submit(_request(), latency_ms=1)
+    skipped.close()
+    full = TrafficCapture(path, sample_rate=1.0, max_bytes=64)
+    full.submit(_request(), latency_ms=1)
+    full.close()
+
+    assert not path.exists()
+    assert full.metadata()["dropped"] == 1
+
+
+def test_replay_compares_captured_outcomes_with_the_candidate(monkeypatch, tmp_path):
+    path = tmp_path / "capture.jsonl"
+    capture = TrafficCapture(path, sample_rate=1.0, max_bytes=1 << 20)
+    for index in range(3):
+        capture.submit(
+            _request(reviewId=f"review-{index}"),
+            result={"decision": "READY", "verifier": {"pass": True}, "seoQuality": {"keywordCoverage": 1.0}},
+            latency_ms=100,
+        )
+    capture.submit(_request(reviewId="review-error"), error={"error": "MODEL_TIMEOUT"}, latency_ms=30000)
+    capture.close()
+    output = tmp_path / "replay.json"
+    monkeypatch.setattr(sys, "argv", ["replay_traffic.py", "--capture", str(path), "--fake-lm", "--output", str(output)])
+
+    replay_traffic.main()
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["records"] == 4
+    assert report["baseline"]["decisions"] == {"ERROR:MODEL_TIMEOUT": 1, "READY": 3}
+    assert report["replay"]["decisions"] == {"READY": 4}
+    assert report["decisionAgreement"] == 0.75
+    assert report["decisionTransitions"] == {"ERROR:MODEL_TIMEOUT->READY": 1}
+
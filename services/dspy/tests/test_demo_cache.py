@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+
+import dspy
+
+from compile_bootstrap_fewshot import verify_metric
+from demo_cache import CachedBootstrapFewShot, DemoCache
+from fake_lm import FakeLM, FakeLMProfile
+from fakes import EVIDENCE
+from programs import VerifyProgram, _single_predictor
+
+
+class CountingLM(FakeLM):
+    def __init__(self) -> None:
+        super().__init__("openai/gpt-4.1-mini", FakeLMProfile(latency_ms=0.0, latency_sigma=0.0), seed=1)
+        self.calls = 0
+
+    def forward(self, *args, **kwargs):
+        self.calls += 1
+        return super().forward(*args, **kwargs)
+
+
+def _examples(count: int) -> list[dspy.Example]:
+    return [
+        dspy.Example(
+            evidence_json=json.dumps({**EVIDENCE, "comment": f"Visit {index}"}),
+            draft_text=f"Thanks for visit {index}!",
+            policy_json="{}",
+            passed=True,
+            violations=[],
+            suggested_rewrite="",
+        ).with_inputs("evidence_json", "draft_text", "policy_json")
+        for index in range(count)
+    ]
+
+
+def _compile(cache: DemoCache, trainset: list[dspy.Example], metric_key: str = "verify") -> tuple[dspy.Module, int]:
+    lm = CountingLM()
+    optimizer = CachedBootstrapFewShot(
+        cache=cache, metric_key=metric_key, metric=verify_metric, max_bootstrapped_demos=8, max_labeled_demos=0
+    )
+    with dspy.context(lm=lm, adapter=dspy.JSONAdapter()):
+        compiled = optimizer.compile(student=VerifyProgram(), trainset=trainset)
+    return compiled, lm.calls
+
+
+def test_recompile_only_pays_for_new_examples(tmp_path):
+    path = tmp_path / "demo_cache.sqlite3"
+    cache = DemoCache(path)
+    first, first_calls = _compile(cache, _examples(3))
+    cache.close()
+
+    cache = DemoCache(path)
+    second, second_calls = _compile(cache, _examples(4))
+
+    assert first_calls == 3
+    assert second_calls == 1
+    assert cache.stats() == {"hits": 3, "misses": 1, "reuseRate": 0.75}
+    # Cached traces come back as demos, so the artifact matches a from-scratch compile.
+    first_demos = [demo.toDict() for demo in _single_predictor(first).demos]
+    second_demos = [demo.toDict() for demo in _single_predictor(second).demos]
+    assert len(second_demos) == 4
+    assert all(demo in second_demos for demo in first_demos)
+
+
+def test_changed_metric_settings_miss_the_cache(tmp_path):
+    cache = DemoCache(tmp_path / "demo_cache.sqlite3")
+    _compile(cache, _examples(2), metric_key="draft:sequence:0.75")
+
+    _, calls = _compile(cache, _examples(2), metric_key="draft:ngram:0.7")
+
+    assert calls == 2
+
+
+def test_failed_examples_are_remembered_without_demos(tmp_path):
+    cache = DemoCache(tmp_path / "demo_cache.sqlite3")
+    # The fake verifier passes every draft, so an example labelled as failing never matches the metric.
+    failing = [example.copy(passed=False) for example in _examples(2)]
+    first, _ = _compile(cache, failing)
+
+    second, calls = _compile(cache, failing)
+
+    assert calls == 0
+    assert _single_predictor(first).demos == _single_predictor(second).demos == []
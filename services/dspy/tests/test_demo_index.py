@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+
+import numpy as np
+import pytest
+
+import build_demo_index
+from demo_index import DemoIndex, create_demo_selector, demo_tokens, vectorize, write_demo_index
+from fakes import EVIDENCE, ScriptedLM, use_lms, verdict
+from programs import ProgramManager
+from settings import get_settings
+
+COMMENTS = [
+    "The wood fired pizza was amazing and the crust was crisp",
+    "Slow service and the pasta arrived cold",
+    "Lovely patio, friendly staff, great cocktails",
+    "Best tiramisu in town, will come back for dessert",
+]
+
+
+def _draft_rows() -> list[dict]:
+    rows = [
+        {"evidence": {**EVIDENCE, "starRating": 5 if index != 1 else 2, "comment": comment}, "reply": f"REPLY {index}"}
+        for index, comment in enumerate(COMMENTS)
+    ]
+    # Rows the compile script skips are not indexed either.
+    return rows + [{"evidence": EVIDENCE}]
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    dataset = tmp_path / "draft_train.jsonl"
+    dataset.write_text("\n".join(json.dumps(row) for row in _draft_rows()), encoding="utf-8")
+    build_demo_index.main(["--task", "draft", "--dataset", str(dataset), "--output-dir", str(tmp_path / "index"), "--dim", "512"])
+    return tmp_path / "index"
+
+
+def test_the_build_script_writes_a_memory_mapped_index(index_dir):
+    index = DemoIndex(index_dir / "draft")
+
+    assert (index.meta["task"], index.meta["demos"], index.dim) == ("draft", 4, 512)
+    assert len(index) == 4
+    for array in (index.idf, index.vectors, index.tokens, index.offsets):
+        assert isinstance(array, np.memmap)
+    assert index.vectors.dtype == np.float16 and index.vectors.shape == (4, 512)
+    assert np.linalg.norm(index.vectors.astype(np.float32), axis=1) == pytest.approx([1.0] * 4, abs=1e-2)
+    record = index._record(2)
+    assert (record["reply"], json.loads(record["evidence_json"])["comment"]) == ("REPLY 2", COMMENTS[2])
+    assert int(index.tokens[2]) == demo_tokens(record)
+
+
+def test_select_ranks_demos_by_similarity(index_dir):
+    index = DemoIndex(index_dir / "draft")
+
+    demos, spent = index.select("rating5 the pizza crust was crisp and amazing", token_budget=10_000, max_demos=2)
+
+    assert len(demos) == 2
+    assert demos[0].reply == "REPLY 0"
+    assert spent == sum(demo_tokens(demo.toDict()) for demo in demos)
+    assert demos[0].evidence_json == index._record(0)["evidence_json"]
+
+
+def test_select_returns_the_top_k_in_score_order(tmp_path):
+    words = ["pizza", "crust", "oven", "basil", "mozzarella", "tomato"]
+    # Row n shares its first n words with the query, so every row scores differently.
+    records = [(" ".join(words[:count] + [f"filler{count}"]), {"reply": f"REPLY {count}"}) for count in range(1, 7)]
+    write_demo_index(tmp_path, "draft", records, dim=1024)
+    index = DemoIndex(tmp_path)
+    query = " ".join(words)
+    scores = index.vectors.astype(np.float32) @ vectorize(query, index.dim, index.idf)
+
+    demos, _ = index.select(query, token_budget=10_000, max_demos=3)
+
+    assert len(set(scores.round(3).tolist())) == len(records)
+    assert [demo.reply for demo in demos] == [f"REPLY {row + 1}" for row in np.argsort(-scores)[:3]]
+    assert demos[0].reply == "REPLY 6"
+
+
+def test_select_skips_demos_that_do_not_fit_the_token_budget(tmp_path):
+    records = [
+        ("pizza crust", {"reply": "x" * 400}),
+        ("pizza crust oven", {"reply": "short pizza reply"}),
+        ("pasta", {"reply": "short pasta reply"}),
+    ]
+    write_demo_index(tmp_path, "draft", records, dim=256)
+    index = DemoIndex(tmp_path)
+    budget = demo_tokens(records[1][1]) + demo_tokens(records[2][1])
+
+    demos, spent = index.select("pizza crust", token_budget=budget, max_demos=3)
+
+    # The best match costs more than the whole budget, so the walk moves on to the next ones.
+    assert [demo.reply for demo in demos] == ["short pizza reply", "short pasta reply"]
+    assert spent == budget
+    assert index.select("pizza crust", token_budget=0, max_demos=3) == ([], 0)
+    assert index.select("pizza crust", token_budget=budget, max_demos=0) == ([], 0)
+
+
+def test_selector_counts_demos_and_leaves_tasks_without_an_index_alone(index_dir):
+    settings = dataclasses.replace(get_settings(), dynamic_demos=True, demo_index_dir=str(index_dir), demo_max_count=2)
+    selector = create_demo_selector(settings)
+
+    demos = selector.draft({"starRating": 5, "comment": "Great cocktails on the patio"})
+
+    assert demos[0].reply == "REPLY 2"
+    assert selector.verify(EVIDENCE, "Thanks!") is None
+    metadata = selector.metadata()
+    assert metadata["tasks"]["draft"]["index"]["demos"] == 4
+    assert (metadata["tasks"]["draft"]["calls"], metadata["tasks"]["draft"]["meanDemos"]) == (1, len(demos))
+    assert metadata["tasks"]["verify"] == {"index": None, "calls": 0, "meanDemos": 0.0, "meanDemoTokens": 0.0}
+
+
+def test_the_draft_prompt_carries_the_nearest_demos(index_dir):
+    settings = dataclasses.replace(get_settings(), dynamic_demos=True, demo_index_dir=str(index_dir), demo_max_count=1)
+    manager = ProgramManager(settings)
+    draft = ScriptedLM("openai/gpt-4o-mini", [{"reasoning": "r", "reply": "Thanks for coming!"}])
+    use_lms(manager, draft=draft, verify=ScriptedLM("openai/gpt-4.1-mini", [verdict()]))
+
+    manager.process_review("AUTO", json.dumps({**EVIDENCE, "comment": "Best tiramisu, we will be back for dessert"}))
+
+    prompt = json.dumps(draft.history[-1]["messages"])
+    assert "REPLY 3" in prompt
+    assert "REPLY 0" not in prompt
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+
+import pytest
+
+from draft_routing import FAST, REASONING, DraftRouter
+from fakes import EVIDENCE, ScriptedLM, use_lms, verdict
+from programs import ProgramManager
+from settings import get_settings
+
+LONG_COMMENT = "The crust was great. " * 20
+
+
+@pytest.fixture
+def router():
+    return DraftRouter(policy="auto", fast_min_rating=4, fast_max_comment_chars=200)
+
+
+@pytest.mark.parametrize(
+    ("evidence", "mode", "expected"),
+    [
+        ({"starRating": 5, "comment": "Great pizza"}, "AUTO", FAST),
+        ({"starRating": 4, "comment": ""}, "AUTO", FAST),
+        ({"starRating": "4", "comment": None}, "AUTO", FAST),
+        ({"starRating": 5, "comment": "x" * 200}, "AUTO", FAST),
+        ({"starRating": 5, "comment": "  " + "x" * 200 + "  "}, "AUTO", FAST),
+        ({"starRating": 5, "comment": "x" * 201}, "AUTO", REASONING),
+        ({"starRating": 3, "comment": "Fine"}, "AUTO", REASONING),
+        ({"starRating": 5, "comment": LONG_COMMENT}, "AUTO", REASONING),
+        ({"starRating": None, "comment": "Great pizza"}, "AUTO", REASONING),
+        ({"starRating": "five", "comment": "Great pizza"}, "AUTO", REASONING),
+        ({"comment": "Great pizza"}, "AUTO", REASONING),
+        ({"starRating": 5, "comment": "Great pizza"}, "MANUAL_REGENERATE", REASONING),
+    ],
+    ids=[
+        "short-5-star",
+        "empty-4-star",
+        "string-rating",
+        "at-max-chars",
+        "trimmed-to-max",
+        "over-max-chars",
+        "low-rating",
+        "long-comment",
+        "no-rating",
+        "bad-rating",
+        "missing-rating",
+        "regeneration",
+    ],
+)
+def test_auto_routes_short_positive_reviews_to_the_fast_variant(router, evidence, mode, expected):
+    assert router.route(evidence, mode) == expected
+
+
+@pytest.mark.parametrize("policy", [FAST, REASONING])
+def test_fixed_policies_ignore_the_review(policy):
+    router = DraftRouter(policy=policy, fast_min_rating=4, fast_max_comment_chars=200)
+
+    assert router.route({"starRating": 1, "comment": LONG_COMMENT}, "MANUAL_REGENERATE") == policy
+    assert router.route({"starRating": 5, "comment": "Great"}, "AUTO") == policy
+
+
+def test_metadata_reports_pass_rate_and_latency_per_variant(router):
+    for draft_ms, passed in [(100.0, True), (300.0, False), (200.0, True), (400.0, True)]:
+        router.record(FAST, draft_ms, passed)
+
+    metadata = router.metadata()
+
+    assert (metadata["policy"], metadata["fastMinRating"], metadata["fastMaxCommentChars"]) == ("auto", 4, 200)
+    assert metadata["variants"][FAST] == {"drafts": 4, "passRate": 0.75, "draftLatencyMs": {"p50": 200.0, "p95": 400.0}}
+    assert metadata["variants"][REASONING] == {"drafts": 0, "passRate": 0.0, "draftLatencyMs": {"p50": 0.0, "p95": 0.0}}
+
+
+def _draft(evidence: dict, draft_response: dict) -> tuple[dict, ProgramManager, ScriptedLM]:
+    manager = ProgramManager(dataclasses.replace(get_settings(), draft_routing="auto", verify_mode="full"))
+    draft = ScriptedLM("openai/gpt-4o-mini", [draft_response])
+    use_lms(manager, draft=draft, verify=ScriptedLM("openai/gpt-4.1-mini", [verdict()]))
+    result = manager.process_review("AUTO", json.dumps(evidence))
+    return result, manager, draft
+
+
+def test_short_positive_reviews_are_drafted_without_reasoning():
+    result, manager, draft = _draft(EVIDENCE, {"reply": "Thanks for the kind words!"})
+
+    assert result["draftText"] == "Thanks for the kind words!"
+    assert result["generation"]["variant"] == FAST
+    assert result["program"]["draftArtifactVersion"] == manager.fast_draft_artifact_version
+    assert "reasoning" not in json.dumps(draft.history[-1]["messages"])
+    assert manager.draft_router.metadata()["variants"][FAST]["drafts"] == 1
+
+
+def test_long_reviews_are_drafted_with_reasoning():
+    evidence = {**EVIDENCE, "comment": LONG_COMMENT}
+
+    result, manager, draft = _draft(evidence, {"reasoning": "They liked the crust.", "reply": "Thanks, glad the crust hit the spot!"})
+
+    assert result["draftText"] == "Thanks, glad the crust hit the spot!"
+    assert result["generation"]["variant"] == REASONING
+    assert result["program"]["draftArtifactVersion"] == manager.draft_artifact_version
+    assert "reasoning" in json.dumps(draft.history[-1]["messages"])
+    variants = manager.draft_router.metadata()["variants"]
+    assert (variants[REASONING]["drafts"], variants[REASONING]["passRate"], variants[FAST]["drafts"]) == (1, 1.0, 0)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+
+from fakes import EVIDENCE, ScriptedLM, use_lms, verdict, warm_litellm
+from programs import ProgramManager, _partial_draft_doomed
+from settings import get_settings
+
+PIZZA_EVIDENCE = {**EVIDENCE, "seoProfile": {"primaryKeywords": ["pizza"]}}
+STUFFED = "Pizza lovers, our pizza is the best pizza in town, thanks for the pizza review!"
+CLEAN = "Thanks so much for the kind words about our pizza, see you again soon!"
+
+
+def _manager(**overrides) -> ProgramManager:
+    return ProgramManager(dataclasses.replace(get_settings(), early_seo_reject=True, **overrides))
+
+
+def _stream(manager: ProgramManager, mode: str, current_draft_text: str | None = None) -> list[tuple[str, dict]]:
+    async def collect() -> list[tuple[str, dict]]:
+        return [
+            event
+            async for event in manager.stream_process_review(mode, json.dumps(PIZZA_EVIDENCE), current_draft_text)
+        ]
+
+    return asyncio.run(collect())
+
+
+def test_stream_redrafts_doomed_attempt_instead_of_returning_it():
+    warm_litellm()
+    manager = _manager()
+    use_lms(
+        manager,
+        draft=ScriptedLM("openai/gpt-4o-mini", [{"reasoning": "r", "reply": STUFFED}, {"reasoning": "r", "reply": CLEAN}]),
+        verify=ScriptedLM("openai/gpt-4.1-mini", [verdict()]),
+    )
+
+    events = _stream(manager, "MANUAL_REGENERATE", "Thanks for the review.")
+
+    drafts = [payload for event, payload in events if event == "draft"]
+    result = events[-1][1]
+    assert [draft["attempt"] for draft in drafts] == [2]
+    assert result["draftText"] == CLEAN
+    assert result["decision"] == "READY"
+    assert result["generation"]["earlyRejected"] is False
+    assert result["generation"]["attemptCount"] == 2
+
+
+def test_stream_last_attempt_completes_before_early_reject():
+    warm_litellm()
+    manager = _manager()
+    verify = ScriptedLM("openai/gpt-4.1-mini", [])
+    use_lms(manager, draft=ScriptedLM("openai/gpt-4o-mini", [{"reasoning": "r", "reply": STUFFED}]), verify=verify)
+
+    events = _stream(manager, "AUTO")
+
+    result = events[-1][1]
+    assert result["draftText"] == STUFFED
+    assert "".join(payload["text"] for event, payload in events if event == "token") == STUFFED
+    assert result["decision"] == "BLOCKED_BY_VERIFIER"
+    assert result["generation"]["earlyRejected"] is True
+    assert verify.calls == 0
+
+
+def test_early_rejected_draft_is_rewritten_for_repair():
+    manager = _manager(max_repairs=1)
+    verify = ScriptedLM("openai/gpt-4.1-mini", [{"suggested_rewrite": CLEAN}, verdict()])
+    use_lms(manager, draft=ScriptedLM("openai/gpt-4o-mini", [{"reasoning": "r", "reply": STUFFED}]), verify=verify)
+
+    result = manager.process_review("AUTO", json.dumps(PIZZA_EVIDENCE))
+
+    assert result["generation"]["earlyRejected"] is True
+    assert result["generation"]["repairCount"] == 1
+    assert result["draftText"] == CLEAN
+    assert result["decision"] == "READY"
+    assert verify.calls == 2
+
+
+def test_partial_word_at_the_end_of_the_stream_is_not_counted():
+    policy = {"seoTargets": {"requiredKeywords": ["pizza"], "optionalKeywords": [], "geoTerms": []}}
+
+    assert not _partial_draft_doomed("Our pizza and pizza and pizza", policy)
+    assert _partial_draft_doomed("Our pizza and pizza and pizza ", policy)
+    assert not _partial_draft_doomed("Our pizzas, pizza and pizzas, pizza", policy)
+
+
+def test_early_reject_response_reports_why_the_draft_was_blocked():
+    manager = _manager()
+    verify = ScriptedLM("openai/gpt-4.1-mini", [])
+    use_lms(manager, draft=ScriptedLM("openai/gpt-4o-mini", [{"reasoning": "r", "reply": STUFFED}]), verify=verify)
+
+    result = manager.process_review("AUTO", json.dumps(PIZZA_EVIDENCE))
+
+    codes = [violation["code"] for violation in result["verifier"]["violations"]]
+    assert result["decision"] == "BLOCKED_BY_VERIFIER"
+    assert codes == ["SEO_EARLY_REJECTED", "SEO_KEYWORD_STUFFING"]
+    assert "skipped" in result["verifier"]["violations"][0]["message"]
+    assert result["seoQuality"]["stuffingRisk"] is True
+    assert verify.calls == 0
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+
+from evaluate_program import RateLimiter, evaluate, summarize
+
+
+class RecordingVerifier:
+    """Passes every draft that does not mention "refund", and records what it was asked."""
+
+    def __init__(self) -> None:
+        self.drafts: list[str] = []
+
+    def __call__(self, evidence_json: str, draft_text: str, policy_json: str) -> dict:
+        self.drafts.append(draft_text)
+        return {"pass": "refund" not in draft_text}
+
+
+def _write(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+
+
+def _evaluate(path, checkpoint, program):
+    keys = evaluate("verify", program, path, checkpoint, workers=2, limiter=RateLimiter(0))
+    return summarize("verify", checkpoint, keys)
+
+
+def test_edited_rows_rerun_and_replace_stale_results(tmp_path):
+    dataset = tmp_path / "verify.jsonl"
+    checkpoint = tmp_path / "verify.eval.jsonl"
+    rows = [
+        {"evidence": {"starRating": 5}, "draftText": "Thanks!", "pass": True},
+        {"evidence": {"starRating": 1}, "draftText": "We issued a refund.", "pass": True},
+        {"evidence": {"starRating": 4}, "draftText": "See you soon.", "pass": True},
+    ]
+    _write(dataset, rows)
+
+    first = _evaluate(dataset, checkpoint, RecordingVerifier())
+    assert first["examples"] == 3
+    assert first["pass_match_rate"] == 2 / 3
+
+    rows[1] = {**rows[1], "pass": False}
+    _write(dataset, rows)
+    program = RecordingVerifier()
+    second = _evaluate(dataset, checkpoint, program)
+
+    assert program.drafts == ["We issued a refund."]
+    assert second["examples"] == 3
+    assert second["pass_match_rate"] == 1.0
+
+
+def test_removed_rows_drop_out_of_the_summary(tmp_path):
+    dataset = tmp_path / "verify.jsonl"
+    checkpoint = tmp_path / "verify.eval.jsonl"
+    rows = [
+        {"evidence": {"starRating": 5}, "draftText": "Thanks!", "pass": True},
+        {"evidence": {"starRating": 5}, "draftText": "Cheers!", "pass": True},
+    ]
+    _write(dataset, rows)
+    _evaluate(dataset, checkpoint, RecordingVerifier())
+
+    _write(dataset, rows[:1])
+    program = RecordingVerifier()
+
+    assert _evaluate(dataset, checkpoint, program)["examples"] == 1
+    assert program.drafts == []
+
+
+def test_inserted_rows_do_not_rerun_the_rows_after_them(tmp_path):
+    dataset = tmp_path / "verify.jsonl"
+    checkpoint = tmp_path / "verify.eval.jsonl"
+    rows = [
+        {"evidence": {"starRating": 5}, "draftText": "Thanks!", "pass": True},
+        {"evidence": {"starRating": 4}, "draftText": "See you soon.", "pass": True},
+    ]
+    _write(dataset, rows)
+    _evaluate(dataset, checkpoint, RecordingVerifier())
+
+    _write(dataset, [{"evidence": {"starRating": 3}, "draftText": "Noted.", "pass": True}, *rows])
+    program = RecordingVerifier()
+
+    assert _evaluate(dataset, checkpoint, program)["examples"] == 3
+    assert program.drafts == ["Noted."]
+
+
+def test_duplicate_rows_are_scored_separately(tmp_path):
+    dataset = tmp_path / "verify.jsonl"
+    checkpoint = tmp_path / "verify.eval.jsonl"
+    row = {"evidence": {"starRating": 5}, "draftText": "Thanks!", "pass": True}
+    _write(dataset, [row, row])
+    program = RecordingVerifier()
+
+    assert _evaluate(dataset, checkpoint, program)["examples"] == 2
+    assert program.drafts == ["Thanks!", "Thanks!"]
+
+    _write(dataset, [row, row, row])
+    program = RecordingVerifier()
+
+    assert _evaluate(dataset, checkpoint, program)["examples"] == 3
+    assert program.drafts == ["Thanks!"]
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+import app as service_app
+from fake_lm import FakeLMProfile, fake_lm_factory
+from fakes import EVIDENCE
+from programs import ProgramManager
+from settings import get_settings
+
+
+def test_batch_verify_route_parses_fake_verdicts_without_fallbacks():
+    settings = get_settings()
+    manager = ProgramManager(settings, lm_factory=fake_lm_factory(FakeLMProfile(latency_ms=0.0), seed=1))
+    service_app.app.dependency_overrides[service_app.get_program_manager] = lambda: manager
+    items = [
+        {"reviewId": f"review-{index}", "evidence": EVIDENCE, "candidateDraftText": f"Thanks for visiting, guest {index}!"}
+        for index in range(3)
+    ]
+    try:
+        with TestClient(service_app.app) as client:
+            response = client.post(
+                "/api/review/verify/batch",
+                json={"orgId": "test-org", "items": items},
+                headers={"authorization": f"Bearer {settings.service_token}"},
+            )
+    finally:
+        service_app.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["batch"]["batchCalls"] == 1
+    assert body["batch"]["fallbacks"] == 0
+    assert [item["result"]["decision"] for item in body["results"]] == ["READY"] * 3
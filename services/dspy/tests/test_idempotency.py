@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import app as service_app
+import idempotency
+from fakes import EVIDENCE
+from idempotency import ResultPendingError, ResultStore
+from lm_cache import SqliteCacheBackend
+from models import ProcessReviewRequest
+from programs import ServiceError
+from settings import get_settings
+
+
+def test_computed_result_is_not_shared_with_the_store():
+    store = ResultStore(ttl_seconds=60, max_entries=10)
+
+    result, source = store.run("key", lambda: {"draftText": "Thanks!", "usage": {"draft": {"promptTokens": 3}}})
+    result["draftText"] = "changed"
+    result["usage"]["draft"]["promptTokens"] = 99
+
+    stored, stored_source = store.run("key", lambda: pytest.fail("should not recompute"))
+    assert (source, stored_source) == ("computed", "stored")
+    assert stored == {"draftText": "Thanks!", "usage": {"draft": {"promptTokens": 3}}}
+
+
+def test_stored_hits_are_copies():
+    store = ResultStore(ttl_seconds=60, max_entries=10)
+    store.run("key", lambda: {"items": [1]})
+
+    first, _ = store.run("key", lambda: {})
+    first["items"].append(2)
+
+    assert store.run("key", lambda: {})[0] == {"items": [1]}
+
+
+def test_retry_attaches_to_the_running_computation():
+    store = ResultStore(ttl_seconds=60, max_entries=10)
+    started = threading.Event()
+    release = threading.Event()
+    calls: list[int] = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"value": 1}
+
+    outcomes: list[tuple[dict, str]] = []
+    first = threading.Thread(target=lambda: outcomes.append(store.run("key", compute)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: outcomes.append(store.run("key", compute)))
+    second.start()
+    while store.metadata()["attached"] == 0:
+        pass
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert calls == [1]
+    assert sorted(source for _, source in outcomes) == ["attached", "computed"]
+    assert all(result == {"value": 1} for result, _ in outcomes)
+    assert outcomes[0][0] is not outcomes[1][0]
+
+
+def test_failures_are_not_stored():
+    store = ResultStore(ttl_seconds=60, max_entries=10)
+
+    with pytest.raises(RuntimeError):
+        store.run("key", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+
+    assert store.run("key", lambda: {"ok": True}) == ({"ok": True}, "computed")
+
+
+def test_expired_and_evicted_entries_recompute(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(idempotency.time, "time", lambda: now[0])
+    store = ResultStore(ttl_seconds=10, max_entries=1)
+    store.run("a", lambda: {"n": 1})
+
+    now[0] += 11
+    assert store.run("a", lambda: {"n": 2}) == ({"n": 2}, "computed")
+    store.run("b", lambda: {"n": 3})
+    assert store.run("a", lambda: {"n": 4}) == ({"n": 4}, "computed")
+    assert store.metadata()["expired"] == 1
+    assert store.metadata()["evictions"] >= 1
+
+
+def test_persistent_results_survive_a_new_store(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    ResultStore(60, 10, persistent=SqliteCacheBackend(path=path, ttl_seconds=60, max_bytes=1 << 20)).run(
+        "key", lambda: {"draftText": "Thanks!"}
+    )
+
+    fresh = ResultStore(60, 10, persistent=SqliteCacheBackend(path=path, ttl_seconds=60, max_bytes=1 << 20))
+
+    assert fresh.run("key", lambda: pytest.fail("should not recompute")) == ({"draftText": "Thanks!"}, "stored")
+
+
+def _hold_first_run(store: ResultStore, key: str):
+    """Start a computation for `key` on a thread and return the event that releases it."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        return {"value": 1}
+
+    first = threading.Thread(target=lambda: store.run(key, compute))
+    first.start()
+    started.wait(5)
+    return compute, release, first
+
+
+def test_attached_retry_gives_up_at_its_deadline():
+    store = ResultStore(ttl_seconds=60, max_entries=10)
+    compute, release, first = _hold_first_run(store, "key")
+
+    with pytest.raises(ResultPendingError):
+        store.run("key", compute, deadline=time.monotonic() + 0.05)
+    release.set()
+    first.join(5)
+
+    # The first execution was unaffected, and its result is served to later retries.
+    assert store.run("key", compute) == ({"value": 1}, "stored")
+    assert store.metadata()["waitTimeouts"] == 1
+
+
+def test_process_route_answers_a_pending_duplicate_with_a_retryable_503():
+    store = ResultStore(ttl_seconds=60, max_entries=10)
+    request = ProcessReviewRequest.model_validate({
+        "orgId": "org",
+        "reviewId": "review",
+        "mode": "AUTO",
+        "requestId": "request-1",
+        "evidence": EVIDENCE,
+    })
+    started = threading.Event()
+    release = threading.Event()
+
+    def process_review(**_):
+        started.set()
+        release.wait(5)
+        return {"decision": "READY"}
+
+    manager = SimpleNamespace(
+        settings=dataclasses.replace(get_settings(), request_deadline_seconds=1),
+        process_review=process_review,
+    )
+    first = threading.Thread(target=lambda: service_app._run_process(request, manager, None, store))
+    first.start()
+    started.wait(5)
+
+    with pytest.raises(ServiceError) as caught:
+        service_app._run_process(request, manager, None, store)
+    release.set()
+    first.join(5)
+
+    assert caught.value.status_code == 503
+    assert caught.value.payload()["retryable"] is True
+    assert caught.value.retry_after_ms == service_app.RESULT_PENDING_RETRY_AFTER_MS
+    assert service_app._run_process(request, manager, None, store) == ({"decision": "READY"}, "stored")
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import jobs
+from fakes import EVIDENCE
+from jobs import RUNNING_LEASE_SECONDS, JobRunner, MemoryJobStore, SqliteJobStore, sign_webhook
+from models import ProcessReviewRequest
+from programs import ServiceError
+from settings import get_settings
+
+REQUEST = ProcessReviewRequest.model_validate({"orgId": "o", "reviewId": "r", "mode": "AUTO", "evidence": EVIDENCE})
+PUBLIC_ADDRESS = "93.184.216.34"
+
+
+def _job(job_id: str) -> dict:
+    return {
+        "jobId": job_id,
+        "status": "QUEUED",
+        "submittedAtUtc": "2026-01-01T00:00:00+00:00",
+        "startedAtUtc": None,
+        "completedAtUtc": None,
+        "result": None,
+        "error": None,
+        "callbackStatus": None,
+        "request": REQUEST.model_dump_json(),
+        "callbackUrl": None,
+    }
+
+
+def _wait_for(runner: JobRunner, job_id: str) -> dict:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        job = runner.get(job_id)
+        if job["status"] in {"COMPLETED", "FAILED"} and (job["callbackStatus"] or not runner.store.get(job_id)["callbackUrl"]):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _runner(send=None, secret="webhook-secret", allowed=("hooks.example.com",), addresses=(PUBLIC_ADDRESS,)) -> JobRunner:
+    return JobRunner(
+        MemoryJobStore(ttl_seconds=60),
+        lambda request: {"reviewId": request.reviewId},
+        max_workers=1,
+        webhook_secret=secret,
+        callback_allowed_hosts=allowed,
+        send=send or (lambda url, address, body, headers: 200),
+        sleep=lambda seconds: None,
+        resolve=lambda host: list(addresses),
+    )
+
+
+def test_memory_store_claims_a_job_once():
+    store = MemoryJobStore(ttl_seconds=60)
+    store.create(_job("a"))
+
+    claimed = store.claim("a")
+
+    assert claimed["status"] == "RUNNING"
+    assert store.claim("a") is None
+
+
+def test_sqlite_store_claims_once_across_handles_until_the_lease_expires(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(jobs.time, "time", lambda: now[0])
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = SqliteJobStore(path, ttl_seconds=3600), SqliteJobStore(path, ttl_seconds=3600)
+    first.create(_job("a"))
+    assert second.resumable() == ["a"]
+
+    assert first.claim("a")["status"] == "RUNNING"
+    assert second.claim("a") is None
+    assert second.resumable() == []
+
+    now[0] += RUNNING_LEASE_SECONDS + 1
+    assert second.resumable() == ["a"]
+    assert second.claim("a")["status"] == "RUNNING"
+    assert first.claim("a") is None
+
+
+def test_sqlite_store_does_not_reclaim_finished_jobs(tmp_path):
+    store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"), ttl_seconds=3600)
+    store.create(_job("a"))
+    job = store.claim("a")
+    store.update({**job, "status": "COMPLETED"})
+
+    assert store.claim("a") is None
+    assert store.resumable() == []
+
+
+def test_callback_is_signed_with_the_webhook_secret():
+    sent: list[tuple[str, str, bytes, dict]] = []
+    runner = _runner(send=lambda url, address, body, headers: sent.append((url, address, body, headers)) or 204)
+
+    job = _wait_for(runner, runner.submit(REQUEST, "https://hooks.example.com/dspy")["jobId"])
+
+    assert job["callbackStatus"] == "DELIVERED"
+    url, address, body, headers = sent[0]
+    assert (url, address) == ("https://hooks.example.com/dspy", PUBLIC_ADDRESS)
+    assert json.loads(body)["result"] == {"reviewId": "r"}
+    assert headers["x-dspy-signature"] == f"v1={sign_webhook('webhook-secret', headers['x-dspy-timestamp'], body)}"
+
+
+@pytest.mark.parametrize(
+    ("runner_options", "url", "message"),
+    [
+        ({"secret": ""}, "https://hooks.example.com/dspy", "DSPY_JOB_WEBHOOK_SECRET"),
+        ({}, "https://other.example.com/dspy", "DSPY_JOB_CALLBACK_ALLOWED_HOSTS"),
+        ({"allowed": ()}, "https://hooks.example.com/dspy", "DSPY_JOB_CALLBACK_ALLOWED_HOSTS"),
+        ({"allowed": ("*",), "addresses": ("127.0.0.1",)}, "http://localhost:8080/hook", "public addresses"),
+        ({"allowed": ("*",), "addresses": ("169.254.169.254",)}, "http://169.254.169.254/latest", "public addresses"),
+        ({"allowed": (".example.com",), "addresses": (PUBLIC_ADDRESS, "10.0.0.5")}, "https://a.example.com/", "public addresses"),
+        ({"allowed": ("*",), "addresses": ()}, "https://unresolvable.invalid/", "public addresses"),
+    ],
+)
+def test_unsafe_callbacks_are_rejected_at_submit(runner_options, url, message):
+    runner = _runner(**runner_options)
+
+    with pytest.raises(ServiceError) as raised:
+        runner.submit(REQUEST, url)
+
+    assert raised.value.status_code == 400
+    assert message in str(raised.value)
+
+
+def test_redirects_are_not_retried():
+    statuses = [302, 200]
+    runner = _runner(send=lambda url, address, body, headers: statuses.pop(0))
+
+    job = _wait_for(runner, runner.submit(REQUEST, "https://hooks.example.com/dspy")["jobId"])
+
+    assert job["callbackStatus"] == "FAILED"
+    assert statuses == [200]
+
+
+def test_post_does_not_follow_redirects():
+    hits: list[str] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            hits.append(self.path)
+            self.send_response(307 if self.path == "/hook" else 200)
+            self.send_header("location", "/internal")
+            self.send_header("content-length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        status = jobs._post(f"http://127.0.0.1:{server.server_port}/hook", "127.0.0.1", b"{}", {"content-type": "application/json"})
+    finally:
+        server.shutdown()
+
+    assert status == 307
+    assert hits == ["/hook"]
+
+
+def test_delivery_goes_to_the_address_checked_at_delivery():
+    lookups = [[PUBLIC_ADDRESS], ["93.184.216.35"], ["10.0.0.5"]]
+    sent: list[str] = []
+    runner = _runner(send=lambda url, address, body, headers: sent.append(address) or 204)
+    runner.resolve = lambda host: lookups.pop(0)
+
+    job = _wait_for(runner, runner.submit(REQUEST, "https://hooks.example.com/dspy")["jobId"])
+
+    # The third answer would have pointed inside the network, but no lookup happens after the check.
+    assert job["callbackStatus"] == "DELIVERED"
+    assert sent == ["93.184.216.35"]
+    assert lookups == [["10.0.0.5"]]
+
+
+def test_post_connects_to_the_pinned_address_with_the_url_host():
+    seen: list[tuple[str, str]] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            seen.append((self.headers["host"], self.path))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    try:
+        # `hooks.example.com` never resolves to loopback; only the pinned address can reach this server.
+        status = jobs._post(f"http://hooks.example.com:{port}/dspy?v=1", "127.0.0.1", b"{}", {"content-type": "application/json"})
+    finally:
+        server.shutdown()
+
+    assert status == 204
+    assert seen == [(f"hooks.example.com:{port}", "/dspy?v=1")]
+
+
+def test_post_reports_unreachable_addresses_as_status_zero():
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+
+    assert jobs._post(f"https://hooks.example.com:{port}/dspy", "127.0.0.1", b"{}", {}) == 0
+
+
+def test_renewed_leases_are_not_taken_over(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(jobs.time, "time", lambda: now[0])
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = SqliteJobStore(path, ttl_seconds=3600), SqliteJobStore(path, ttl_seconds=3600)
+    first.create(_job("a"))
+    first.claim("a")
+
+    now[0] += RUNNING_LEASE_SECONDS - 1
+    first.renew("a")
+    now[0] += RUNNING_LEASE_SECONDS - 1
+
+    assert second.resumable() == []
+    assert second.claim("a") is None
+
+
+def test_heartbeat_renews_running_jobs_and_takes_over_abandoned_ones(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    release = threading.Event()
+    started = threading.Event()
+
+    def process(request):
+        started.set()
+        release.wait(5)
+        return {"reviewId": request.reviewId}
+
+    store = SqliteJobStore(path, ttl_seconds=3600)
+    runner = JobRunner(store, process, max_workers=2, webhook_secret="", heartbeat_seconds=3600)
+    running_id = runner.submit(REQUEST)["jobId"]
+    assert started.wait(5)
+
+    other = SqliteJobStore(path, ttl_seconds=3600)
+    other.create(_job("abandoned"))
+    other.claim("abandoned")
+    # Both leases look expired: one job's worker died, the other job has simply run for a long time.
+    with other._lock:
+        other._conn.execute("UPDATE review_jobs SET updated_at = ?", (time.time() - RUNNING_LEASE_SECONDS - 1,))
+
+    runner.heartbeat()
+
+    assert other.claim(running_id) is None
+    release.set()
+    assert _wait_for(runner, "abandoned")["status"] == "COMPLETED"
+    assert _wait_for(runner, running_id)["status"] == "COMPLETED"
+
+
+def test_settings_default_to_in_memory_jobs_without_a_webhook_secret(monkeypatch):
+    monkeypatch.delenv("DSPY_JOB_STORE_PATH", raising=False)
+    monkeypatch.delenv("DSPY_JOB_WEBHOOK_SECRET", raising=False)
+    monkeypatch.setenv("DSPY_JOB_CALLBACK_ALLOWED_HOSTS", " Hooks.Example.com, .example.org ,")
+    get_settings.cache_clear()
+    try:
+        settings = get_settings()
+    finally:
+        get_settings.cache_clear()
+
+    assert settings.job_store_path is None
+    assert settings.job_webhook_secret == ""
+    assert settings.job_callback_allowed_hosts == ("hooks.example.com", ".example.org")
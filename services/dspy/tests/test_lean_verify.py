@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+
+from fakes import EVIDENCE, ScriptedLM, use_lms, verdict
+from programs import ProgramManager
+from settings import get_settings
+
+PIZZA_EVIDENCE = {**EVIDENCE, "seoProfile": {"primaryKeywords": ["pizza"]}}
+REWRITE = "Thanks for the kind words about our pizza!"
+
+
+def _verify(draft_text: str, responses: list[dict]) -> tuple[dict, ScriptedLM]:
+    manager = ProgramManager(dataclasses.replace(get_settings(), verify_mode="lean"))
+    verify = ScriptedLM("openai/gpt-4.1-mini", responses)
+    use_lms(manager, verify=verify)
+    result = manager.process_review("VERIFY_EXISTING_DRAFT", json.dumps(PIZZA_EVIDENCE), candidate_draft_text=draft_text)
+    return result, verify
+
+
+def test_lean_rewrites_drafts_that_fail_only_the_seo_checks():
+    result, verify = _verify(
+        "Thanks for visiting, see you soon!",
+        [{"passed": True, "violations": []}, {"suggested_rewrite": REWRITE}],
+    )
+
+    assert result["decision"] == "BLOCKED_BY_VERIFIER"
+    assert result["verifier"]["suggestedRewrite"] == REWRITE
+    assert verify.calls == 2
+    rewrite_prompt = json.dumps(verify.history[-1]["messages"])
+    assert "SEO_REQUIRED_KEYWORD_MISSING" in rewrite_prompt
+
+
+def test_lean_skips_the_rewrite_when_the_merged_verdict_passes():
+    result, verify = _verify("Thanks for the pizza love, see you soon!", [{"passed": True, "violations": []}])
+
+    assert result["decision"] == "READY"
+    assert result["verifier"]["suggestedRewrite"] is None
+    assert verify.calls == 1
+
+
+def test_lean_rewrite_gets_both_the_verdict_and_the_seo_violations():
+    result, verify = _verify(
+        "Thanks for visiting, we hope the free dessert made up for it!",
+        [verdict(passed=False), {"suggested_rewrite": REWRITE}],
+    )
+
+    assert result["decision"] == "BLOCKED_BY_VERIFIER"
+    assert [violation["code"] for violation in result["verifier"]["violations"]] == [
+        "UNSUPPORTED_CLAIM",
+        "SEO_REQUIRED_KEYWORD_MISSING",
+    ]
+    assert result["verifier"]["suggestedRewrite"] == REWRITE
+    rewrite_prompt = json.dumps(verify.history[-1]["messages"])
+    assert "UNSUPPORTED_CLAIM" in rewrite_prompt and "SEO_REQUIRED_KEYWORD_MISSING" in rewrite_prompt
+
+
+def test_the_verdict_call_does_not_ask_for_a_rewrite():
+    _, verify = _verify("Thanks for the pizza love, see you soon!", [{"passed": True, "violations": []}])
+
+    assert "suggested_rewrite" not in json.dumps(verify.history[0]["messages"])
+
+
+def test_full_mode_answers_in_one_call_and_only_has_the_verifiers_rewrite():
+    manager = ProgramManager(dataclasses.replace(get_settings(), verify_mode="full"))
+    verify = ScriptedLM("openai/gpt-4.1-mini", [verdict()])
+    use_lms(manager, verify=verify)
+
+    result = manager.process_review(
+        "VERIFY_EXISTING_DRAFT", json.dumps(PIZZA_EVIDENCE), candidate_draft_text="Thanks for visiting, see you soon!"
+    )
+
+    # The SEO failure blocks the draft either way; only lean asks for a rewrite that fixes it.
+    assert result["decision"] == "BLOCKED_BY_VERIFIER"
+    assert result["verifier"]["suggestedRewrite"] is None
+    assert verify.calls == 1
+
+
+def test_verify_metadata_splits_passing_and_failing_calls():
+    manager = ProgramManager(dataclasses.replace(get_settings(), verify_mode="lean"))
+    use_lms(
+        manager,
+        verify=ScriptedLM("openai/gpt-4.1-mini", [{"passed": True, "violations": []}, {"passed": True, "violations": []}, {"suggested_rewrite": REWRITE}]),
+    )
+
+    for draft_text in ("Thanks for the pizza love!", "Thanks for visiting!"):
+        manager.process_review("VERIFY_EXISTING_DRAFT", json.dumps(PIZZA_EVIDENCE), candidate_draft_text=draft_text)
+
+    metadata = manager.verify_metadata()
+    assert metadata["mode"] == "lean"
+    assert (metadata["passing"]["calls"], metadata["passing"]["rewriteCalls"]) == (1, 0)
+    assert (metadata["failing"]["calls"], metadata["failing"]["rewriteCalls"]) == (1, 1)
+
+
+def _auto_with_repairs(verify_responses: list[dict]) -> tuple[dict, ScriptedLM]:
+    manager = ProgramManager(dataclasses.replace(get_settings(), verify_mode="lean", max_repairs=2))
+    draft = ScriptedLM("openai/gpt-4o-mini", [{"reasoning": "Be brief.", "reply": "Thanks for visiting, see you soon!"}])
+    verify = ScriptedLM("openai/gpt-4.1-mini", verify_responses)
+    use_lms(manager, draft=draft, verify=verify)
+    return manager.process_review("AUTO", json.dumps(PIZZA_EVIDENCE)), verify
+
+
+def test_repair_reverifies_the_lean_rewrite_of_an_seo_failure():
+    result, verify = _auto_with_repairs([
+        {"passed": True, "violations": []},
+        {"suggested_rewrite": REWRITE},
+        {"passed": True, "violations": []},
+    ])
+
+    assert result["decision"] == "READY"
+    assert result["draftText"] == REWRITE
+    assert (result["generation"]["repairCount"], result["generation"]["changed"]) == (1, True)
+    assert result["verifier"]["violations"] == []
+    assert verify.calls == 3
+
+
+def test_repair_skips_reverifying_a_rewrite_that_still_fails_seo():
+    result, verify = _auto_with_repairs([
+        {"passed": True, "violations": []},
+        {"suggested_rewrite": "Thanks again for visiting!"},
+    ])
+
+    assert result["decision"] == "BLOCKED_BY_VERIFIER"
+    assert result["draftText"] == "Thanks for visiting, see you soon!"
+    assert result["generation"]["repairCount"] == 1
+    assert verify.calls == 2
+
+
+def test_repair_follows_the_rewrites_of_failing_repairs():
+    second_rewrite = "Thanks for the kind words about our pizza, see you soon!"
+
+    result, verify = _auto_with_repairs([
+        {"passed": True, "violations": []},
+        {"suggested_rewrite": REWRITE},
+        verdict(passed=False),
+        {"suggested_rewrite": second_rewrite},
+        {"passed": True, "violations": []},
+    ])
+
+    assert result["decision"] == "READY"
+    assert result["draftText"] == second_rewrite
+    assert result["generation"]["repairCount"] == 2
+    assert verify.calls == 5
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import lm_cache
+from lm_cache import RedisCacheBackend, SqliteCacheBackend
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.expiry: dict[str, int | None] = {}
+
+    def get(self, name: str) -> bytes | None:
+        return self.values.get(name)
+
+    def set(self, name: str, value: bytes, ex: int | None = None) -> None:
+        self.values[name] = value
+        self.expiry[name] = ex
+
+    def delete(self, *names: str) -> None:
+        for name in names:
+            self.values.pop(name, None)
+
+
+class Clock:
+    def __init__(self, now: float = 1_000.0) -> None:
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_sqlite_round_trip_and_metrics(tmp_path):
+    cache = SqliteCacheBackend(str(tmp_path / "cache.sqlite3"), ttl_seconds=60, max_bytes=10_000_000)
+    cache.set("k", {"choices": ["hello"]})
+
+    assert "k" in cache
+    assert cache.get("k") == {"choices": ["hello"]}
+    assert cache.get("missing", "default") == "default"
+    cache.delete("k")
+    assert "k" not in cache
+
+    snapshot = cache.metrics.snapshot()
+    assert (snapshot["hits"], snapshot["misses"], snapshot["writes"]) == (1, 1, 1)
+
+
+def test_sqlite_entries_are_shared_across_handles(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SqliteCacheBackend(path, ttl_seconds=60, max_bytes=10_000_000).set("k", "v")
+
+    assert SqliteCacheBackend(path, ttl_seconds=60, max_bytes=10_000_000).get("k") == "v"
+
+
+def test_sqlite_expires_entries_after_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(lm_cache.time, "time", clock.time)
+    cache = SqliteCacheBackend(str(tmp_path / "cache.sqlite3"), ttl_seconds=10, max_bytes=10_000_000)
+    cache.set("k", "v")
+
+    clock.now += 9
+    assert cache.get("k") == "v"
+    clock.now += 2
+    assert "k" not in cache
+    assert cache.get("k") is None
+    assert cache.metrics.snapshot()["expired"] == 1
+
+
+def test_sqlite_zero_ttl_never_expires(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(lm_cache.time, "time", clock.time)
+    cache = SqliteCacheBackend(str(tmp_path / "cache.sqlite3"), ttl_seconds=0, max_bytes=10_000_000)
+    cache.set("k", "v")
+
+    clock.now += 10 ** 9
+    assert cache.get("k") == "v"
+
+
+def test_sqlite_evicts_least_recently_used_over_budget(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(lm_cache.time, "time", clock.time)
+    monkeypatch.setattr(lm_cache, "EVICTION_CHECK_INTERVAL", 1)
+    payload = "x" * 2_000
+    entry_size = len(lm_cache._encode(payload + "0"))
+    cache = SqliteCacheBackend(str(tmp_path / "cache.sqlite3"), ttl_seconds=0, max_bytes=entry_size * 3)
+
+    for index in range(3):
+        clock.now += 1
+        cache.set(f"k{index}", payload + str(index))
+    clock.now += 1
+    assert cache.get("k0") == payload + "0"  # k0 is now the most recently used
+    clock.now += 1
+    cache.set("k3", payload + "3")
+
+    assert "k1" not in cache
+    assert all(key in cache for key in ("k0", "k2", "k3"))
+    assert cache.metrics.snapshot()["evictions"] == 1
+
+
+def test_sqlite_drops_undecodable_entries(tmp_path):
+    cache = SqliteCacheBackend(str(tmp_path / "cache.sqlite3"), ttl_seconds=60, max_bytes=10_000_000)
+    cache.set("k", "v")
+    cache._conn.execute("UPDATE lm_cache SET value = ? WHERE key = ?", (b"not zlib", "k"))
+
+    assert cache.get("k", "default") == "default"
+    assert "k" not in cache
+    assert cache.metrics.snapshot()["errors"] == 1
+
+
+def test_redis_round_trip_with_prefix_and_ttl():
+    client = FakeRedis()
+    cache = RedisCacheBackend(client, ttl_seconds=30)
+    cache.set("k", [1, 2, 3])
+
+    assert list(client.values) == ["dspy:lm:k"]
+    assert client.expiry["dspy:lm:k"] == 30
+    assert "k" in cache
+    assert cache.get("k") == [1, 2, 3]
+    cache.delete("k")
+    assert cache.get("k") is None
+
+
+def test_redis_zero_ttl_is_sent_without_expiry():
+    client = FakeRedis()
+    RedisCacheBackend(client, ttl_seconds=0).set("k", "v")
+
+    assert client.expiry["dspy:lm:k"] is None
+
+
+def test_redis_errors_are_counted_not_raised():
+    class BrokenRedis(FakeRedis):
+        def get(self, name: str) -> bytes | None:
+            raise ConnectionError("down")
+
+    cache = RedisCacheBackend(BrokenRedis(), ttl_seconds=30)
+
+    assert cache.get("k", "default") == "default"
+    assert "k" not in cache
+    assert cache.metrics.snapshot()["errors"] == 2
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import dspy
+import httpx
+import litellm
+import pytest
+from dspy.utils import exceptions as dspy_errors
+from fastapi.testclient import TestClient
+
+import app as service_app
+from fakes import EVIDENCE, use_lms
+from programs import ProgramManager, ServiceError, VerifySignature, _map_model_error, _model_call, _retry_after_ms
+from settings import get_settings
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+class RaisingLM(dspy.BaseLM):
+    def __init__(self, model: str, error: Exception) -> None:
+        super().__init__(model)
+        self.error = error
+
+    def forward(self, *args, **kwargs):
+        raise self.error
+
+
+def _response(status_code: int, headers: dict[str, str] | None = None) -> httpx.Response:
+    return httpx.Response(status_code, headers=headers, request=REQUEST)
+
+
+def _litellm_error(error_type: type[Exception], status_code: int = 500, **kwargs) -> Exception:
+    kwargs.setdefault("response", _response(status_code))
+    if error_type is litellm.APIConnectionError:
+        kwargs = {"request": REQUEST}
+    elif error_type is litellm.Timeout:
+        kwargs.pop("response")
+    return error_type(message="provider said no", model="gpt-4.1-mini", llm_provider="openai", **kwargs)
+
+
+@pytest.mark.parametrize(
+    ("error_type", "expected"),
+    [
+        (litellm.Timeout, ("MODEL_TIMEOUT", 504, True)),
+        (litellm.RateLimitError, ("MODEL_RATE_LIMIT", 429, True)),
+        (litellm.APIConnectionError, ("INTERNAL_ERROR", 503, True)),
+        (litellm.ServiceUnavailableError, ("INTERNAL_ERROR", 503, True)),
+        (litellm.InternalServerError, ("INTERNAL_ERROR", 503, True)),
+        (litellm.BadGatewayError, ("INTERNAL_ERROR", 503, True)),
+        (litellm.AuthenticationError, ("INTERNAL_ERROR", 502, False)),
+        (litellm.PermissionDeniedError, ("INTERNAL_ERROR", 502, False)),
+        (litellm.NotFoundError, ("INTERNAL_ERROR", 502, False)),
+        (litellm.BadRequestError, ("INVALID_REQUEST", 400, False)),
+        (litellm.UnprocessableEntityError, ("INVALID_REQUEST", 400, False)),
+        (litellm.ContextWindowExceededError, ("INVALID_REQUEST", 400, False)),
+    ],
+    ids=lambda value: value.__name__ if isinstance(value, type) else None,
+)
+def test_litellm_errors_are_classified_by_type(error_type, expected):
+    error = _map_model_error(_litellm_error(error_type))
+
+    assert (error.code, error.status_code, error.retryable) == expected
+    assert "provider said no" in error.message
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        (dspy_errors.LMTimeoutError("slow"), ("MODEL_TIMEOUT", 504, True)),
+        (dspy_errors.LMRateLimitError("busy"), ("MODEL_RATE_LIMIT", 429, True)),
+        (dspy_errors.LMServerError("5xx"), ("INTERNAL_ERROR", 503, True)),
+        (dspy_errors.LMTransportError("reset"), ("INTERNAL_ERROR", 503, True)),
+        (dspy_errors.LMAuthError("bad key"), ("INTERNAL_ERROR", 502, False)),
+        (dspy_errors.LMBillingError("no credit"), ("INTERNAL_ERROR", 502, False)),
+        (dspy_errors.LMNotConfiguredError("no key"), ("INTERNAL_ERROR", 502, False)),
+        (dspy_errors.LMInvalidRequestError("bad"), ("INVALID_REQUEST", 400, False)),
+        (dspy_errors.ContextWindowExceededError(message="too long"), ("INVALID_REQUEST", 400, False)),
+        # The code attribute wins over the class, so a re-coded error follows its code.
+        (dspy_errors.LMError("re-coded", code="rate_limit"), ("MODEL_RATE_LIMIT", 429, True)),
+    ],
+    ids=lambda value: getattr(value, "code", None),
+)
+def test_dspy_errors_are_classified_by_code(error, expected):
+    mapped = _map_model_error(error)
+
+    assert (mapped.code, mapped.status_code, mapped.retryable) == expected
+
+
+def test_parse_failures_and_plain_timeouts_are_retryable():
+    parse_error = _map_model_error(dspy_errors.AdapterParseError("JSONAdapter", VerifySignature, "{not json"))
+
+    assert (parse_error.code, parse_error.status_code, parse_error.retryable) == ("MODEL_SCHEMA_ERROR", 502, True)
+    assert _map_model_error(TimeoutError()).code == "MODEL_TIMEOUT"
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        RuntimeError("the JSON rate limit timed out"),
+        dspy_errors.LMError("generic"),
+        dspy_errors.LMCollectionLimitError("over budget"),
+    ],
+    ids=["foreign", "lm_error", "collection_limit"],
+)
+def test_unknown_errors_are_not_retryable(error):
+    mapped = _map_model_error(error)
+
+    # The message mentions "JSON", "rate limit" and "timed out"; none of them may steer the code.
+    assert (mapped.code, mapped.status_code, mapped.retryable) == ("INTERNAL_ERROR", 502, False)
+    assert mapped.payload()["retryable"] is False
+
+
+def test_unhandled_server_errors_are_not_retryable():
+    assert ServiceError("INTERNAL_ERROR", "Unhandled server error", 500).retryable is False
+    assert ServiceError("MODEL_TIMEOUT", "slow", 504).retryable is True
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        (dspy_errors.LMRateLimitError("busy", retry_after=2.5), 2500),
+        (dspy_errors.LMRateLimitError("busy", retry_after=-1), None),
+        (_litellm_error(litellm.RateLimitError, 429, headers={"retry-after-ms": "750"}), 750),
+        (_litellm_error(litellm.RateLimitError, response=_response(429, {"retry-after": "3"})), 3000),
+        (_litellm_error(litellm.RateLimitError, response=_response(429, {"Retry-After": "0"})), 0),
+        (_litellm_error(litellm.RateLimitError, response=_response(429, {"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"})), None),
+        (_litellm_error(litellm.RateLimitError, 429), None),
+        (RuntimeError("no hints"), None),
+    ],
+    ids=["attribute", "negative", "ms-header", "seconds-header", "zero", "http-date", "no-header", "foreign"],
+)
+def test_retry_after_hints(error, expected):
+    assert _retry_after_ms(error) == expected
+
+
+def test_model_call_records_stage_and_attempt():
+    with pytest.raises(ServiceError) as raised:
+        with _model_call("draft", attempt=2):
+            raise dspy_errors.LMRateLimitError("busy", retry_after=1)
+
+    assert raised.value.payload() == {
+        "error": "MODEL_RATE_LIMIT",
+        "message": "busy",
+        "retryable": True,
+        "retryAfterMs": 1000,
+        "stage": "draft",
+        "attempt": 2,
+    }
+
+
+def test_model_call_passes_service_errors_through():
+    original = ServiceError("INVALID_REQUEST", "bad", 400)
+
+    with pytest.raises(ServiceError) as raised:
+        with _model_call("verify"):
+            raise original
+
+    assert raised.value is original
+    assert raised.value.stage is None
+
+
+def test_routes_return_the_hints_and_a_retry_after_header():
+    settings = get_settings()
+    manager = ProgramManager(settings)
+    use_lms(manager, verify=RaisingLM(settings.verify_model, dspy_errors.LMRateLimitError("busy", retry_after=1.2)))
+    service_app.app.dependency_overrides[service_app.get_program_manager] = lambda: manager
+    payload = {"orgId": "o", "reviewId": "r", "mode": "VERIFY_EXISTING_DRAFT", "evidence": EVIDENCE, "candidateDraftText": "Thanks!"}
+    try:
+        with TestClient(service_app.app) as client:
+            client.headers["authorization"] = f"Bearer {settings.service_token}"
+            response = client.post("/api/review/process", json=payload)
+    finally:
+        service_app.app.dependency_overrides.clear()
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    body = response.json()
+    assert (body["error"], body["retryable"], body["retryAfterMs"], body["stage"]) == ("MODEL_RATE_LIMIT", True, 1200, "verify")
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import prefork
+from prefork import Arbiter, worker_count
+
+ROOT = Path(__file__).resolve().parents[1]
+READY = re.compile(r"worker (\d+) \(pid (\d+)\) ready")
+
+
+class FakeProcesses:
+    """Stands in for fork, waitpid and kill, so the arbiter's bookkeeping runs without forking."""
+
+    def __init__(self, monkeypatch) -> None:
+        self.next_pid = 100
+        self.exits: list[tuple[int, int]] = []
+        self.signals: list[tuple[int, int]] = []
+        self.sleeps: list[float] = []
+        fake_os = SimpleNamespace(
+            fork=self.fork,
+            waitpid=self.waitpid,
+            kill=lambda pid, signum: self.signals.append((pid, signum)),
+            getpid=os.getpid,
+            waitstatus_to_exitcode=os.waitstatus_to_exitcode,
+            WNOHANG=os.WNOHANG,
+        )
+        monkeypatch.setattr(prefork, "os", fake_os)
+        monkeypatch.setattr(prefork, "time", SimpleNamespace(monotonic=time.monotonic, sleep=self.sleeps.append))
+
+    def fork(self) -> int:
+        self.next_pid += 1
+        return self.next_pid
+
+    def waitpid(self, pid: int, options: int) -> tuple[int, int]:
+        return self.exits.pop(0) if self.exits else (0, 0)
+
+    def exit(self, pid: int, code: int = 0, signum: int | None = None) -> None:
+        self.exits.append((pid, signum if signum is not None else code << 8))
+
+
+@pytest.fixture
+def processes(monkeypatch):
+    return FakeProcesses(monkeypatch)
+
+
+def _arbiter(workers: int = 2) -> Arbiter:
+    arbiter = Arbiter(app=None, sock=None, workers=workers, max_requests=0, graceful_timeout=1, preload_ms=1.0)
+    for index in range(workers):
+        arbiter._spawn(index)
+    return arbiter
+
+
+def _indexes(arbiter: Arbiter) -> dict[int, int]:
+    return {pid: index for pid, (index, _) in arbiter._children.items()}
+
+
+def test_spawn_tracks_each_worker_by_index(processes):
+    arbiter = _arbiter(3)
+
+    assert _indexes(arbiter) == {101: 0, 102: 1, 103: 2}
+
+
+def test_a_worker_that_exits_is_replaced_in_its_slot(processes):
+    arbiter = _arbiter()
+    arbiter._children[101] = (0, time.monotonic() - 60)
+    processes.exit(101, code=0)
+
+    arbiter._reap()
+
+    assert _indexes(arbiter) == {102: 1, 103: 0}
+    assert processes.sleeps == []
+
+
+def test_a_worker_that_crashes_right_away_is_restarted_after_a_pause(processes):
+    arbiter = _arbiter()
+    processes.exit(102, code=1)
+
+    arbiter._reap()
+
+    assert _indexes(arbiter) == {101: 0, 103: 1}
+    assert processes.sleeps == [prefork.MIN_WORKER_LIFETIME_SECONDS]
+
+
+def test_sighup_recycles_workers_one_at_a_time(processes):
+    arbiter = _arbiter()
+
+    arbiter._handle_recycle(signal.SIGHUP, None)
+    # A second SIGHUP during a recycle does not restart it.
+    arbiter._handle_recycle(signal.SIGHUP, None)
+    assert processes.signals == [(101, signal.SIGTERM)]
+
+    processes.exit(101, signum=signal.SIGTERM)
+    arbiter._reap()
+    assert _indexes(arbiter) == {102: 1, 103: 0}
+    assert processes.signals == [(101, signal.SIGTERM), (102, signal.SIGTERM)]
+
+    processes.exit(102, signum=signal.SIGTERM)
+    arbiter._reap()
+    assert _indexes(arbiter) == {103: 0, 104: 1}
+    assert arbiter._recycle == []
+    # Recycled workers exit by signal quickly; that is not a crash loop.
+    assert processes.sleeps == []
+
+
+def test_a_queued_worker_that_exits_does_not_resignal_the_draining_one(processes):
+    arbiter = _arbiter()
+    arbiter._handle_recycle(signal.SIGHUP, None)
+    processes.exit(102, code=0)
+
+    arbiter._reap()
+
+    assert _indexes(arbiter) == {101: 0, 103: 1}
+    assert processes.signals == [(101, signal.SIGTERM)]
+
+    processes.exit(101, signum=signal.SIGTERM)
+    arbiter._reap()
+
+    # Worker 1 was already replaced by a fresh fork, so the recycle ends with worker 0.
+    assert _indexes(arbiter) == {103: 1, 104: 0}
+    assert processes.signals == [(101, signal.SIGTERM)]
+    assert arbiter._recycle == []
+
+
+def test_stopping_reaps_without_respawning(processes):
+    arbiter = _arbiter()
+    arbiter._handle_stop(signal.SIGTERM, None)
+    processes.exit(101, signum=signal.SIGTERM)
+    processes.exit(102, signum=signal.SIGTERM)
+
+    arbiter._shutdown()
+
+    assert arbiter._children == {}
+    assert sorted(processes.signals) == [(101, signal.SIGTERM), (102, signal.SIGTERM)]
+
+
+def test_worker_count_defaults_to_the_usable_cores():
+    assert worker_count(3) == 3
+    assert worker_count(0) == len(os.sched_getaffinity(0))
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _healthz(port: int) -> dict:
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/api/healthz", headers={"authorization": f"Bearer {os.environ['DSPY_SERVICE_TOKEN']}"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def _ready_workers(log: Path, count: int, exclude: dict[int, int] | None = None, timeout: float = 60.0) -> dict[int, int]:
+    """Workers the master has logged as ready, other than `exclude`, once there are `count` of them."""
+    deadline = time.monotonic() + timeout
+    while True:
+        text = log.read_text(encoding="utf-8")
+        ready = {int(pid): int(index) for index, pid in READY.findall(text) if int(pid) not in (exclude or {})}
+        if len(ready) >= count:
+            return ready
+        if time.monotonic() > deadline:
+            pytest.fail(f"{count} workers were not ready in {timeout}s; the master logged:\n{text}")
+        time.sleep(0.1)
+
+
+def test_forked_workers_serve_and_are_replaced_on_sighup(tmp_path):
+    port = _free_port()
+    log = tmp_path / "master.log"
+    env = {**os.environ, "DSPY_SERVER_WORKERS": "2", "DSPY_SERVER_GRACEFUL_TIMEOUT_SECONDS": "2"}
+    first: dict[int, int] = {}
+    second: dict[int, int] = {}
+    with log.open("w", encoding="utf-8") as stderr:
+        master = subprocess.Popen(
+            [sys.executable, "prefork.py", "--host", "127.0.0.1", "--port", str(port)],
+            cwd=ROOT,
+            env=env,
+            stderr=stderr,
+        )
+    try:
+        first = _ready_workers(log, 2)
+        assert sorted(first.values()) == [0, 1]
+        health = _healthz(port)["prefork"]
+        assert health["enabled"] and health["pid"] in first and health["startupMs"] is not None
+
+        master.send_signal(signal.SIGHUP)
+        second = _ready_workers(log, 2, exclude=first)
+
+        assert sorted(second.values()) == [0, 1]
+        for pid in first:
+            with pytest.raises(ProcessLookupError):
+                os.kill(pid, 0)
+        assert _healthz(port)["prefork"]["pid"] in second
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+            # A killed master leaves its workers running; they would hold the port.
+            for pid in {**first, **second}:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import sys
+
+import prepare_dataset
+from fakes import EVIDENCE
+
+
+def _write(path, lines):
+    path.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+
+
+def _row(index: int, reply: str | None = None) -> str:
+    evidence = {**EVIDENCE, "comment": f"Visit {index}", "starRating": 1 + index % 5}
+    return json.dumps({"evidence": evidence, "reply": reply or f"Thanks for visit {index}!"})
+
+
+def _prepare(monkeypatch, output_dir, *inputs, task="draft", extra=()):
+    argv = ["prepare_dataset.py", "--task", task, "--input", *map(str, inputs), "--output-dir", str(output_dir), *extra]
+    monkeypatch.setattr(sys, "argv", argv)
+    prepare_dataset.main()
+    return json.loads((output_dir / "stats.json").read_text(encoding="utf-8"))
+
+
+def _shard_rows(output_dir) -> dict[str, set[str]]:
+    return {
+        path.name: set(path.read_text(encoding="utf-8").splitlines())
+        for path in sorted(output_dir.glob("*-of-*.jsonl"))
+    }
+
+
+def test_invalid_rows_are_rejected_with_a_reason(monkeypatch, tmp_path):
+    source = tmp_path / "corpus.jsonl"
+    _write(source, [
+        _row(0),
+        "{not json",
+        "[1, 2]",
+        json.dumps({"evidence": {"starRating": "five"}, "reply": "Thanks!"}),
+        json.dumps({"evidence": EVIDENCE, "reply": "   "}),
+    ])
+
+    stats = _prepare(monkeypatch, tmp_path / "out", source)
+
+    assert stats["rowsRead"] == 5
+    assert stats["written"] == 1
+    assert stats["rejected"] == {"invalid_evidence": 1, "invalid_json": 1, "missing_reply": 1, "not_an_object": 1}
+    rejects = [json.loads(line) for line in (tmp_path / "out" / "rejects.jsonl").read_text().splitlines()]
+    assert [(reject["line"], reject["reason"]) for reject in rejects] == [
+        (2, "invalid_json"),
+        (3, "not_an_object"),
+        (4, "invalid_evidence"),
+        (5, "missing_reply"),
+    ]
+
+
+def test_near_duplicate_replies_keep_only_the_first(monkeypatch, tmp_path):
+    source = tmp_path / "corpus.jsonl"
+    _write(source, [
+        _row(0, "Thanks for visiting, see you soon!"),
+        _row(0, "thanks for visiting -- see you  SOON"),
+        _row(0, "Thanks for visiting, see you next week!"),
+    ])
+
+    stats = _prepare(monkeypatch, tmp_path / "out", source)
+
+    assert stats["duplicates"] == 1
+    assert stats["written"] == 2
+    replies = {json.loads(line)["reply"] for rows in _shard_rows(tmp_path / "out").values() for line in rows}
+    assert replies == {"Thanks for visiting, see you soon!", "Thanks for visiting, see you next week!"}
+
+
+def test_verify_rows_with_different_labels_are_not_duplicates(monkeypatch, tmp_path):
+    source = tmp_path / "corpus.jsonl"
+    row = {"evidence": EVIDENCE, "draftText": "Thanks!", "violations": []}
+    _write(source, [json.dumps({**row, "pass": True}), json.dumps({**row, "pass": False}), json.dumps(row)])
+
+    stats = _prepare(monkeypatch, tmp_path / "out", source, task="verify")
+
+    assert stats["written"] == 2
+    assert stats["rejected"] == {"missing_pass": 1}
+
+
+def test_shards_do_not_depend_on_input_order_or_file_split(monkeypatch, tmp_path):
+    lines = [_row(index) for index in range(60)]
+    forward = tmp_path / "forward.jsonl"
+    _write(forward, lines)
+    first_half, second_half = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    _write(first_half, lines[30:][::-1])
+    _write(second_half, lines[:30][::-1])
+    # A tiny batch size exercises the periodic commits of the on-disk dedupe set.
+    monkeypatch.setattr(prepare_dataset, "DEDUPE_BATCH_SIZE", 7)
+    options = ("--eval-fraction", "0.25", "--train-shards", "3", "--eval-shards", "2")
+
+    stats = _prepare(monkeypatch, tmp_path / "one", forward, extra=options)
+    _prepare(monkeypatch, tmp_path / "two", first_half, second_half, extra=options)
+
+    assert _shard_rows(tmp_path / "one") == _shard_rows(tmp_path / "two")
+    assert len(_shard_rows(tmp_path / "one")) == 5
+    assert stats["written"] == 60
+    assert 0 < stats["splits"]["eval"]["rows"] < 30
+    assert not (tmp_path / "one" / ".dedupe.sqlite3").exists()
+
+
+def test_changing_the_salt_reshuffles_the_split():
+    keys = [f"{index:064x}" for index in range(200)]
+
+    v1 = {key for key in keys if prepare_dataset.assign(key, "v1", 0.2, 1, 1)[0] == "eval"}
+    v2 = {key for key in keys if prepare_dataset.assign(key, "v2", 0.2, 1, 1)[0] == "eval"}
+
+    assert v1 and v2 and v1 != v2
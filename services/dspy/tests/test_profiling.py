@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service_app
+from fake_lm import FakeLMProfile, fake_lm_factory
+from fakes import EVIDENCE
+from profiling import RequestProfiler
+from programs import ProgramManager, ServiceError
+from settings import get_settings
+
+PAYLOAD = {"orgId": "o", "reviewId": "r", "mode": "AUTO", "evidence": EVIDENCE}
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return RequestProfiler(tmp_path / "profiles", sample_rate=0.0, allow_header=True, max_files=2)
+
+
+@pytest.fixture
+def client(profiler):
+    settings = get_settings()
+    profile = FakeLMProfile(latency_ms=0.0, latency_sigma=0.0)
+    manager = ProgramManager(settings, lm_factory=fake_lm_factory(profile, seed=1))
+    service_app.app.dependency_overrides[service_app.get_program_manager] = lambda: manager
+    service_app.app.dependency_overrides[service_app.get_request_profiler] = lambda: profiler
+    service_app.app.dependency_overrides[service_app.get_result_store] = lambda: None
+    try:
+        with TestClient(service_app.app) as test_client:
+            test_client.headers["authorization"] = f"Bearer {settings.service_token}"
+            yield test_client
+    finally:
+        service_app.app.dependency_overrides.clear()
+
+
+def test_header_profiles_a_request_and_the_summary_reports_it(client, profiler):
+    unprofiled = client.post("/api/review/process", json=PAYLOAD)
+    profiled = client.post("/api/review/process", json=PAYLOAD, headers={"x-dspy-profile": "1"})
+
+    assert unprofiled.status_code == profiled.status_code == 200
+    trace_id = profiled.json()["trace"]["draftTraceId"]
+    files = [path.name for path in profiler.directory.glob("*.prof")]
+    assert len(files) == 1 and files[0].endswith(f"-{trace_id}.prof")
+
+    summary = client.get("/api/profiles/summary", params={"limit": 5}).json()
+    assert (summary["enabled"], summary["profiled"], summary["skipped"], summary["samples"]) == (True, 1, 0, 1)
+    assert summary["recent"][0]["traceId"] == trace_id
+    assert summary["recent"][0]["mode"] == "AUTO"
+    assert summary["recent"][0]["file"] == files[0]
+    assert summary["waitMs"] == pytest.approx(max(summary["wallMs"] - summary["cpuMs"], 0.0), abs=0.2)
+    assert 0 < len(summary["hotFunctions"]) <= 5
+    assert all(function["samples"] == 1 for function in summary["hotFunctions"])
+
+
+def test_summary_needs_auth_and_reports_a_disabled_profiler(client):
+    service_app.app.dependency_overrides[service_app.get_request_profiler] = lambda: None
+
+    assert client.get("/api/profiles/summary").json() == {"enabled": False}
+    assert client.get("/api/profiles/summary", headers={"authorization": "Bearer wrong"}).status_code == 401
+
+
+def test_header_is_ignored_unless_allowed(tmp_path):
+    profiler = RequestProfiler(tmp_path, sample_rate=0.0, allow_header=False, max_files=2)
+
+    assert not profiler.should_profile(requested=True)
+
+
+def test_sample_rate_picks_requests(tmp_path):
+    profiler = RequestProfiler(tmp_path, sample_rate=0.5, allow_header=False, max_files=2, rng=random.Random(3))
+
+    picked = sum(profiler.should_profile() for _ in range(1000))
+
+    assert 400 < picked < 600
+
+
+def test_only_the_newest_files_are_kept(profiler):
+    for index in range(3):
+        profiler.run(lambda index=index: {"trace": {"verifyTraceId": f"trace-{index}"}}, mode="VERIFY_EXISTING_DRAFT")
+
+    assert sorted(path.name.split("-", 1)[1] for path in profiler.directory.glob("*.prof")) == [
+        "trace-1.prof",
+        "trace-2.prof",
+    ]
+    assert profiler.summary()["samples"] == 3
+
+
+def test_overlapping_requests_are_skipped_not_profiled(profiler):
+    def outer():
+        return {"inner": profiler.run(lambda: {"nested": True}, mode="AUTO")}
+
+    assert profiler.run(outer, mode="AUTO") == {"inner": {"nested": True}}
+    summary = profiler.summary()
+    assert (summary["profiled"], summary["skipped"]) == (1, 1)
+
+
+def test_failed_requests_are_profiled_with_their_error_code(profiler):
+    def fail():
+        raise ServiceError("MODEL_TIMEOUT", "slow", 504)
+
+    with pytest.raises(ServiceError):
+        profiler.run(fail, mode="AUTO")
+
+    assert profiler.summary()["recent"][0]["error"] == "MODEL_TIMEOUT"
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+import recompile_and_report
+
+
+@pytest.fixture
+def fake_stages(monkeypatch, tmp_path):
+    """Swap the compile/eval stages for fakes that log each call, so the DAG runs without an LM.
+
+    Pool workers are forked after the patch, and they append to a shared log file.
+    """
+    log = tmp_path / "stages.log"
+
+    def run_compile(*, task, dataset, output, **_):
+        output.write_text(json.dumps({"task": task, "train": dataset.read_text(encoding="utf-8")}), encoding="utf-8")
+        with log.open("a", encoding="utf-8") as handle:
+            handle.write(f"{task}.compile {os.getpid()}\n")
+        return {"examples": 1, "demoCache": {"hits": 0, "misses": 1}}
+
+    def run_evaluate(*, task, dataset, artifact):
+        with log.open("a", encoding="utf-8") as handle:
+            handle.write(f"{task}.eval {os.getpid()}\n")
+        return {"examples": 1, "score": len(dataset.read_text(encoding="utf-8"))}
+
+    monkeypatch.setattr(recompile_and_report, "run_compile", run_compile)
+    monkeypatch.setattr(recompile_and_report, "run_evaluate", run_evaluate)
+
+    def calls() -> list[tuple[str, int]]:
+        if not log.exists():
+            return []
+        entries = [line.split() for line in log.read_text(encoding="utf-8").splitlines()]
+        log.unlink()
+        return [(name, int(pid)) for name, pid in entries]
+
+    return calls
+
+
+def _datasets(tmp_path):
+    paths = {}
+    for name in ("draft-train", "draft-eval", "verify-train", "verify-eval"):
+        paths[name] = tmp_path / f"{name}.jsonl"
+        paths[name].write_text(f'{{"name": "{name}"}}\n', encoding="utf-8")
+    return paths
+
+
+def _main(monkeypatch, tmp_path, datasets, *extra):
+    argv = ["recompile_and_report.py"]
+    for name, path in datasets.items():
+        argv += [f"--{name}", str(path)]
+    argv += ["--artifacts-dir", str(tmp_path / "artifacts"), "--report", str(tmp_path / "report.json"), *extra]
+    monkeypatch.setattr(sys, "argv", argv)
+    recompile_and_report.main()
+    return json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+
+
+def test_pipelines_run_in_separate_worker_processes(monkeypatch, tmp_path, fake_stages):
+    # Neither compile can finish until both have started, so this only passes if they run concurrently.
+    both_compiling = multiprocessing.get_context("fork").Barrier(2)
+    run_compile = recompile_and_report.run_compile
+
+    def concurrent_compile(**kwargs):
+        both_compiling.wait(timeout=30)
+        return run_compile(**kwargs)
+
+    monkeypatch.setattr(recompile_and_report, "run_compile", concurrent_compile)
+    report = _main(monkeypatch, tmp_path, _datasets(tmp_path))
+
+    calls = fake_stages()
+    assert sorted(name for name, _ in calls) == ["draft.compile", "draft.eval", "verify.compile", "verify.eval"]
+    pids = {name.split(".")[0]: pid for name, pid in calls}
+    # Each task's compile and eval share a worker, and the two tasks run in separate workers.
+    assert dict(calls)["draft.eval"] == pids["draft"] and dict(calls)["verify.eval"] == pids["verify"]
+    assert pids["draft"] != pids["verify"]
+    assert os.getpid() not in pids.values()
+    assert set(report["stages"]) == {"draft.compile", "draft.eval", "verify.compile", "verify.eval"}
+    assert not any(stage["skipped"] for stage in report["stages"].values())
+    assert report["eval"]["draft"] == {"examples": 1, "score": len('{"name": "draft-eval"}\n')}
+
+
+def test_unchanged_stages_are_skipped_and_reuse_previous_metrics(monkeypatch, tmp_path, fake_stages):
+    datasets = _datasets(tmp_path)
+    first = _main(monkeypatch, tmp_path, datasets)
+    fake_stages()
+
+    second = _main(monkeypatch, tmp_path, datasets)
+
+    assert fake_stages() == []
+    assert all(stage["skipped"] for stage in second["stages"].values())
+    assert second["eval"] == first["eval"]
+
+
+def test_changed_eval_dataset_reruns_only_that_eval(monkeypatch, tmp_path, fake_stages):
+    datasets = _datasets(tmp_path)
+    _main(monkeypatch, tmp_path, datasets)
+    fake_stages()
+
+    datasets["verify-eval"].write_text('{"name": "verify-eval", "edited": true}\n', encoding="utf-8")
+    report = _main(monkeypatch, tmp_path, datasets)
+
+    assert [name for name, _ in fake_stages()] == ["verify.eval"]
+    assert not report["stages"]["verify.eval"]["skipped"]
+    assert report["stages"]["verify.compile"]["skipped"]
+
+
+def test_recompiled_artifact_forces_a_fresh_eval(monkeypatch, tmp_path, fake_stages):
+    datasets = _datasets(tmp_path)
+    _main(monkeypatch, tmp_path, datasets)
+    fake_stages()
+
+    datasets["draft-train"].write_text('{"name": "draft-train", "edited": true}\n', encoding="utf-8")
+    _main(monkeypatch, tmp_path, datasets)
+
+    assert sorted(name for name, _ in fake_stages()) == ["draft.compile", "draft.eval"]
+
+
+def test_force_reruns_every_stage(monkeypatch, tmp_path, fake_stages):
+    datasets = _datasets(tmp_path)
+    _main(monkeypatch, tmp_path, datasets)
+    fake_stages()
+
+    _main(monkeypatch, tmp_path, datasets, "--force")
+
+    assert len(fake_stages()) == 4
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+import app as service_app
+from fake_lm import FakeLMProfile, fake_lm_factory
+from fakes import EVIDENCE
+from jobs import JobRunner, MemoryJobStore
+from models import BatchVerifyResponse, ProcessReviewResponse, ReviewJobResponse
+from programs import ProgramManager
+from settings import get_settings
+
+# Non-ASCII text and an emoji check that both paths write the same raw UTF-8.
+UNICODE_EVIDENCE = {**EVIDENCE, "comment": "Crème brûlée was perfect 🍮", "highlights": [{"start": 0, "end": 5, "label": "dessert"}]}
+
+
+def _response_model_bytes(model, body: dict) -> bytes:
+    """What FastAPI writes for `response_model=model` when a route returns a plain dict."""
+    return JSONResponse(content=model.model_validate(body).model_dump(mode="json", by_alias=True)).body
+
+
+@pytest.fixture(params=[0.0, 1.0], ids=["passing", "failing"])
+def client(request):
+    settings = get_settings()
+    profile = FakeLMProfile(latency_ms=0.0, latency_sigma=0.0, verify_fail_rate=request.param)
+    manager = ProgramManager(settings, lm_factory=fake_lm_factory(profile, seed=1))
+    runner = JobRunner(
+        MemoryJobStore(ttl_seconds=60),
+        lambda job_request: service_app._run_process(job_request, manager, None, None)[0],
+        max_workers=1,
+        webhook_secret="",
+    )
+    service_app.app.dependency_overrides[service_app.get_program_manager] = lambda: manager
+    service_app.app.dependency_overrides[service_app.get_job_runner] = lambda: runner
+    try:
+        with TestClient(service_app.app) as test_client:
+            test_client.headers["authorization"] = f"Bearer {settings.service_token}"
+            yield test_client
+    finally:
+        service_app.app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [
+        {"mode": "AUTO"},
+        {"mode": "MANUAL_REGENERATE", "currentDraftText": "Thanks for coming in!"},
+        {"mode": "VERIFY_EXISTING_DRAFT", "candidateDraftText": "Merci, à bientôt! 🍕"},
+    ],
+    ids=lambda extra: extra["mode"],
+)
+def test_process_bytes_match_the_response_model(client, extra):
+    response = client.post("/api/review/process", json={"orgId": "o", "reviewId": "r", "evidence": UNICODE_EVIDENCE, **extra})
+
+    assert response.status_code == 200
+    assert response.content == _response_model_bytes(ProcessReviewResponse, response.json())
+
+
+def test_batch_verify_bytes_match_the_response_model(client):
+    items = [
+        {"reviewId": f"review-{index}", "evidence": UNICODE_EVIDENCE, "candidateDraftText": f"Thanks, guest {index}!"}
+        for index in range(2)
+    ]
+    response = client.post("/api/review/verify/batch", json={"orgId": "o", "items": items})
+
+    assert response.status_code == 200
+    assert response.content == _response_model_bytes(BatchVerifyResponse, response.json())
+
+
+def test_job_bytes_match_the_response_model(client):
+    submitted = client.post("/api/review/jobs", json={"orgId": "o", "reviewId": "r", "mode": "AUTO", "evidence": UNICODE_EVIDENCE})
+    assert submitted.content == _response_model_bytes(ReviewJobResponse, submitted.json())
+
+    for _ in range(200):
+        finished = client.get(f"/api/review/jobs/{submitted.json()['jobId']}")
+        if finished.json()["status"] == "COMPLETED":
+            break
+        time.sleep(0.01)
+
+    assert finished.json()["status"] == "COMPLETED"
+    assert finished.content == _response_model_bytes(ReviewJobResponse, finished.json())
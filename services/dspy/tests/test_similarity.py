@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import difflib
+from collections import Counter
+
+import pytest
+
+import similarity
+from compile_bootstrap_fewshot import parse_args
+
+EXPECTED = "Thanks so much for the kind words about our wood fired pizza, see you again soon!"
+NEAR_COPY = "Thanks so much for the kind words about our wood fired pizza, see you soon!"
+UNRELATED = "We are sorry the delivery was late and cold; please contact the store manager."
+
+
+def _multiset_jaccard(left: str, right: str) -> float:
+    def grams(text: str) -> Counter[str]:
+        text = similarity.normalize_text(text)
+        return Counter(text[index:index + similarity.SHINGLE_SIZE] for index in range(len(text) - 2))
+
+    a, b = grams(left), grams(right)
+    return sum((a & b).values()) / sum((a | b).values())
+
+
+def test_sequence_stays_the_default_backend():
+    args = parse_args(["--task", "draft", "--dataset", "train.jsonl", "--output", "out.json"])
+
+    assert args.similarity == "sequence"
+    assert args.similarity_threshold == similarity.DEFAULT_THRESHOLDS["sequence"] == 0.75
+
+
+def test_opting_into_a_backend_picks_its_calibrated_threshold():
+    args = parse_args(["--task", "draft", "--dataset", "t.jsonl", "--output", "o.json", "--similarity", "ngram"])
+
+    assert args.similarity_threshold == similarity.DEFAULT_THRESHOLDS["ngram"]
+
+
+def test_sequence_backend_is_the_difflib_ratio():
+    expected = difflib.SequenceMatcher(a=EXPECTED.lower(), b=NEAR_COPY.lower()).ratio()
+
+    assert similarity.sequence_similarity(EXPECTED, NEAR_COPY) == expected
+
+
+@pytest.mark.parametrize("actual", [NEAR_COPY, UNRELATED, "pizza pizza pizza pizza"])
+def test_ngram_backend_is_exact_multiset_jaccard(actual):
+    assert similarity.ngram_similarity(EXPECTED, actual) == pytest.approx(_multiset_jaccard(EXPECTED, actual))
+
+
+def test_minhash_backend_estimates_the_ngram_score():
+    pytest.importorskip("numpy")
+
+    for actual in (NEAR_COPY, UNRELATED):
+        assert similarity.minhash_similarity(EXPECTED, actual) == pytest.approx(
+            similarity.ngram_similarity(EXPECTED, actual), abs=0.15
+        )
+
+
+@pytest.mark.parametrize("backend", sorted(similarity.BACKENDS))
+def test_every_backend_separates_a_near_copy_from_an_unrelated_reply(backend):
+    if backend == "minhash":
+        pytest.importorskip("numpy")
+    score = similarity.BACKENDS[backend]
+    threshold = similarity.DEFAULT_THRESHOLDS[backend]
+
+    assert score(EXPECTED, EXPECTED) == 1.0
+    assert score(EXPECTED, NEAR_COPY) >= threshold
+    assert score(EXPECTED, UNRELATED) < threshold
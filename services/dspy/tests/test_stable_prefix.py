@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import json
+import os
+
+import dspy
+
+from fakes import EVIDENCE
+from programs import BASE_POLICY_RULES, VerifyProgram, _create_json_adapter, _single_predictor
+
+POLICY_JSON = json.dumps({"rules": BASE_POLICY_RULES}, separators=(",", ":"))
+DEMOS = [
+    dspy.Example(
+        evidence_json=json.dumps({**EVIDENCE, "reviewText": "Loved the crust."}),
+        draft_text="Thanks, we are glad you loved the crust!",
+        policy_json=POLICY_JSON,
+        passed=True,
+        violations=[],
+        suggested_rewrite="",
+    ).with_inputs("evidence_json", "draft_text", "policy_json"),
+]
+
+
+def _render(evidence: dict, draft_text: str) -> list[dict]:
+    signature = _single_predictor(VerifyProgram()).signature
+    adapter = _create_json_adapter(stable_prefix=True)
+    inputs = {"evidence_json": json.dumps(evidence), "draft_text": draft_text, "policy_json": POLICY_JSON}
+    return adapter.format(signature, DEMOS, inputs)
+
+
+def test_two_reviews_share_a_byte_identical_prompt_prefix():
+    first = _render(EVIDENCE, "Thanks for the kind words!")
+    second = _render({**EVIDENCE, "reviewText": "Cold fries, slow service."}, "Sorry about the wait.")
+
+    assert len(first) == len(second)
+    # The system message and every demo turn are the same bytes for both reviews...
+    assert first[0]["role"] == "system"
+    assert first[:-1] == second[:-1]
+    # ...and the final user turn opens with the shared policy before the per-review inputs.
+    assert first[-1] != second[-1]
+    prefix = os.path.commonprefix([first[-1]["content"], second[-1]["content"]])
+    assert POLICY_JSON in prefix
+    content = first[-1]["content"]
+    assert content.index("[[ ## policy_json ## ]]") < content.index("[[ ## evidence_json ## ]]")
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from fakes import EVIDENCE, ScriptedLM, use_lms, verdict, warm_litellm
+from programs import ProgramManager, _JsonStringStream
+from settings import get_settings
+
+REPLY = 'We loved your "pizza" note.\nSee you soon! \\o/ café 🍕'
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 1000])
+def test_json_string_stream_decodes_any_fragmentation(size):
+    raw = " " + json.dumps(REPLY) + "}"
+    decoder = _JsonStringStream()
+
+    decoded = "".join(decoder.feed(raw[start:start + size]) for start in range(0, len(raw), size))
+
+    assert decoded == REPLY
+
+
+def test_json_string_stream_ignores_fragments_after_closing_quote():
+    decoder = _JsonStringStream()
+
+    assert decoder.feed('"done", "next": "') == "done"
+    assert decoder.feed("ignored") == ""
+
+
+def test_stream_tokens_concatenate_to_draft_text():
+    warm_litellm()
+    manager = ProgramManager(get_settings())
+    use_lms(
+        manager,
+        draft=ScriptedLM("openai/gpt-4o-mini", [{"reasoning": "r", "reply": REPLY}]),
+        verify=ScriptedLM("openai/gpt-4.1-mini", [verdict()]),
+    )
+
+    async def collect() -> tuple[list[str], dict]:
+        tokens: list[str] = []
+        result: dict = {}
+        async for event, payload in manager.stream_process_review("AUTO", json.dumps(EVIDENCE)):
+            if event == "token":
+                tokens.append(payload["text"])
+            elif event == "result":
+                result = payload
+        return tokens, result
+
+    tokens, result = asyncio.run(collect())
+
+    assert len(tokens) > 1
+    assert result["draftText"] == REPLY
+    assert "".join(tokens) == result["draftText"]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+
+import pytest
+
+from fake_lm import FakeLMProfile, fake_lm_factory
+from fakes import EVIDENCE
+from programs import ProgramManager
+from settings import get_settings
+from token_budget import MIN_BUDGET_TOKENS, TokenBudgetPolicy, create_token_budget_policy, draft_bucket
+
+LONG_REPLY = "Thanks! " * 125
+
+
+def _policy(**options) -> TokenBudgetPolicy:
+    return TokenBudgetPolicy(**{"adaptive": True, "draft_ceiling": 384, "verify_ceiling": 768, **options})
+
+
+def test_token_budget_defaults_to_fixed(monkeypatch):
+    monkeypatch.delenv("DSPY_TOKEN_BUDGET", raising=False)
+    get_settings.cache_clear()
+    try:
+        settings = get_settings()
+    finally:
+        get_settings.cache_clear()
+
+    policy = create_token_budget_policy(settings)
+    assert settings.token_budget == "fixed"
+    assert policy.draft(EVIDENCE, "AUTO").tokens == settings.draft_max_tokens
+    assert policy.verify("Thanks!").tokens == settings.verify_max_tokens
+
+
+@pytest.mark.parametrize(
+    ("rating", "comment", "mode", "bucket", "tokens"),
+    [
+        (5, "", "AUTO", "auto:empty:high", 160),
+        (3, "x" * 150, "AUTO", "auto:short:mid", 256),
+        (1, "x" * 1000, "AUTO", "auto:long:low", 384),
+        (5, "x" * 400, "MANUAL_REGENERATE", "regen:medium:high", 320),
+    ],
+)
+def test_adaptive_draft_budgets_by_bucket(rating, comment, mode, bucket, tokens):
+    evidence = {"starRating": rating, "comment": comment}
+
+    budget = _policy().draft(evidence, mode)
+
+    assert draft_bucket(evidence, mode) == budget.bucket == bucket
+    assert (budget.tokens, budget.ceiling) == (tokens, 384)
+
+
+def test_fitted_budgets_are_rounded_floored_and_capped():
+    policy = _policy(fitted={"draft": {"auto:empty:high": 10, "auto:short:high": 201}, "verify": {"empty": 5000}})
+
+    assert policy.draft({"starRating": 5}, "AUTO").tokens == MIN_BUDGET_TOKENS
+    assert policy.draft({"starRating": 5, "comment": "ok"}, "AUTO").tokens == 208
+    assert policy.verify("").tokens == 768
+
+
+def test_fitted_table_is_loaded_from_the_budget_path(tmp_path):
+    path = tmp_path / "token_budget.json"
+    path.write_text(json.dumps({"fittedAtUtc": "2026-01-01", "draft": {"auto:empty:high": 128}}), encoding="utf-8")
+    settings = dataclasses.replace(get_settings(), token_budget="adaptive", token_budget_path=str(path))
+
+    policy = create_token_budget_policy(settings)
+
+    assert policy.source == "token_budget.json:2026-01-01"
+    assert policy.draft({"starRating": 5}, "AUTO").tokens == 128
+
+
+def _manager(token_budget: str) -> ProgramManager:
+    settings = dataclasses.replace(get_settings(), token_budget=token_budget, token_budget_path="")
+    return ProgramManager(settings, lm_factory=fake_lm_factory(FakeLMProfile(latency_ms=0.0, draft_reply=LONG_REPLY)))
+
+
+def test_truncated_draft_is_retried_once_at_the_ceiling():
+    manager = _manager("adaptive")
+
+    result = manager.process_review("AUTO", json.dumps(EVIDENCE))
+
+    draft = manager.token_budget.metadata()["stages"]["draft"]
+    assert result["draftText"] == LONG_REPLY.strip()
+    assert (draft["calls"], draft["truncated"], draft["retries"], draft["truncatedAtCeiling"]) == (1, 1, 1, 0)
+    assert draft["buckets"]["auto:short:high"] == {"calls": 1, "truncated": 1, "budget": 224}
+
+
+def test_truncation_at_the_ceiling_is_not_retried():
+    manager = _manager("fixed")
+    manager.token_budget.draft_ceiling = 128
+
+    manager.process_review("AUTO", json.dumps(EVIDENCE))
+
+    draft = manager.token_budget.metadata()["stages"]["draft"]
+    assert (draft["calls"], draft["truncated"], draft["retries"]) == (1, 1, 0)
+    assert draft["buckets"]["auto:short:high"]["budget"] == 128
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service_app
+import tracing
+from fake_lm import FakeLMProfile, fake_lm_factory
+from fakes import EVIDENCE
+from programs import ProgramManager
+from settings import get_settings
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class CollectingTracer:
+    def __init__(self) -> None:
+        self.spans: list[tracing.Span] = []
+
+    def submit(self, span: tracing.Span) -> None:
+        self.spans.append(span)
+
+    def named(self, name: str) -> list[tracing.Span]:
+        return [span for span in self.spans if span.name == name]
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    collector = CollectingTracer()
+    monkeypatch.setattr(tracing, "_tracer", collector)
+    return collector
+
+
+@pytest.fixture
+def collector_server():
+    received: list[tuple[str, str, bytes]] = []
+    statuses = [200]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # noqa: N802
+            body = self.rfile.read(int(self.headers["content-length"]))
+            received.append((self.path, self.headers["content-type"], body))
+            self.send_response(statuses[0])
+            self.send_header("location", "/elsewhere")
+            self.send_header("content-length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/", received, statuses
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_children_share_the_trace_and_point_at_their_parent(tracer):
+    with tracing.span("review.process", **{"review.mode": "AUTO"}) as parent:
+        with tracing.span("review.draft") as child:
+            tracing.annotate(**{"review.draft_attempt": 1})
+    with tracing.span("review.process") as second_root:
+        pass
+
+    assert (len(parent.trace_id), len(parent.span_id)) == (32, 16)
+    assert (parent.parent_span_id, parent.kind) == (None, tracing.SPAN_KIND_SERVER)
+    assert (child.trace_id, child.parent_span_id, child.kind) == (parent.trace_id, parent.span_id, tracing.SPAN_KIND_INTERNAL)
+    assert child.attributes == {"review.draft_attempt": 1}
+    assert second_root.trace_id != parent.trace_id and second_root.parent_span_id is None
+    # Children finish first, so they are submitted first.
+    assert [span.name for span in tracer.spans] == ["review.draft", "review.process", "review.process"]
+
+
+def test_failed_spans_record_the_error_and_reraise(tracer):
+    with pytest.raises(RuntimeError):
+        with tracing.span("review.verify"):
+            raise RuntimeError("boom")
+
+    failed = tracer.spans[0]
+    assert (failed.status_code, failed.status_message, failed.attributes["error.type"]) == (tracing.STATUS_ERROR, "boom", "RuntimeError")
+    assert failed.events[0]["name"] == "exception"
+
+
+def test_an_inbound_traceparent_parents_the_root_span(tracer):
+    with tracing.continue_trace(f"00-{TRACE_ID.upper()}-{PARENT_ID}-01 "):
+        with tracing.span("review.process") as root:
+            with tracing.span("review.draft") as child:
+                pass
+    with tracing.span("review.process") as after:
+        pass
+
+    assert (root.trace_id, root.parent_span_id, root.kind) == (TRACE_ID, PARENT_ID, tracing.SPAN_KIND_SERVER)
+    assert (child.trace_id, child.parent_span_id) == (TRACE_ID, root.span_id)
+    assert after.trace_id != TRACE_ID and after.parent_span_id is None
+
+
+@pytest.mark.parametrize(
+    "traceparent",
+    [None, "", f"01-{TRACE_ID}-{PARENT_ID}-01", f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01", f"00-{TRACE_ID}-{PARENT_ID}"],
+    ids=["missing", "empty", "version", "short-trace-id", "no-flags"],
+)
+def test_malformed_traceparents_start_a_new_trace(tracer, traceparent):
+    with tracing.continue_trace(traceparent):
+        with tracing.span("review.process") as root:
+            pass
+
+    assert root.trace_id != TRACE_ID and root.parent_span_id is None
+
+
+def test_spans_are_not_recorded_without_a_tracer():
+    with tracing.continue_trace(f"00-{TRACE_ID}-{PARENT_ID}-01"):
+        with tracing.span("review.process") as root:
+            tracing.annotate(ignored=True)
+
+    assert root is None
+    assert tracing.lm_callbacks() == []
+
+
+def test_the_route_propagates_the_traceparent_to_every_span(tracer):
+    settings = get_settings()
+    profile = FakeLMProfile(latency_ms=0.0, latency_sigma=0.0)
+    manager = ProgramManager(settings, lm_factory=fake_lm_factory(profile, seed=1))
+    service_app.app.dependency_overrides[service_app.get_program_manager] = lambda: manager
+    service_app.app.dependency_overrides[service_app.get_result_store] = lambda: None
+    try:
+        with TestClient(service_app.app) as client:
+            response = client.post(
+                "/api/review/process",
+                json={"orgId": "o", "reviewId": "r", "mode": "AUTO", "evidence": EVIDENCE},
+                headers={"authorization": f"Bearer {settings.service_token}", "traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"},
+            )
+    finally:
+        service_app.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    (root,) = tracer.named("review.process")
+    assert (root.parent_span_id, root.attributes["review.mode"]) == (PARENT_ID, "AUTO")
+    assert {span.trace_id for span in tracer.spans} == {TRACE_ID}
+    by_id = {span.span_id: span for span in tracer.spans}
+    for span in tracer.spans:
+        if span is not root:
+            assert span.parent_span_id in by_id
+    assert {span.name for span in tracer.spans} >= {"review.draft", "review.verify", "lm.call"}
+    assert all(by_id[span.parent_span_id].name in {"review.draft", "review.verify", "review.rewrite"} for span in tracer.named("lm.call"))
+
+
+def test_provider_retries_are_counted_on_the_lm_span(tracer):
+    callback = tracing.LMSpanCallback()
+    logger = tracing._ProviderAttemptLogger()
+
+    with tracing.span("review.verify"):
+        callback.on_lm_start("call-1", instance=type("LM", (), {"model": "openai/gpt-4.1-mini"})(), inputs={})
+        for _ in range(3):
+            logger.log_pre_api_call("gpt-4.1-mini", [], {})
+        callback.on_lm_end("call-1", outputs=["ok"])
+        # Attempts outside an `lm.call` span are not counted anywhere.
+        logger.log_pre_api_call("gpt-4.1-mini", [], {})
+
+    lm_span, verify_span = tracer.spans
+    assert lm_span.attributes == {"gen_ai.request.model": "openai/gpt-4.1-mini", "lm.attempts": 3, "lm.retries": 2}
+    assert [event["attributes"] for event in lm_span.events] == [{"lm.attempt": 2}, {"lm.attempt": 3}]
+    assert "lm.attempts" not in verify_span.attributes
+
+
+def test_a_first_attempt_is_not_a_retry(tracer):
+    callback = tracing.LMSpanCallback()
+
+    callback.on_lm_start("call-1", instance=None, inputs={})
+    tracing._ProviderAttemptLogger().log_pre_api_call("gpt-4.1-mini", [], {})
+    callback.on_lm_end("call-1", outputs=None, exception=TimeoutError("slow"))
+
+    (lm_span,) = tracer.spans
+    assert (lm_span.attributes["lm.attempts"], lm_span.attributes["lm.retries"], lm_span.events[0]["name"]) == (1, 0, "exception")
+
+
+def test_otlp_payload_shape():
+    root = tracing.Span(name="review.process", trace_id=TRACE_ID, span_id=PARENT_ID, parent_span_id=None, kind=tracing.SPAN_KIND_SERVER, start_ns=10, end_ns=20)
+    root.set(**{"review.mode": "AUTO", "lm.attempts": 2, "lm.cache_hit": False, "review.seo_score": 0.5, "skipped": None})
+    child = tracing.Span(name="review.draft", trace_id=TRACE_ID, span_id="1" * 16, parent_span_id=PARENT_ID, kind=tracing.SPAN_KIND_INTERNAL, start_ns=11)
+    child.record_error(TimeoutError("slow"))
+
+    payload = tracing.otlp_payload([root, child])
+
+    (resource_spans,) = payload["resourceSpans"]
+    assert resource_spans["resource"] == {"attributes": [{"key": "service.name", "value": {"stringValue": tracing.SERVICE_NAME}}]}
+    (scope_spans,) = resource_spans["scopeSpans"]
+    assert scope_spans["scope"] == {"name": "tracing"}
+    exported_root, exported_child = scope_spans["spans"]
+    assert exported_root == {
+        "traceId": TRACE_ID,
+        "spanId": PARENT_ID,
+        "name": "review.process",
+        "kind": tracing.SPAN_KIND_SERVER,
+        "startTimeUnixNano": "10",
+        "endTimeUnixNano": "20",
+        "attributes": [
+            {"key": "review.mode", "value": {"stringValue": "AUTO"}},
+            {"key": "lm.attempts", "value": {"intValue": "2"}},
+            {"key": "lm.cache_hit", "value": {"boolValue": False}},
+            {"key": "review.seo_score", "value": {"doubleValue": 0.5}},
+        ],
+        "events": [],
+        "status": {"code": tracing.STATUS_OK},
+    }
+    assert exported_child["parentSpanId"] == PARENT_ID
+    assert exported_child["endTimeUnixNano"] == "11"
+    assert exported_child["status"] == {"code": tracing.STATUS_ERROR, "message": "slow"}
+    assert exported_child["events"][0]["name"] == "exception"
+    assert isinstance(exported_child["events"][0]["timeUnixNano"], str)
+
+
+def test_otlp_exporter_posts_json_to_the_traces_path(collector_server):
+    endpoint, received, _ = collector_server
+
+    tracing.OtlpHttpSpanExporter(endpoint).export({"resourceSpans": []})
+
+    assert received == [("/v1/traces", "application/json", b'{"resourceSpans":[]}')]
+
+
+def test_otlp_exporter_does_not_follow_redirects(collector_server):
+    endpoint, received, statuses = collector_server
+    statuses[0] = 307
+
+    with pytest.raises(OSError, match="HTTP 307"):
+        tracing.OtlpHttpSpanExporter(endpoint).export({"resourceSpans": []})
+
+    assert [path for path, _, _ in received] == ["/v1/traces"]
+
+
+def test_otlp_exporter_gives_up_on_a_hung_collector():
+    listener = socket.create_server(("127.0.0.1", 0))
+    try:
+        exporter = tracing.OtlpHttpSpanExporter(f"http://127.0.0.1:{listener.getsockname()[1]}", timeout_seconds=0.3)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            exporter.export({"resourceSpans": []})
+        assert time.monotonic() - started < 2.0
+    finally:
+        listener.close()
+
+
+def test_a_full_queue_drops_spans_instead_of_blocking(monkeypatch):
+    monkeypatch.setattr(tracing, "EXPORT_BATCH_SIZE", 1)
+    exporting, release = threading.Event(), threading.Event()
+
+    class BlockingExporter:
+        def export(self, payload):
+            exporting.set()
+            release.wait(5)
+
+    tracer = tracing.Tracer(BlockingExporter(), exporter_name="test", max_spans=2)
+    spans = [tracing.Span(name="s", trace_id=TRACE_ID, span_id=PARENT_ID, parent_span_id=None, kind=tracing.SPAN_KIND_SERVER) for _ in range(5)]
+
+    tracer.submit(spans[0])
+    assert exporting.wait(5)
+    for span in spans[1:]:
+        tracer.submit(span)
+
+    assert tracer.metadata() == {"enabled": True, "exporter": "test", "queued": 2, "queueMax": 2, "exported": 0, "dropped": 2, "errors": 0}
+    release.set()
+    for _ in range(200):
+        if tracer.metadata()["exported"] == 3:
+            break
+        time.sleep(0.01)
+    assert tracer.metadata()["exported"] == 3
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import math
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
+
+import dspy
+
+from settings import Settings
+
+
+LENGTH_BUCKETS = (("empty", 0), ("short", 200), ("medium", 600), ("long", 1500))
+OVERFLOW_BUCKET = "very_long"
+TOKEN_STEP = 16
+
+# Defaults until a fitted table exists: low ratings get longer, apologetic replies, and
+# reasoning plus reply grow with how much the reviewer wrote.
+DRAFT_RATING_BASE = {"high": 160, "mid": 192, "low": 224}
+DRAFT_LENGTH_EXTRA = {"empty": 0, "short": 64, "medium": 128, "long": 192, OVERFLOW_BUCKET: 224}
+# Regeneration reasons about the previous draft before rewriting it.
+DRAFT_MODE_EXTRA = {"auto": 0, "regen": 32}
+# A failed verdict carries a suggested rewrite about as long as the draft (~4 chars per token).
+VERIFY_BASE_TOKENS = 160
+VERIFY_REWRITE_FACTOR = 1.25
+MIN_BUDGET_TOKENS = 96
+
+_finish_watch: contextvars.ContextVar[list[str] | None] = contextvars.ContextVar("dspy_finish_watch", default=None)
+
+
+@dataclass(frozen=True)
+class TokenBudget:
+    stage: str
+    bucket: str
+    tokens: int
+    ceiling: int
+
+    def at_ceiling(self) -> TokenBudget:
+        return replace(self, tokens=self.ceiling)
+
+
+class TokenBudgetPolicy:
+    """Per-call `max_tokens` for draft and verify, with finish-reason tracking.
+
+    Adaptive budgets come from a fitted table (`scripts/fit_token_budget.py`) when one is
+    loaded, otherwise from the defaults above; they never exceed the configured
+    `DSPY_*_MAX_TOKENS`. In fixed mode every call gets the ceiling and only the
+    finish reasons are tracked.
+    """
+
+    def __init__(
+        self,
+        adaptive: bool,
+        draft_ceiling: int,
+        verify_ceiling: int,
+        fitted: dict[str, Any] | None = None,
+        source: str = "defaults",
+    ) -> None:
+        self.adaptive = adaptive
+        self.draft_ceiling = draft_ceiling
+        self.verify_ceiling = verify_ceiling
+        self.fitted = fitted or {}
+        self.source = source
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, Any]] = {}
+
+    def draft(self, evidence: dict[str, Any], mode: str) -> TokenBudget:
+        bucket = draft_bucket(evidence, mode)
+        mode_group, length, rating = bucket.split(":")
+        default = DRAFT_RATING_BASE[rating] + DRAFT_LENGTH_EXTRA[length] + DRAFT_MODE_EXTRA[mode_group]
+        return self._budget("draft", bucket, default, self.draft_ceiling)
+
+    def verify(self, draft_text: str) -> TokenBudget:
+        bucket = length_bucket(len(draft_text))
+        default = VERIFY_BASE_TOKENS + math.ceil(len(draft_text) / 4 * VERIFY_REWRITE_FACTOR)
+        return self._budget("verify", bucket, default, self.verify_ceiling)
+
+    def record(self, budget: TokenBudget, finish_reasons: list[str], *, retry: bool = False) -> bool:
+        """Count the finish reasons of one budgeted call; returns whether any completion was cut off."""
+        truncated = "length" in finish_reasons
+        with self._lock:
+            stage = self._stats.setdefault(budget.stage, {
+                "calls": 0,
+                "truncated": 0,
+                "retries": 0,
+                "truncatedAtCeiling": 0,
+                "finishReasons": {},
+                "buckets": {},
+            })
+            for reason in finish_reasons:
+                stage["finishReasons"][reason] = stage["finishReasons"].get(reason, 0) + 1
+            # Retries at the ceiling are kept apart so `truncationRate` measures the budgets themselves.
+            if retry:
+                stage["retries"] += 1
+                stage["truncatedAtCeiling"] += int(truncated)
+                return truncated
+            bucket = stage["buckets"].setdefault(budget.bucket, {"calls": 0, "truncated": 0, "budget": budget.tokens})
+            stage["calls"] += 1
+            stage["truncated"] += int(truncated)
+            bucket["calls"] += 1
+            bucket["truncated"] += int(truncated)
+        return truncated
+
+    def metadata(self) -> dict[str, Any]:
+        with self._lock:
+            stages = json.loads(json.dumps(self._stats))
+        for stage in stages.values():
+            stage["truncationRate"] = round(stage["truncated"] / stage["calls"], 4) if stage["calls"] else 0.0
+        return {
+            "mode": "adaptive" if self.adaptive else "fixed",
+            "source": self.source,
+            "ceilings": {"draft": self.draft_ceiling, "verify": self.verify_ceiling},
+            "stages": stages,
+        }
+
+    def _budget(self, stage: str, bucket: str, default: int, ceiling: int) -> TokenBudget:
+        if not self.adaptive:
+            return TokenBudget(stage=stage, bucket=bucket, tokens=ceiling, ceiling=ceiling)
+        tokens = int(self.fitted.get(stage, {}).get(bucket) or default)
+        tokens = max(MIN_BUDGET_TOKENS, math.ceil(tokens / TOKEN_STEP) * TOKEN_STEP)
+        return TokenBudget(stage=stage, bucket=bucket, tokens=min(tokens, ceiling), ceiling=ceiling)
+
+
+@contextmanager
+def watch_finish_reasons() -> Iterator[list[str]]:
+    """Collect the finish reason of every LM completion made inside the block.
+
+    The list is shared by reference, so completions finalized in tasks or threads that
+    copied the context (streaming pumps) still land in it.
+    """
+    reasons: list[str] = []
+    token = _finish_watch.set(reasons)
+    try:
+        yield reasons
+    finally:
+        _finish_watch.reset(token)
+
+
+def track_finish_reasons(lm: dspy.BaseLM) -> dspy.BaseLM:
+    """Report each completion's finish reason to the active `watch_finish_reasons` block.
+
+    DSPy records every call, cache hits included, through `update_history` on the caller's
+    side, which is the one place the raw response is visible for any `BaseLM`.
+    """
+    record_history = lm.update_history
+
+    def update_history(entry: dict[str, Any]) -> None:
+        reasons = _finish_watch.get()
+        if reasons is not None:
+            reasons.extend(_finish_reasons(entry.get("response")))
+        record_history(entry)
+
+    lm.update_history = update_history
+    return lm
+
+
+def draft_bucket(evidence: dict[str, Any], mode: str) -> str:
+    """`<mode>:<comment length>:<rating>`, e.g. `auto:empty:high` for a star-only five-star review."""
+    mode_group = "regen" if mode == "MANUAL_REGENERATE" else "auto"
+    comment = str(evidence.get("comment") or "").strip()
+    return f"{mode_group}:{length_bucket(len(comment))}:{rating_group(evidence.get('starRating'))}"
+
+
+def length_bucket(chars: int) -> str:
+    for name, upper in LENGTH_BUCKETS:
+        if chars <= upper:
+            return name
+    return OVERFLOW_BUCKET
+
+
+def rating_group(star_rating: Any) -> str:
+    try:
+        rating = int(star_rating)
+    except (TypeError, ValueError):
+        return "mid"
+    if rating <= 2:
+        return "low"
+    return "mid" if rating == 3 else "high"
+
+
+def create_token_budget_policy(settings: Settings) -> TokenBudgetPolicy:
+    fitted = None
+    source = "defaults"
+    path = _resolve_budget_path(settings.token_budget_path) if settings.token_budget_path else None
+    if path is not None and path.exists():
+        fitted = json.loads(path.read_text(encoding="utf-8"))
+        source = f"{path.name}:{fitted.get('fittedAtUtc', 'unknown')}"
+    return TokenBudgetPolicy(
+        adaptive=settings.token_budget == "adaptive",
+        draft_ceiling=settings.draft_max_tokens,
+        verify_ceiling=settings.verify_max_tokens,
+        fitted=fitted,
+        source=source,
+    )
+
+
+def _finish_reasons(response: Any) -> list[str]:
+    responses = response if isinstance(response, (list, tuple)) else [response]
+    reasons: list[str] = []
+    for item in responses:
+        reason = _field(item, "finish_reason")
+        if reason is None:
+            reason = next((_field(choice, "finish_reason") for choice in _field(item, "choices") or []), None)
+        if reason is not None:
+            reasons.append(str(reason))
+    return reasons
+
+
+def _field(value: Any, name: str) -> Any:
+    if isinstance(value, dict):
+        return value.get(name)
+    return getattr(value, name, None)
+
+
+def _resolve_budget_path(raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path
+    return Path(__file__).resolve().parent / path
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import contextvars
+import http.client
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.parse
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+import dspy
+import litellm
+from dspy.utils.callback import BaseCallback
+from litellm.integrations.custom_logger import CustomLogger
+
+from settings import Settings
+
+
+SERVICE_NAME = "gbp-dspy-service"
+QUEUE_MAX_SPANS = 4096
+EXPORT_BATCH_SIZE = 256
+EXPORT_INTERVAL_SECONDS = 2.0
+OTLP_TIMEOUT_SECONDS = 5.0
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# OTLP span kinds and status codes.
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("dspy_current_span", default=None)
+_remote_parent: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar("dspy_remote_parent", default=None)
+_tracer: Tracer | None = None
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    kind: int
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    events: list[dict[str, Any]] = field(default_factory=list)
+    status_code: int = STATUS_OK
+    status_message: str | None = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        self.events.append({"name": name, "timeUnixNano": time.time_ns(), "attributes": attributes})
+
+    def record_error(self, error: BaseException) -> None:
+        self.status_code = STATUS_ERROR
+        self.status_message = str(error) or type(error).__name__
+        self.set(**{"error.type": getattr(error, "code", None) or type(error).__name__})
+        self.add_event("exception", **{"exception.type": type(error).__name__, "exception.message": str(error)})
+
+
+class SpanExporter(Protocol):
+    def export(self, payload: dict[str, Any]) -> None: ...
+
+
+class FileSpanExporter:
+    """Appends one OTLP/JSON `ExportTraceServiceRequest` per line (the collector's `otlpjsonfile` format)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, payload: dict[str, Any]) -> None:
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """POSTs OTLP/JSON to a collector's `/v1/traces` endpoint.
+
+    Connecting, sending and reading the status line share one deadline, so a hung collector
+    holds the export thread for at most `timeout_seconds`. Redirects are not followed and the
+    response body is not read.
+    """
+
+    def __init__(self, endpoint: str, timeout_seconds: float = OTLP_TIMEOUT_SECONDS) -> None:
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout_seconds = timeout_seconds
+
+    def export(self, payload: dict[str, Any]) -> None:
+        parts = urllib.parse.urlsplit(self.url)
+        connection_type = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        deadline = time.monotonic() + self.timeout_seconds
+        connection = connection_type(parts.netloc, timeout=self.timeout_seconds)
+        try:
+            connection.connect()
+            connection.sock.settimeout(_remaining(deadline))
+            connection.request("POST", path, body=body, headers={"content-type": "application/json"})
+            connection.sock.settimeout(_remaining(deadline))
+            status = connection.getresponse().status
+        finally:
+            connection.close()
+        if not 200 <= status < 300:
+            raise OSError(f"OTLP collector returned HTTP {status}")
+
+
+class Tracer:
+    """Queues finished spans and exports them in batches from a daemon thread.
+
+    Like traffic capture, request threads never wait on the exporter: spans that do not
+    fit in the queue are dropped and counted.
+    """
+
+    def __init__(self, exporter: SpanExporter, exporter_name: str, max_spans: int = QUEUE_MAX_SPANS) -> None:
+        self.exporter = exporter
+        self.exporter_name = exporter_name
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self._counts = {"exported": 0, "dropped": 0, "errors": 0}
+        self._start_writer()
+        # Threads do not survive fork, so each pre-forked worker (`prefork.py`) starts its own.
+        os.register_at_fork(after_in_child=self._start_writer)
+
+    def submit(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self._incr("dropped", 1)
+
+    def metadata(self) -> dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "enabled": True,
+            "exporter": self.exporter_name,
+            "queued": self._queue.qsize(),
+            "queueMax": self.max_spans,
+            **counts,
+        }
+
+    def _start_writer(self) -> None:
+        self._queue: queue.Queue[Span] = queue.Queue(maxsize=self.max_spans)
+        self._writer = threading.Thread(target=self._drain, name="span-export", daemon=True)
+        self._writer.start()
+
+    def _drain(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(batch) < EXPORT_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(otlp_payload(batch))
+                self._incr("exported", len(batch))
+            except Exception:  # noqa: BLE001
+                self._incr("errors", len(batch))
+
+    def _incr(self, name: str, amount: int) -> None:
+        with self._lock:
+            self._counts[name] += amount
+
+
+class LMSpanCallback(BaseCallback):
+    """Opens an `lm.call` span around every DSPy LM call, with model, token and cache-hit attributes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._open: dict[str, tuple[Span, contextvars.Token, Any, tuple[int, int]]] = {}
+
+    def on_lm_start(self, call_id: str, instance: Any, inputs: dict[str, Any]) -> None:
+        span, token = start_span("lm.call", **{"gen_ai.request.model": getattr(instance, "model", None)})
+        if span is None:
+            return
+        tracker = dspy.settings.usage_tracker
+        with self._lock:
+            self._open[call_id] = (span, token, tracker, _tracked_tokens(tracker))
+
+    def on_lm_end(self, call_id: str, outputs: Any, exception: BaseException | None = None) -> None:
+        with self._lock:
+            entry = self._open.pop(call_id, None)
+        if entry is None:
+            return
+        span, token, tracker, (prompt_before, completion_before) = entry
+        attempts = span.attributes.get("lm.attempts", 0)
+        if tracker is not None:
+            prompt_after, completion_after = _tracked_tokens(tracker)
+            input_tokens = prompt_after - prompt_before
+            output_tokens = completion_after - completion_before
+            span.set(**{"gen_ai.usage.input_tokens": input_tokens, "gen_ai.usage.output_tokens": output_tokens})
+            # DSPy adds no usage for responses served from its caches, and no provider request was sent.
+            if exception is None:
+                span.set(**{"lm.cache_hit": attempts == 0 and input_tokens == 0 and output_tokens == 0})
+        span.set(**{"lm.retries": max(attempts - 1, 0)})
+        end_span(span, token, exception)
+
+
+class _ProviderAttemptLogger(CustomLogger):
+    """Counts provider requests litellm sends for the current `lm.call`, so retries show on the span."""
+
+    def log_pre_api_call(self, model: Any, messages: Any, kwargs: Any) -> None:
+        span = _current_span.get()
+        if span is None or span.name != "lm.call":
+            return
+        attempts = span.attributes.get("lm.attempts", 0) + 1
+        span.set(**{"lm.attempts": attempts})
+        if attempts > 1:
+            span.add_event("lm.retry", **{"lm.attempt": attempts})
+
+
+def install_tracer(tracer: Tracer) -> None:
+    global _tracer
+    if _tracer is None and not any(isinstance(callback, _ProviderAttemptLogger) for callback in litellm.callbacks):
+        litellm.callbacks.append(_ProviderAttemptLogger())
+    _tracer = tracer
+
+
+def start_span(name: str, **attributes: Any) -> tuple[Span | None, contextvars.Token | None]:
+    if _tracer is None:
+        return None, None
+    parent = _current_span.get()
+    if parent is not None:
+        trace_id, parent_span_id, kind = parent.trace_id, parent.span_id, SPAN_KIND_INTERNAL
+    else:
+        remote = _remote_parent.get()
+        trace_id, parent_span_id = remote if remote else (secrets.token_hex(16), None)
+        kind = SPAN_KIND_SERVER
+    span = Span(name=name, trace_id=trace_id, span_id=secrets.token_hex(8), parent_span_id=parent_span_id, kind=kind)
+    span.set(**attributes)
+    return span, _current_span.set(span)
+
+
+def end_span(span: Span | None, token: contextvars.Token | None, error: BaseException | None = None) -> None:
+    if span is None:
+        return
+    if error is not None:
+        span.record_error(error)
+    span.end_ns = time.time_ns()
+    if token is not None:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # An async generator closed from another context; the span itself is still complete.
+            pass
+    if _tracer is not None:
+        _tracer.submit(span)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """Record `name` as a child of the current span (or a new root); yields None when tracing is off."""
+    current, token = start_span(name, **attributes)
+    try:
+        yield current
+    except BaseException as exc:
+        end_span(current, token, exc)
+        raise
+    else:
+        end_span(current, token)
+
+
+def annotate(**attributes: Any) -> None:
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+@contextmanager
+def continue_trace(traceparent: str | None) -> Iterator[None]:
+    """Parent root spans opened inside the block on a W3C `traceparent` from the caller."""
+    match = TRACEPARENT_PATTERN.match((traceparent or "").strip().lower())
+    if match is None or _tracer is None:
+        yield
+        return
+    token = _remote_parent.set((match.group(1), match.group(2)))
+    try:
+        yield
+    finally:
+        _remote_parent.reset(token)
+
+
+def lm_callbacks() -> list[BaseCallback]:
+    return [LMSpanCallback()] if _tracer is not None else []
+
+
+def otlp_payload(spans: list[Span]) -> dict[str, Any]:
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{"scope": {"name": "tracing"}, "spans": [_otlp_span(span) for span in spans]}],
+            }
+        ]
+    }
+
+
+def create_tracer(settings: Settings) -> Tracer | None:
+    if settings.trace_exporter == "file":
+        return Tracer(FileSpanExporter(_resolve_trace_path(settings.trace_file_path)), exporter_name="file")
+    if settings.trace_exporter == "otlp":
+        return Tracer(OtlpHttpSpanExporter(settings.trace_otlp_endpoint), exporter_name="otlp")
+    return None
+
+
+def _otlp_span(span: Span) -> dict[str, Any]:
+    status: dict[str, Any] = {"code": span.status_code}
+    if span.status_message:
+        status["message"] = span.status_message
+    payload: dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns or span.start_ns),
+        "attributes": _otlp_attributes(span.attributes),
+        "events": [
+            {
+                "name": event["name"],
+                "timeUnixNano": str(event["timeUnixNano"]),
+                "attributes": _otlp_attributes(event["attributes"]),
+            }
+            for event in span.events
+        ],
+        "status": status,
+    }
+    if span.parent_span_id:
+        payload["parentSpanId"] = span.parent_span_id
+    return payload
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _remaining(deadline: float) -> float:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("OTLP export timed out")
+    return remaining
+
+
+def _tracked_tokens(tracker: Any) -> tuple[int, int]:
+    if tracker is None:
+        return 0, 0
+    prompt_tokens = completion_tokens = 0
+    for usage in tracker.get_total_tokens().values():
+        prompt_tokens += int(usage.get("prompt_tokens") or 0)
+        completion_tokens += int(usage.get("completion_tokens") or 0)
+    return prompt_tokens, completion_tokens
+
+
+def _resolve_trace_path(raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path
+    return Path(__file__).resolve().parent / path